@@ -0,0 +1,317 @@
+# comments MUST be English only
+#
+# Streaming detection of leaked secrets. A secret posted in a public channel
+# suddenly gets thousands of distinct clients; per key we keep a fast and a
+# slow EWMA of the connection count plus a HyperLogLog of client addresses,
+# and flag the key when both jump. Memory per key is fixed (two 4 KiB
+# register arrays) no matter how many clients connect.
+#
+# Keys come from /proc/net/tcp sampling. MTProxy does not report clients
+# per secret, so a port is attributed to a secret only when it serves a
+# single one; otherwise the key is "port:<n>" and the detector can only
+# alert.
+#
+#   python -m bot.abuse
+import hashlib
+import logging
+import math
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .audit import EVENT_DELETE, EVENT_ROTATE, AuditLog
+from .db import Database
+from .mtproxy_manager import MtproxyManager
+from .procnet import PROC_NET_DIR, iter_established
+
+
+logger = logging.getLogger(__name__)
+
+HLL_P = 12  # 4096 registers, ~1.6% standard error
+WINDOW = 600.0  # seconds; unique clients are counted over the last 1-2 windows
+IDLE_WINDOWS = 2  # keys with no connections for longer than this are dropped
+FAST_ALPHA = 0.5
+SLOW_ALPHA = 0.02
+WARMUP_SAMPLES = 10  # no flags until the baseline has settled
+SPIKE_FACTOR = 5.0  # fast EWMA must exceed baseline by this factor
+MIN_CONNECTIONS = 500  # ...and be at least this many connections
+MIN_UNIQUE = 1000  # ...from at least this many distinct clients
+
+ACTION_OFF = "off"
+ACTION_ALERT = "alert"
+ACTION_DISABLE = "disable"
+ACTION_ROTATE = "rotate"
+ACTIONS = (ACTION_OFF, ACTION_ALERT, ACTION_DISABLE, ACTION_ROTATE)
+
+_INV_POW2 = [2.0 ** -r for r in range(65)]
+
+
+class HyperLogLog:
+    __slots__ = ("p", "m", "registers")
+
+    def __init__(self, p: int = HLL_P):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def add(self, item: str) -> None:
+        x = int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), "big")
+        bits = 64 - self.p
+        idx = x >> bits
+        rank = bits - (x & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def clear(self) -> None:
+        self.registers[:] = bytes(self.m)
+
+    def count(self, other: Optional["HyperLogLog"] = None) -> int:
+        # Estimate of this set, or of its union with other (same p)
+        regs = self.registers if other is None else bytes(map(max, self.registers, other.registers))
+        m = self.m
+        z = sum(map(_INV_POW2.__getitem__, regs))
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / z
+        zeros = regs.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(estimate)
+
+
+class _KeyState:
+    __slots__ = (
+        "fast",
+        "slow",
+        "samples",
+        "current",
+        "previous",
+        "window_start",
+        "flagged",
+        "last_seen",
+    )
+
+    def __init__(self, now: float):
+        self.fast = 0.0
+        self.slow = 0.0
+        self.samples = 0
+        self.current = HyperLogLog()
+        self.previous = HyperLogLog()
+        self.window_start = now
+        self.flagged = False
+        self.last_seen = now
+
+
+@dataclass
+class AbuseFlag:
+    key: str
+    ts: float
+    connections: int
+    baseline: float
+    unique: int
+    action: str = ACTION_ALERT
+    new_secret: Optional[str] = None
+
+
+class AbuseDetector:
+    def __init__(self, window: float = WINDOW):
+        self.window = window
+        self._keys: Dict[str, _KeyState] = {}
+
+    def forget(self, key: str) -> None:
+        self._keys.pop(key, None)
+
+    def keys(self) -> List[str]:
+        return list(self._keys)
+
+    def estimate(self, key: str) -> Optional[Tuple[float, float, int]]:
+        # (fast EWMA, baseline, unique clients) for one key
+        st = self._keys.get(key)
+        if st is None:
+            return None
+        return st.fast, st.slow, st.current.count(st.previous)
+
+    def sample(self, pairs: Iterable[Tuple[str, str]], now: Optional[float] = None) -> List[AbuseFlag]:
+        # pairs: (key, client) per established connection, streamed
+        now = time.time() if now is None else now
+        for st in self._keys.values():
+            if now - st.window_start >= self.window:
+                st.current, st.previous = st.previous, st.current
+                st.current.clear()
+                st.window_start = now
+
+        counts: Dict[str, int] = {}
+        for key, client in pairs:
+            st = self._keys.get(key)
+            if st is None:
+                st = self._keys[key] = _KeyState(now)
+            st.current.add(client)
+            st.last_seen = now
+            counts[key] = counts.get(key, 0) + 1
+
+        # Rotated / deleted secrets and reassigned ports stop showing up;
+        # their ~8 KiB of registers must not stay forever
+        max_idle = IDLE_WINDOWS * self.window
+        idle = [k for k, st in self._keys.items() if now - st.last_seen > max_idle]
+        for key in idle:
+            del self._keys[key]
+
+        flags = []
+        for key, st in self._keys.items():
+            flag = self._update(key, st, counts.get(key, 0), now)
+            if flag:
+                flags.append(flag)
+        return flags
+
+    def _update(self, key: str, st: _KeyState, connections: int, now: float) -> Optional[AbuseFlag]:
+        st.samples += 1
+        if st.samples == 1:
+            st.fast = st.slow = float(connections)
+            return None
+        st.fast = FAST_ALPHA * connections + (1 - FAST_ALPHA) * st.fast
+        baseline = st.slow
+
+        spike = (
+            st.samples > WARMUP_SAMPLES
+            and st.fast >= MIN_CONNECTIONS
+            and st.fast > SPIKE_FACTOR * max(baseline, 1.0)
+        )
+        flag = None
+        if spike and not st.flagged:
+            unique = st.current.count(st.previous)
+            if unique >= MIN_UNIQUE:
+                st.flagged = True
+                flag = AbuseFlag(key, now, connections, baseline, unique)
+        elif st.flagged and st.fast < SPIKE_FACTOR * max(baseline, 1.0) / 2:
+            st.flagged = False
+
+        # A flagged spike must not become the new normal
+        if not st.flagged:
+            st.slow = SLOW_ALPHA * connections + (1 - SLOW_ALPHA) * st.slow
+        return flag
+
+
+class AbuseMonitor:
+    # Live glue: /proc sampling -> detector -> optional batched rotate/disable
+
+    def __init__(
+        self,
+        db: Database,
+        mt: MtproxyManager,
+        audit: Optional[AuditLog] = None,
+        action: str = ACTION_ALERT,
+        proc_dir: str = PROC_NET_DIR,
+    ):
+        self.db = db
+        self.mt = mt
+        self.audit = audit
+        self.action = action
+        self.proc_dir = proc_dir
+        self.detector = AbuseDetector()
+        # Every (database, audit log) whose proxies live in this ExecStart;
+        # bot.tenants lists all tenants here, the host's own comes first
+        self.stores: List[Tuple[Database, Optional[AuditLog]]] = [(db, audit)]
+
+    def _owner(self, secret: str) -> Tuple[Database, Optional[AuditLog], Optional[int]]:
+        # (database, audit log, proxy id) of the store holding the secret;
+        # the host's own store when no one claims it
+        for db, audit in self.stores:
+            row = db.get_proxy_by_secret(secret)
+            if row:
+                return db, audit, row["id"]
+        return self.db, self.audit, None
+
+    def _key_by_port(self) -> Dict[int, str]:
+        cfg = self.mt.parse_config()
+        key = cfg.secrets[0] if len(cfg.secrets) == 1 else f"port:{cfg.port}"
+        return {cfg.port: key}
+
+    def warn_if_port_keyed(self) -> None:
+        # disable/rotate need a port with a single secret to act on
+        if self.action not in (ACTION_DISABLE, ACTION_ROTATE):
+            return
+        try:
+            keys = self._key_by_port()
+        except (FileNotFoundError, RuntimeError) as e:
+            logger.warning("Abuse detector: cannot read the MTProxy unit: %s", e)
+            return
+        if all(key.startswith("port:") for key in keys.values()):
+            logger.warning(
+                "ABUSE_ACTION=%s has no effect: every port serves several secrets, "
+                "so flags are per port and only alert",
+                self.action,
+            )
+
+    def check(self) -> List[AbuseFlag]:
+        # Blocking (/proc, may restart MTProxy); call off the event loop
+        keys = self._key_by_port()
+        pairs = ((keys[port], client) for port, client in iter_established(keys, self.proc_dir))
+        flags = self.detector.sample(pairs)
+        if flags and self.action in (ACTION_DISABLE, ACTION_ROTATE):
+            self._act(flags)
+        return flags
+
+    def _act(self, flags: List[AbuseFlag]) -> None:
+        live = set(self.mt.parse_config().secrets)
+        targets = [f for f in flags if f.key in live]
+        if not targets:
+            return
+
+        if self.action == ACTION_DISABLE:
+            self.mt.apply_secret_changes(remove=[f.key for f in targets])
+        else:
+            for f in targets:
+                f.new_secret = self.mt.generate_secret()
+            self.mt.apply_secret_changes(
+                remove=[f.key for f in targets], add=[f.new_secret for f in targets]
+            )
+
+        for f in targets:
+            f.action = self.action
+            self.detector.forget(f.key)
+            db, audit, proxy_id = self._owner(f.key)
+            if self.action == ACTION_DISABLE:
+                if proxy_id is not None:
+                    db.deactivate_proxy(proxy_id)
+                event = EVENT_DELETE
+            else:
+                if proxy_id is not None:
+                    db.update_proxy_secret(proxy_id, f.new_secret)
+                event = EVENT_ROTATE
+            if audit:
+                audit.record(
+                    event, proxy_id=proxy_id, secret=f.key, detail=f"abuse: {f.unique} clients"
+                )
+            logger.warning("Secret %s… %s after abuse flag", f.key[:8], self.action)
+
+
+def format_flag(flag: AbuseFlag) -> str:
+    key = flag.key if flag.key.startswith("port:") else f"{flag.key[:8]}…"
+    lines = [
+        "🚨 مصرف غیرعادی (احتمال نشت سکرت):",
+        f"کلید: {key}",
+        f"اتصال‌ها: {flag.connections} (عادی ~{flag.baseline:.0f})",
+        f"کلاینت‌های یکتا: ~{flag.unique}",
+    ]
+    if flag.action == ACTION_DISABLE:
+        lines.append("سکرت غیرفعال شد.")
+    elif flag.action == ACTION_ROTATE:
+        lines.append(f"سکرت عوض شد: {flag.new_secret[:8]}…")
+    return "\n".join(lines)
+
+
+def main() -> int:
+    from .config import Config
+
+    cfg = Config.from_env()
+    db = Database(cfg.db_path)
+    monitor = AbuseMonitor(db, MtproxyManager(cfg), action=ACTION_ALERT)
+    monitor.check()
+    for key in monitor.detector.keys():
+        fast, _, unique = monitor.detector.estimate(key)
+        print(f"{key}: {fast:.0f} connections, ~{unique} unique clients")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
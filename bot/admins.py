@@ -0,0 +1,65 @@
+# comments MUST be English only
+import sqlite3
+from typing import Dict, FrozenSet, List, Optional
+
+from .config import Config
+from .db import Database
+
+
+class AdminCache:
+    # Active admins kept in memory: a frozenset for the per-update
+    # authorization check and a telegram_id -> row map for handlers.
+    # Reloaded lazily after any admin write through the same Database.
+
+    def __init__(self, cfg: Config, db: Database):
+        self.cfg = cfg
+        self.db = db
+        self.ids: FrozenSet[int] = frozenset()
+        self._rows: Dict[int, sqlite3.Row] = {}
+        self._generation = -1
+
+    def seed_from_config(self) -> None:
+        # ADMIN_IDS from .env become DB rows once; later removals stick
+        for telegram_id in self.cfg.admin_ids:
+            self.db.ensure_admin(
+                telegram_id=telegram_id,
+                display_name=str(telegram_id),
+                is_owner=telegram_id == self.cfg.owner_id,
+            )
+        self.reload()
+
+    def reload(self) -> None:
+        generation = self.db.admin_generation
+        rows = self.db.list_active_admins()
+        self._rows = {r["telegram_id"]: r for r in rows}
+        ids = set(self._rows)
+        if self.cfg.owner_id:
+            ids.add(self.cfg.owner_id)
+        self.ids = frozenset(ids)
+        self._generation = generation
+
+    def _fresh(self) -> None:
+        if self._generation != self.db.admin_generation:
+            self.reload()
+
+    def is_admin(self, telegram_id: int) -> bool:
+        self._fresh()
+        return telegram_id in self.ids
+
+    def get(self, telegram_id: int) -> Optional[sqlite3.Row]:
+        self._fresh()
+        return self._rows.get(telegram_id)
+
+    def all(self) -> List[sqlite3.Row]:
+        self._fresh()
+        return list(self._rows.values())
+
+    # ---------- owner actions ----------
+
+    def add(self, telegram_id: int, display_name: str) -> None:
+        self.db.ensure_admin(telegram_id=telegram_id, display_name=display_name)
+        # ensure_admin keeps an existing (possibly removed) row; re-enable it
+        self.db.set_admin_active(telegram_id, True)
+
+    def remove(self, telegram_id: int) -> bool:
+        return self.db.set_admin_active(telegram_id, False)
@@ -0,0 +1,201 @@
+# comments MUST be English only
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+from .rollup import AdminDeltas, add_admin_events, day_of
+from .store import migrate
+
+
+logger = logging.getLogger(__name__)
+
+# Event codes are stored as small integers to keep rows compact
+EVENT_CREATE = 1
+EVENT_DELETE = 2
+EVENT_ROTATE = 3
+EVENT_EXPIRE = 4  # old secret removed when its rotation grace period ends
+EVENT_RESTART = 5
+EVENT_RECONCILE = 6
+
+EVENT_NAMES = {
+    EVENT_CREATE: "create",
+    EVENT_DELETE: "delete",
+    EVENT_ROTATE: "rotate",
+    EVENT_EXPIRE: "expire",
+    EVENT_RESTART: "restart",
+    EVENT_RECONCILE: "reconcile",
+}
+
+# Events counted in rollup_admin_daily -> [created, expired, rotated] slot;
+# EVENT_EXPIRE is not one: the proxy lives on with its new secret
+ROLLUP_SLOTS = {EVENT_CREATE: 0, EVENT_DELETE: 1, EVENT_ROTATE: 2}
+
+BATCH_SIZE = 100
+FLUSH_INTERVAL = 1.0  # seconds
+
+# (ts, event, actor, proxy_id, secret, detail)
+AuditRow = Tuple[int, int, Optional[int], Optional[int], Optional[str], Optional[str]]
+
+_STOP = object()
+
+
+class AuditLog:
+    # Append-only proxy lifecycle log. record() only enqueues; a background
+    # thread writes events in batches so handlers never wait on sqlite.
+
+    def __init__(self, path: str):
+        self.path = path
+        self._init_db()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer = threading.Thread(
+            target=self._writer_loop, name="audit-writer", daemon=True
+        )
+        self._writer.start()
+
+    @contextmanager
+    def _conn(self):
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self) -> None:
+        # audit_log and the rollup tables are store.py migrations
+        with self._conn() as conn:
+            migrate(conn)
+
+    # ---------- writing ----------
+
+    def record(
+        self,
+        event: int,
+        actor: Optional[int] = None,
+        proxy_id: Optional[int] = None,
+        secret: Optional[str] = None,
+        detail: Optional[str] = None,
+    ) -> None:
+        self._queue.put((int(time.time()), event, actor, proxy_id, secret, detail))
+
+    def _write_batch(self, batch: List[AuditRow]) -> None:
+        try:
+            with self._conn() as conn:
+                conn.executemany(
+                    """
+                    INSERT INTO audit_log (ts, event, actor, proxy_id, secret, detail)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    batch,
+                )
+                # Same transaction: rollups never drift from the log
+                add_admin_events(conn, _rollup_deltas(batch))
+                conn.commit()
+        except sqlite3.Error:
+            logger.exception("Failed to write %d audit events", len(batch))
+
+    def _writer_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch: List[AuditRow] = []
+            stop = False
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while True:
+                if isinstance(item, threading.Event):
+                    # flush() marker: write what we have, then wake the caller
+                    if batch:
+                        self._write_batch(batch)
+                    batch = []
+                    item.set()
+                elif item is _STOP:
+                    stop = True
+                    break
+                else:
+                    batch.append(item)
+                    if len(batch) >= BATCH_SIZE:
+                        break
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            if batch:
+                self._write_batch(batch)
+            if stop:
+                return
+
+    def flush(self, timeout: float = 5.0) -> None:
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self) -> None:
+        self._queue.put(_STOP)
+        self._writer.join(timeout=5.0)
+
+    # ---------- reading ----------
+
+    def history(
+        self,
+        before_id: Optional[int] = None,
+        actor: Optional[int] = None,
+        proxy_id: Optional[int] = None,
+        secret: Optional[str] = None,
+        limit: int = 10,
+    ) -> List[sqlite3.Row]:
+        # Keyset pagination: newest first, continue with before_id=<last id>
+        where = []
+        params: list = []
+        if before_id is not None:
+            where.append("id < ?")
+            params.append(before_id)
+        if actor is not None:
+            where.append("actor = ?")
+            params.append(actor)
+        if proxy_id is not None:
+            where.append("proxy_id = ?")
+            params.append(proxy_id)
+        if secret is not None:
+            where.append("secret = ?")
+            params.append(secret)
+
+        sql = "SELECT * FROM audit_log"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+
+        with self._conn() as conn:
+            return conn.execute(sql, params).fetchall()
+
+
+def _rollup_deltas(batch: List[AuditRow]) -> AdminDeltas:
+    deltas: AdminDeltas = {}
+    for ts, event, _, proxy_id, _, _ in batch:
+        slot = ROLLUP_SLOTS.get(event)
+        if slot is None or proxy_id is None:
+            continue
+        deltas.setdefault((day_of(ts), proxy_id), [0, 0, 0])[slot] += 1
+    return deltas
+
+
+def format_event(row: sqlite3.Row) -> str:
+    when = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(row["ts"]))
+    parts = [f"#{row['id']}", when, EVENT_NAMES.get(row["event"], str(row["event"]))]
+    if row["actor"] is not None:
+        parts.append(f"by={row['actor']}")
+    if row["proxy_id"] is not None:
+        parts.append(f"proxy={row['proxy_id']}")
+    if row["secret"]:
+        parts.append(f"secret={row['secret']}")
+    if row["detail"]:
+        parts.append(row["detail"])
+    return " ".join(parts)
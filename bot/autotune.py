@@ -0,0 +1,279 @@
+# comments MUST be English only
+#
+# Suggests (or applies) the MTProxy worker count (-M) from observed load:
+# host CPU usage from /proc/stat and established client connections on the
+# MTProxy ports. Changes need several consecutive samples past separate
+# up/down thresholds (hysteresis), move one worker at a time and are never
+# closer together than the cooldown, so a noisy box cannot cause a restart
+# storm. Dry-run unless apply=True.
+#
+#   python -m bot.autotune sample
+#   python -m bot.autotune replay <trace.csv> [--workers N] [--cores N]
+#
+# A trace is CSV with "ts,cpu,connections" rows (cpu as a 0..1 fraction).
+import argparse
+import csv
+import logging
+import math
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
+
+from .procnet import count_connections
+
+if TYPE_CHECKING:  # replay needs no manager (nor its config / .env)
+    from .mtproxy_manager import MtproxyManager
+
+
+logger = logging.getLogger(__name__)
+
+PROC_STAT = "/proc/stat"
+
+CPU_HIGH = 0.75  # smoothed CPU above this asks for one more worker
+CPU_LOW = 0.30  # and below this (with few connections) for one less
+CONNS_PER_WORKER = 4000  # comfortable client connections per worker
+DOWN_MARGIN = 0.6  # remaining workers must stay under 60% of that
+STABLE_SAMPLES = 4  # consecutive samples a condition must hold
+COOLDOWN = 1800.0  # seconds between two changes
+SMOOTHING = 0.3  # EWMA weight of the newest CPU sample
+
+
+@dataclass
+class LoadSample:
+    ts: float
+    cpu: float  # host CPU busy fraction since the previous sample
+    connections: int
+
+
+@dataclass
+class Decision:
+    ts: float
+    current: int
+    target: int
+    reason: str
+    applied: bool = False
+
+
+def read_cpu_times(path: str = PROC_STAT) -> Tuple[int, int]:
+    # (busy, total) jiffies from the aggregate "cpu" line
+    with open(path, "r", encoding="ascii") as f:
+        fields = f.readline().split()
+    values = [int(v) for v in fields[1:]]
+    idle = values[3] + (values[4] if len(values) > 4 else 0)  # idle + iowait
+    total = sum(values[:8])  # guest time is already part of user/nice
+    return total - idle, total
+
+
+class CpuSampler:
+    # First usage() is the average since boot, later ones since the last call
+    def __init__(self, path: str = PROC_STAT):
+        self.path = path
+        self._last = (0, 0)
+
+    def usage(self) -> float:
+        busy, total = read_cpu_times(self.path)
+        last_busy, last_total = self._last
+        self._last = (busy, total)
+        if total <= last_total:
+            return 0.0
+        return (busy - last_busy) / (total - last_total)
+
+
+def load_trace(path: str) -> List[LoadSample]:
+    samples = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith("#") or row[0] == "ts":
+                continue
+            samples.append(LoadSample(ts=float(row[0]), cpu=float(row[1]), connections=int(row[2])))
+    return samples
+
+
+class WorkerAutotuner:
+    def __init__(
+        self,
+        mt: Optional["MtproxyManager"],
+        cores: Optional[int] = None,
+        apply: bool = False,
+        cooldown: float = COOLDOWN,
+    ):
+        self.mt = mt
+        self.cores = cores or os.cpu_count() or 1
+        self.min_workers = 1
+        # Same ceiling the installer picks: leave one core for the system
+        self.max_workers = max(1, self.cores - 1)
+        self.apply = apply
+        self.cooldown = cooldown
+        self.decisions: List[Decision] = []
+        self._cpu: Optional[CpuSampler] = None
+        self._smoothed: Optional[float] = None
+        self._up_streak = 0
+        self._down_streak = 0
+        self._last_change = float("-inf")
+        # Dry-run: (current, target) last suggested; the same suggestion
+        # comes back every cooldown while nobody applies it
+        self._suggested: Optional[Tuple[int, int]] = None
+
+    def reset(self) -> None:
+        self.decisions = []
+        self._smoothed = None
+        self._up_streak = 0
+        self._down_streak = 0
+        self._last_change = float("-inf")
+        self._suggested = None
+
+    # ---------- decision logic (pure; shared by live runs and replay) ----------
+
+    def direction(self, cpu: float, connections: int, current: int) -> int:
+        # +1 / -1 / 0 for one reading, without streaks or cooldown
+        if current < self.max_workers and (
+            cpu > CPU_HIGH or math.ceil(connections / CONNS_PER_WORKER) > current
+        ):
+            return 1
+        if (
+            current > self.min_workers
+            and cpu < CPU_LOW
+            and connections < (current - 1) * CONNS_PER_WORKER * DOWN_MARGIN
+        ):
+            return -1
+        # Anything in between is the hysteresis band
+        return 0
+
+    def observe(self, sample: LoadSample, current: int) -> Optional[Decision]:
+        if self._smoothed is None:
+            self._smoothed = sample.cpu
+        else:
+            self._smoothed = SMOOTHING * sample.cpu + (1 - SMOOTHING) * self._smoothed
+
+        step = self.direction(self._smoothed, sample.connections, current)
+        self._up_streak = self._up_streak + 1 if step > 0 else 0
+        self._down_streak = self._down_streak + 1 if step < 0 else 0
+
+        if sample.ts - self._last_change < self.cooldown:
+            return None
+        if self._up_streak >= STABLE_SAMPLES:
+            target = current + 1
+        elif self._down_streak >= STABLE_SAMPLES:
+            target = current - 1
+        else:
+            return None
+
+        self._up_streak = self._down_streak = 0
+        self._last_change = sample.ts
+        reason = f"cpu {self._smoothed:.0%}, {sample.connections} connections"
+        decision = Decision(ts=sample.ts, current=current, target=target, reason=reason)
+        self.decisions.append(decision)
+        return decision
+
+    def replay(self, samples: Iterable[LoadSample], workers: int) -> List[Decision]:
+        # Simulate a recorded trace: decisions are taken as if applied, but
+        # nothing touches the unit file or systemd
+        self.reset()
+        for sample in samples:
+            decision = self.observe(sample, workers)
+            if decision:
+                workers = decision.target
+        return list(self.decisions)
+
+    # ---------- live ----------
+
+    def sample(self, connections: Optional[int] = None) -> LoadSample:
+        # connections may come from a ConnectionMonitor sample already taken
+        if self._cpu is None:
+            self._cpu = CpuSampler()
+        cpu = self._cpu.usage()
+        if connections is None:
+            port = self.mt.parse_config().port
+            connections = count_connections([port])[port].established
+        return LoadSample(ts=time.time(), cpu=cpu, connections=connections)
+
+    def step(self, connections: Optional[int] = None) -> Optional[Decision]:
+        # Blocking (reads /proc, may restart MTProxy); call off the event loop
+        current = self.mt.parse_config().workers
+        if current is None:
+            return None
+        decision = self.observe(self.sample(connections), current)
+        if decision is None:
+            return None
+        if self.apply:
+            self.mt.set_workers(decision.target)
+            decision.applied = True
+            logger.info(
+                "MTProxy workers %d -> %d (%s)",
+                decision.current,
+                decision.target,
+                decision.reason,
+            )
+        else:
+            suggestion = (decision.current, decision.target)
+            if suggestion == self._suggested:
+                logger.debug("MTProxy workers %d -> %d still suggested", *suggestion)
+                return None
+            self._suggested = suggestion
+            logger.info(
+                "Suggest MTProxy workers %d -> %d (%s); dry-run",
+                decision.current,
+                decision.target,
+                decision.reason,
+            )
+        return decision
+
+
+def format_decision(d: Decision) -> str:
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(d.ts))
+    action = "applied" if d.applied else "suggested"
+    return f"{stamp} workers {d.current} -> {d.target} ({d.reason}) [{action}]"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(prog="python -m bot.autotune")
+    sub = parser.add_subparsers(dest="command", required=True)
+    live = sub.add_parser("sample", help="one live sample against the running MTProxy")
+    live.add_argument("--apply", action="store_true", help="rewrite -M and restart")
+    rep = sub.add_parser("replay", help="simulate a recorded load trace")
+    rep.add_argument("trace")
+    rep.add_argument("--workers", type=int, default=1, help="worker count at trace start")
+    rep.add_argument("--cores", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "replay":
+        tuner = WorkerAutotuner(None, cores=args.cores)
+        samples = load_trace(args.trace)
+        decisions = tuner.replay(samples, args.workers)
+        for d in decisions:
+            print(format_decision(d))
+        final = decisions[-1].target if decisions else args.workers
+        print(f"{len(samples)} samples, {len(decisions)} changes, final workers {final}")
+        return 0
+
+    from .config import Config
+    from .mtproxy_manager import MtproxyManager
+
+    cfg = Config.from_env()
+    mt = MtproxyManager(cfg)
+    tuner = WorkerAutotuner(mt)
+    tuner.sample()  # prime the CPU counters
+    time.sleep(1.0)
+    sample = tuner.sample()
+    current = mt.parse_config().workers
+    print(f"cpu {sample.cpu:.0%}, {sample.connections} connections, workers {current}")
+    if current is None:
+        print("no -M in ExecStart; nothing to tune", file=sys.stderr)
+        return 1
+    # One reading: no streak or cooldown, so only apply on request
+    target = current + tuner.direction(sample.cpu, sample.connections, current)
+    if target == current:
+        print("no change")
+        return 0
+    print(f"suggested workers: {target}")
+    if args.apply:
+        mt.set_workers(target)
+        print("applied")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
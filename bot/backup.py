@@ -0,0 +1,279 @@
+# comments MUST be English only
+#
+# Online backups of the bot databases plus the MTProxy unit-file secrets.
+#
+# Every run is a full snapshot. The sqlite backup API copies the database a
+# few pages at a time, which keeps it from blocking the bot, but it is not
+# incremental: SQLite has no page-level diff to build on, and the files are
+# small enough that full copies compress and rotate cheaply.
+#
+#   python -m bot.backup create
+#   python -m bot.backup list
+#   python -m bot.backup restore <archive> [--force]   (with the bot stopped)
+import fcntl
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tarfile
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from .config import Config
+from .mtproxy_manager import MtproxyManager
+
+
+logger = logging.getLogger(__name__)
+
+# Copy a few pages per step and sleep in between, so the source database is
+# only locked for very short periods and handlers never wait on the backup.
+PAGES_PER_STEP = 64
+STEP_SLEEP = 0.005  # seconds
+
+ARCHIVE_PREFIX = "mtpromonitor-"
+ARCHIVE_SUFFIX = ".tar.gz"
+SECRETS_FILE = "unit_secrets.json"
+# Held (shared) by every running bot on its database; restore needs it
+# exclusively, so it cannot swap the file under in-memory caches
+RUN_LOCK_SUFFIX = ".run.lock"
+
+
+@dataclass
+class RestoreReport:
+    archive: str
+    # Secrets in the backed-up snapshot / databases vs the live ExecStart
+    missing_in_unit: List[str] = field(default_factory=list)
+    unknown_in_unit: List[str] = field(default_factory=list)
+    restored: List[str] = field(default_factory=list)
+
+    @property
+    def consistent(self) -> bool:
+        return not self.missing_in_unit and not self.unknown_in_unit
+
+
+def copy_database(src_path: str, dst_path: str) -> None:
+    src = sqlite3.connect(src_path)
+    dst = sqlite3.connect(dst_path)
+    try:
+        src.backup(dst, pages=PAGES_PER_STEP, sleep=STEP_SLEEP)
+    finally:
+        dst.close()
+        src.close()
+
+
+def _active_secrets(db_path: str) -> List[str]:
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT secret FROM proxies WHERE is_active = 1").fetchall()
+    except sqlite3.OperationalError:
+        rows = []
+    finally:
+        conn.close()
+    return [r[0] for r in rows]
+
+
+def hold_run_lock(db_path: str):
+    # Returns the open lock file; the lock lasts as long as the process.
+    # Blocks while a restore of this database is in progress.
+    f = open(db_path + RUN_LOCK_SUFFIX, "a")
+    fcntl.flock(f, fcntl.LOCK_SH)
+    return f
+
+
+def _extract(tar: tarfile.TarFile, dest: str) -> None:
+    if hasattr(tarfile, "data_filter"):  # Python 3.12, 3.11.4, 3.10.12, ...
+        tar.extractall(dest, filter="data")
+        return
+    # Our archives only hold flat regular files; refuse anything else
+    for member in tar.getmembers():
+        name = member.name
+        if not member.isfile() or os.path.isabs(name) or name != os.path.basename(name):
+            raise RuntimeError(f"unexpected archive member: {name!r}")
+    tar.extractall(dest)
+
+
+class BackupManager:
+    def __init__(self, cfg: Config, mt: MtproxyManager, include_pybot: bool = True):
+        # include_pybot=False: another manager on this host (bot.tenants)
+        # already backs up the shared pybot store
+        self.cfg = cfg
+        self.mt = mt
+        self.include_pybot = include_pybot
+
+    def _paths(self) -> List[str]:
+        # bot/ database first, then the pybot store when it lives on this host
+        # and is not the same file (PYBOT_DB_PATH pointing at the unified store)
+        paths = [self.cfg.db_path]
+        pybot = self.cfg.pybot_db_path
+        if self.include_pybot and os.path.realpath(pybot) != os.path.realpath(paths[0]):
+            paths.append(pybot)
+        return paths
+
+    def _databases(self) -> List[str]:
+        return [p for p in self._paths() if os.path.isfile(p)]
+
+    def _snapshot_unit(self) -> dict:
+        snapshot = {"service": self.cfg.mtproxy_service, "created_at": int(time.time())}
+        try:
+            parsed = self.mt.parse_config()
+            snapshot["exec_start"] = parsed.exec_start
+            snapshot["secrets"] = parsed.secrets
+        except (FileNotFoundError, RuntimeError) as e:
+            snapshot["error"] = str(e)
+            snapshot["secrets"] = []
+        return snapshot
+
+    # ---------- create / rotate ----------
+
+    def create(self) -> str:
+        os.makedirs(self.cfg.backup_dir, exist_ok=True)
+        archive = self._new_archive_path()
+
+        with tempfile.TemporaryDirectory(prefix="mtpromonitor-backup-") as tmp:
+            names = []
+            for db_path in self._databases():
+                name = os.path.basename(db_path)
+                copy_database(db_path, os.path.join(tmp, name))
+                names.append(name)
+
+            with open(os.path.join(tmp, SECRETS_FILE), "w", encoding="utf-8") as f:
+                json.dump(self._snapshot_unit(), f, indent=2)
+            names.append(SECRETS_FILE)
+
+            # Write next to the final name and rename, so a crash never
+            # leaves a truncated archive that looks valid
+            partial = archive + ".part"
+            with tarfile.open(partial, "w:gz") as tar:
+                for name in names:
+                    tar.add(os.path.join(tmp, name), arcname=name)
+            os.replace(partial, archive)
+
+        self.rotate()
+        logger.info("Backup written to %s", archive)
+        return archive
+
+    def _new_archive_path(self) -> str:
+        # Microseconds keep names unique (and sorted) for runs in the same second
+        now = time.time()
+        micros = int(now * 1_000_000) % 1_000_000
+        while True:
+            stamp = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{micros:06d}"
+            path = os.path.join(self.cfg.backup_dir, f"{ARCHIVE_PREFIX}{stamp}{ARCHIVE_SUFFIX}")
+            if not os.path.exists(path) and not os.path.exists(path + ".part"):
+                return path
+            micros = (micros + 1) % 1_000_000
+
+    def list_backups(self) -> List[str]:
+        if not os.path.isdir(self.cfg.backup_dir):
+            return []
+        names = sorted(
+            n
+            for n in os.listdir(self.cfg.backup_dir)
+            if n.startswith(ARCHIVE_PREFIX) and n.endswith(ARCHIVE_SUFFIX)
+        )
+        return [os.path.join(self.cfg.backup_dir, n) for n in names]
+
+    def rotate(self) -> None:
+        backups = self.list_backups()
+        # BACKUP_KEEP=0 must not delete the archive that was just written
+        keep = max(1, self.cfg.backup_keep)
+        for path in backups[: max(0, len(backups) - keep)]:
+            os.remove(path)
+
+    # ---------- restore ----------
+
+    def restore(self, archive: str, force: bool = False) -> RestoreReport:
+        # The bot keeps proxies, admins and search results in memory; they
+        # would not notice a restored file, so the bot must be stopped
+        os.makedirs(os.path.dirname(self.cfg.db_path), exist_ok=True)
+        with open(self.cfg.db_path + RUN_LOCK_SUFFIX, "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise RuntimeError(
+                    f"a bot is running on {self.cfg.db_path}; stop it before restoring"
+                ) from None
+            return self._restore(archive, force)
+
+    def _restore(self, archive: str, force: bool) -> RestoreReport:
+        report = RestoreReport(archive=archive)
+        live = set(self.mt.parse_config().secrets)
+
+        with tempfile.TemporaryDirectory(prefix="mtpromonitor-restore-") as tmp:
+            with tarfile.open(archive, "r:gz") as tar:
+                _extract(tar, tmp)
+
+            expected = set()
+            main_db = os.path.join(tmp, os.path.basename(self.cfg.db_path))
+            if os.path.isfile(main_db):
+                expected.update(_active_secrets(main_db))
+            secrets_path = os.path.join(tmp, SECRETS_FILE)
+            if os.path.isfile(secrets_path):
+                with open(secrets_path, "r", encoding="utf-8") as f:
+                    expected.update(json.load(f).get("secrets", []))
+
+            report.missing_in_unit = sorted(expected - live)
+            report.unknown_in_unit = sorted(live - expected)
+            if not report.consistent and not force:
+                return report
+
+            for db_path in self._paths():
+                src = os.path.join(tmp, os.path.basename(db_path))
+                if not os.path.isfile(src):
+                    continue
+                os.makedirs(os.path.dirname(db_path), exist_ok=True)
+                # Backup API in reverse: pages are copied into the file under
+                # sqlite locking (local_service / pybot may still be running)
+                copy_database(src, db_path)
+                report.restored.append(db_path)
+
+        return report
+
+
+def format_report(report: RestoreReport) -> str:
+    lines = [f"archive: {report.archive}"]
+    if report.consistent:
+        lines.append("consistent with live ExecStart")
+    for s in report.missing_in_unit:
+        lines.append(f"missing in ExecStart: {s}")
+    for s in report.unknown_in_unit:
+        lines.append(f"not in backup: {s}")
+    if report.restored:
+        lines.append("restored: " + ", ".join(report.restored))
+    elif not report.consistent:
+        lines.append("not restored (use --force to restore anyway)")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO)
+    args = list(sys.argv[1:] if argv is None else argv)
+    cfg = Config.from_env()
+    manager = BackupManager(cfg, MtproxyManager(cfg))
+
+    if args[:1] == ["create"]:
+        print(manager.create())
+        return 0
+    if args[:1] == ["list"]:
+        for path in manager.list_backups():
+            print(path)
+        return 0
+    if args[:1] == ["restore"] and len(args) >= 2:
+        try:
+            report = manager.restore(args[1], force="--force" in args[2:])
+        except (FileNotFoundError, RuntimeError) as e:
+            # Missing archive or unit file, bot still running
+            print(str(e), file=sys.stderr)
+            return 1
+        print(format_report(report))
+        return 0 if report.restored else 1
+
+    print("Usage: python -m bot.backup create | list | restore <archive> [--force]", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
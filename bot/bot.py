@@ -1,10 +1,22 @@
 # comments MUST be English only
+import asyncio
+import datetime
+import hashlib
+import logging
 import math
-import secrets
+import os
+import re
+import sqlite3
+import subprocess
+import time
+from typing import Callable, Iterable, List, Optional, Tuple
 
 from telegram import (
     InlineKeyboardMarkup,
     InlineKeyboardButton,
+    InlineQueryResultArticle,
+    InputMediaPhoto,
+    InputTextMessageContent,
     Update,
 )
 from telegram.ext import (
@@ -12,22 +24,110 @@ from telegram.ext import (
     CommandHandler,
     CallbackQueryHandler,
     ContextTypes,
+    InlineQueryHandler,
+    MessageHandler,
+    filters,
 )
 
+from .abuse import ACTION_OFF, AbuseMonitor, format_flag
+from .admins import AdminCache
+from .audit import EVENT_CREATE, AuditLog, format_event
+from .autotune import WorkerAutotuner
+from .backup import BackupManager, hold_run_lock
 from .config import Config
 from .db import Database
 from .mtproxy_manager import MtproxyManager
-from .utils import admin_only, is_authorized
+from .persistence import SqlitePersistence
+from .profiler import parse_args as parse_profile_args, send_profile
+from .notify import PRIORITY_HIGH, NotificationQueue
+from .procnet import ConnectionMonitor
+from .qr import QrCache, QrUnavailable, safe_name as safe_qr_name, zip_export
+from .reconcile import format_report, reconcile
+from .rollup import RollupStore, add_active_counts, format_digest, period as digest_period
+from .rotation import SCOPE_ADMIN, SCOPE_ALL, SCOPE_PROXY, SecretRotator, link_messages
+from .search import ProxySearch
+from .watcher import ConfigWatcher
+from .utils import admin_only
 
 
+logger = logging.getLogger(__name__)
+
 PAGE_SIZE = 6  # proxies per page
+AUDIT_PAGE_SIZE = 10  # audit events per page
+QR_ALBUM_MAX = 10  # up to this many QR codes go out as an album, more as a zip
+DIGEST_HOUR_UTC = 5  # owner digest covers the previous UTC day(s)
+DIGEST_MAX_DAYS = 90
+# Rollup uptime asks systemctl at most this often (seconds); ticks in
+# between reuse the last answer
+UPTIME_CHECK_INTERVAL = 300
+
+# user_data key of the prompt waiting for the admin's next text message
+PENDING_KEY = "pending"
+PENDING_TAG = "tag_prefix"
+TAG_RE = re.compile(r"^[\w-]{1,16}$")
+
+# /audit filters -> single-letter prefix of the stored filter string
+AUDIT_FILTERS = {"actor": "a", "proxy": "p", "secret": "s"}
+# Filters stay in chat_data; audit:<key>:<cursor> callbacks carry only a
+# short key, since callback_data is capped at 64 bytes
+AUDIT_FILTERS_KEY = "audit_filters"
+AUDIT_FILTERS_KEEP = 20  # filters remembered per chat, oldest dropped
 
 
 class MtproxyBotApp:
-    def __init__(self, cfg: Config):
+    def __init__(
+        self,
+        cfg: Config,
+        mt: Optional[MtproxyManager] = None,
+        host_jobs: bool = True,
+    ):
+        # mt / host_jobs: bot.tenants shares one manager between several
+        # bots and runs the host-wide jobs (autotune, abuse) only once
         self.cfg = cfg
+        # Keeps `python -m bot.backup restore` away while the caches below live
+        self._run_lock = hold_run_lock(cfg.db_path)
         self.db = Database(cfg.db_path)
-        self.mt = MtproxyManager(cfg)
+        self.admins = AdminCache(cfg, self.db)
+        self.admins.seed_from_config()
+        self.registry = self.db.load_registry()
+        self.audit = AuditLog(cfg.db_path)
+        self.mt = mt or MtproxyManager(cfg, audit=self.audit)
+        # Secrets other bots on this host own; not "unknown" to reconcile
+        self.foreign_secrets: Callable[[], Iterable[str]] = tuple
+        self.host_jobs = host_jobs
+        # Other bots on this ExecStart (bot.tenants); the host_jobs bot
+        # samples /proc once per tick and hands them the sample
+        self.peers: List["MtproxyBotApp"] = []
+        # The pybot store is host-wide: only the host_jobs bot backs it up
+        self.backup = BackupManager(cfg, self.mt, include_pybot=host_jobs)
+        self.search = ProxySearch(self.db)
+        self.watcher = None  # started in post_init, needs the running loop
+        # All owner/admin alerts go through this queue, never bot.send_message
+        self.notifier = NotificationQueue()
+        # One hour of history at the default 30s interval
+        self.monitor = ConnectionMonitor(
+            self.mtproxy_ports, size=3600 // max(1, cfg.monitor_interval)
+        )
+        self.autotuner = None
+        self.abuse = None
+        if host_jobs:
+            self.autotuner = WorkerAutotuner(
+                self.mt, apply=cfg.autotune_apply, cooldown=cfg.autotune_cooldown
+            )
+            if cfg.abuse_action != ACTION_OFF:
+                self.abuse = AbuseMonitor(self.db, self.mt, self.audit, action=cfg.abuse_action)
+                self.abuse.warn_if_port_keyed()
+        self.rotator = SecretRotator(self.db, self.mt, self.audit)
+        self.qr = QrCache(cfg.qr_cache_dir)
+        self.rollups = RollupStore(cfg.db_path)
+        # (monotonic time, MTProxy active) of the last systemctl answer
+        self._service_up: Optional[Tuple[float, bool]] = None
+
+    def mtproxy_ports(self):
+        try:
+            return [self.mt.parse_config().port]
+        except (FileNotFoundError, RuntimeError):
+            return []
 
     # ---------- keyboards ----------
 
@@ -48,12 +148,12 @@ class MtproxyBotApp:
         return InlineKeyboardMarkup(keyboard)
 
     def proxy_list_keyboard(self, admin_id: int, page: int) -> InlineKeyboardMarkup:
-        total = self.db.total_proxies_for_admin(admin_id)
+        total = self.registry.count_for_admin(admin_id)
         pages = max(1, math.ceil(total / PAGE_SIZE))
         page = max(0, min(page, pages - 1))
         offset = page * PAGE_SIZE
 
-        proxies = self.db.list_proxies_for_admin(admin_id, offset=offset, limit=PAGE_SIZE)
+        proxies = self.registry.list_for_admin(admin_id, offset=offset, limit=PAGE_SIZE)
 
         rows = []
 
@@ -63,10 +163,10 @@ class MtproxyBotApp:
             sub = proxies[i : i + 3]
             btn_row = []
             for p in sub:
-                proxy_id = p["id"]
-                label = p["label"]
+                proxy_id = p.id
+                label = p.label
                 # We cannot prebuild URL without secrets; build link from secret
-                proxy_link = self.mt.build_proxy_link(p["secret"])
+                proxy_link = self.mt.build_proxy_link(p.secret)
                 btn_row.append(
                     InlineKeyboardButton(text=label, url=proxy_link)
                 )
@@ -101,7 +201,6 @@ class MtproxyBotApp:
 
     # ---------- handlers ----------
 
-    @admin_only_cfg := None  # placeholder, will be set after class definition
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.effective_user
         assert user is not None
@@ -121,14 +220,13 @@ class MtproxyBotApp:
             reply_markup=self.main_menu_keyboard(),
         )
 
-    @admin_only_cfg
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
         if not query:
             return
 
         user = query.from_user
-        admin_row = self.db.get_admin_by_telegram(user.id)
+        admin_row = self.admins.get(user.id)
         if not admin_row:
             await query.answer()
             return
@@ -147,7 +245,7 @@ class MtproxyBotApp:
         if data == "menu_proxy_list":
             await query.answer()
             kb = self.proxy_list_keyboard(admin_id=admin_id, page=0)
-            total = self.db.total_proxies_for_admin(admin_id)
+            total = self.registry.count_for_admin(admin_id)
             text = f"لیست پروکسی‌های شما (تعداد: {total}):"
             await query.edit_message_text(text, reply_markup=kb)
             return
@@ -160,7 +258,7 @@ class MtproxyBotApp:
                 page = 0
             await query.answer()
             kb = self.proxy_list_keyboard(admin_id=admin_id, page=page)
-            total = self.db.total_proxies_for_admin(admin_id)
+            total = self.registry.count_for_admin(admin_id)
             text = f"لیست پروکسی‌های شما (تعداد: {total}) - صفحه {page + 1}:"
             await query.edit_message_text(text, reply_markup=kb)
             return
@@ -168,12 +266,53 @@ class MtproxyBotApp:
         if data == "menu_new_proxy":
             await query.answer()
             # For simplicity: auto-generate secret and label
-            await self.create_new_proxy_for_admin(query, admin_row)
+            await self.create_new_proxy_for_admin(query, admin_row, context)
             return
 
-        # TODO: handle status, delete_proxy, settings
+        if data == "menu_status":
+            await query.answer()
+            text = await self.status_text()
+            kb = InlineKeyboardMarkup(
+                [
+                    [InlineKeyboardButton("🔄 Refresh", callback_data="menu_status")],
+                    [InlineKeyboardButton("🔙 Back", callback_data="back_to_main")],
+                ]
+            )
+            await query.edit_message_text(text, reply_markup=kb)
+            return
+
+        # TODO: handle delete_proxy, settings
+
+    def _service_status(self) -> str:
+        # Blocking (systemctl); every caller refreshes the rollup uptime state
+        status = self.mt.service_status()
+        self._service_up = (time.monotonic(), status == "active")
+        return status
+
+    async def status_text(self) -> str:
+        service = await asyncio.to_thread(self._service_status)
+        ports = self.mtproxy_ports()
+        sample = self.monitor.latest()
+        if sample is None:
+            sample = await asyncio.to_thread(self.monitor.sample)
+
+        lines = [
+            "ℹ️ وضعیت:",
+            "",
+            f"سرویس MTProxy: {service}",
+            f"پورت: {', '.join(str(p) for p in ports) or '-'}",
+            f"پروکسی‌های فعال: {len(self.registry)}",
+            f"اتصال‌های فعال: {sample.established}",
+            f"IP های یکتا: {sample.unique_ips}",
+            f"بیشترین اتصال (۱ ساعت): {self.monitor.peak(3600)}",
+        ]
+        q = self.notifier.stats()
+        lines.append(
+            f"صف پیام‌ها: {q.depth} (تاخیر میانگین {q.latency_avg:.1f}s، p95 {q.latency_p95:.1f}s)"
+        )
+        return "\n".join(lines)
 
-    async def create_new_proxy_for_admin(self, query, admin_row):
+    async def create_new_proxy_for_admin(self, query, admin_row, context):
         admin_id = admin_row["id"]
         tag_prefix = admin_row["tag_prefix"]
 
@@ -184,18 +323,29 @@ class MtproxyBotApp:
                 "یک تگ بنویس (مثلاً hproxy یا zproxy):\n\n"
                 "بعد از این هر پروکسی با این تگ + شماره ساخته می‌شود."
             )
-            # You should set a flag in user_data to capture next message as tag;
-            # omitted here for brevity.
+            # handle_text picks up the reply; persisted, so a restart in
+            # between does not lose the prompt
+            context.user_data[PENDING_KEY] = PENDING_TAG
+            return
+
+        if self.cfg.max_proxies and len(self.registry) >= self.cfg.max_proxies:
+            await query.edit_message_text(
+                f"⚠️ سقف پروکسی‌های این ربات ({self.cfg.max_proxies}) پر شده است.",
+                reply_markup=self.main_menu_keyboard(),
+            )
             return
 
         # Generate secret and register in MTProxy
         secret = self.mt.add_secret()  # generates if None
         # Determine next index for this admin
-        count = self.db.count_proxies_for_admin(admin_id)
+        count = self.registry.count_for_admin(admin_id)
         index = count + 1
         label = f"{tag_prefix} {index}"
 
         proxy_id = self.db.create_proxy(admin_id=admin_id, label=label, secret=secret)
+        self.audit.record(
+            EVENT_CREATE, actor=query.from_user.id, proxy_id=proxy_id, secret=secret
+        )
         link = self.mt.build_proxy_link(secret)
 
         kb = InlineKeyboardMarkup(
@@ -212,30 +362,587 @@ class MtproxyBotApp:
             reply_markup=kb,
         )
 
+    async def handle_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        # Answers to pending prompts; other text is ignored
+        pending = context.user_data.get(PENDING_KEY)
+        if pending != PENDING_TAG:
+            return
+
+        admin_row = self.admins.get(update.effective_user.id)
+        if not admin_row:
+            context.user_data.pop(PENDING_KEY, None)
+            return
+
+        tag = (update.message.text or "").strip()
+        if not TAG_RE.match(tag):
+            await update.message.reply_text(
+                "⚠️ تگ نامعتبر است. فقط حروف، عدد، _ و - (حداکثر ۱۶ کاراکتر)."
+            )
+            return
+
+        self.db.set_admin_tag(admin_row["id"], tag)
+        context.user_data.pop(PENDING_KEY, None)
+        await update.message.reply_text(
+            f"✅ تگ «{tag}» ذخیره شد.\n"
+            "حالا دوباره «New proxy» را بزن.",
+            reply_markup=self.main_menu_keyboard(),
+        )
 
-# Fix decorator now that Config exists
-cfg_for_decorator = Config.from_env()
+    # ---------- audit history (owner only) ----------
+
+    def _audit_filter_key(self, context: ContextTypes.DEFAULT_TYPE, flt: str) -> str:
+        if flt == "-":
+            return flt
+        key = hashlib.sha1(flt.encode("utf-8")).hexdigest()[:10]
+        stored = context.chat_data.setdefault(AUDIT_FILTERS_KEY, {})
+        stored.pop(key, None)
+        stored[key] = flt
+        while len(stored) > AUDIT_FILTERS_KEEP:
+            del stored[next(iter(stored))]
+        return key
+
+    def audit_page(self, flt: str, key: str, before_id):
+        # Blocking (sqlite); call off the event loop
+        kwargs = {}
+        kind, value = flt[:1], flt[1:]
+        if kind == "a" and value.lstrip("-").isdigit():
+            kwargs["actor"] = int(value)
+        elif kind == "p" and value.isdigit():
+            kwargs["proxy_id"] = int(value)
+        elif kind == "s" and value:
+            kwargs["secret"] = value
+
+        rows = self.audit.history(before_id=before_id, limit=AUDIT_PAGE_SIZE, **kwargs)
+        if not rows:
+            return "رویدادی ثبت نشده است.", None
+
+        text = "تاریخچه رویدادها:\n\n" + "\n".join(format_event(r) for r in rows)
+        kb = None
+        if len(rows) == AUDIT_PAGE_SIZE:
+            # Cursor = smallest id on this page
+            kb = InlineKeyboardMarkup(
+                [[
+                    InlineKeyboardButton(
+                        "⬅️ Older", callback_data=f"audit:{key}:{rows[-1]['id']}"
+                    )
+                ]]
+            )
+        return text, kb
 
+    async def audit_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        user = update.effective_user
+        if not user or user.id != self.cfg.owner_id:
+            return
 
-def admin_only_cfg(func):
-    return admin_only(cfg_for_decorator)(func)
+        # /audit | /audit actor <tg_id> | /audit proxy <id> | /audit secret <hex>
+        flt = "-"
+        args = context.args or []
+        if len(args) >= 2 and args[0] in AUDIT_FILTERS:
+            flt = AUDIT_FILTERS[args[0]] + args[1]
 
+        key = self._audit_filter_key(context, flt)
+        text, kb = await asyncio.to_thread(self.audit_page, flt, key, None)
+        await update.message.reply_text(text, reply_markup=kb)
 
-def main():
-    cfg = Config.from_env()
-    if not cfg.bot_token or not cfg.owner_id:
-        raise RuntimeError("BOT_TOKEN or OWNER_ID not set in .env")
+    async def handle_audit_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        query = update.callback_query
+        if not query or query.from_user.id != self.cfg.owner_id:
+            return
+        await query.answer()
+
+        parts = (query.data or "").split(":")
+        if len(parts) != 3:
+            return
+        _, key, cursor = parts
+        flt = key if key == "-" else context.chat_data.get(AUDIT_FILTERS_KEY, {}).get(key)
+        if flt is None:
+            await query.edit_message_text("این فیلتر منقضی شده؛ دوباره /audit بزنید.")
+            return
+        before_id = int(cursor) if cursor.isdigit() else None
+        text, kb = await asyncio.to_thread(self.audit_page, flt, key, before_id)
+        await query.edit_message_text(text, reply_markup=kb)
+
+    # ---------- inline search ----------
+
+    async def inline_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        # "@bot hproxy 12" -> label prefix, proxy id or secret fragment
+        query = update.inline_query
+        if not query:
+            return
+
+        user = query.from_user
+        admin_row = self.admins.get(user.id)
+        if not admin_row:
+            await query.answer([], cache_time=0, is_personal=True)
+            return
+
+        # Owner searches everything, admins only their own proxies
+        scope = None if user.id == self.cfg.owner_id else admin_row["id"]
+        rows = self.search.search(query.query, admin_id=scope)
+
+        results = []
+        for p in rows:
+            link = self.mt.build_proxy_link(p["secret"])
+            results.append(
+                InlineQueryResultArticle(
+                    id=str(p["id"]),
+                    title=p["label"],
+                    description=f"ID {p['id']} · {p['secret'][:8]}…",
+                    input_message_content=InputTextMessageContent(link),
+                    reply_markup=InlineKeyboardMarkup(
+                        [[InlineKeyboardButton(p["label"], url=link)]]
+                    ),
+                )
+            )
+        await query.answer(results, cache_time=10, is_personal=True)
+
+    # ---------- connection monitor ----------
+
+    async def monitor_job(self, context: ContextTypes.DEFAULT_TYPE):
+        # Only scheduled on the host_jobs bot. /proc/net/tcp can be large on
+        # a busy box; parse it off the loop, once for every peer.
+        sample = await asyncio.to_thread(self.monitor.sample)
+        for peer in self.peers:
+            peer.monitor.add(sample)
+        try:
+            await asyncio.to_thread(self._record_rollups, sample)
+        except (OSError, RuntimeError, sqlite3.Error):
+            logger.exception("Rollup update failed")
+        if self.abuse:
+            try:
+                flags = await asyncio.to_thread(self.abuse.check)
+            except (OSError, RuntimeError, subprocess.CalledProcessError):
+                logger.exception("Abuse check failed")
+                flags = []
+            for flag in flags:
+                self.notifier.enqueue(self.cfg.owner_id, format_flag(flag), PRIORITY_HIGH)
+        if not self.autotuner:
+            return
+        try:
+            decision = await asyncio.to_thread(self.autotuner.step, sample.established)
+        except (OSError, RuntimeError, subprocess.CalledProcessError):
+            logger.exception("Worker autotuner failed")
+            return
+        if decision:
+            verb = "تغییر کرد" if decision.applied else "پیشنهاد می‌شود (AUTOTUNE_APPLY=1 برای اعمال)"
+            self.notifier.enqueue(
+                self.cfg.owner_id,
+                f"⚙️ تعداد worker های MTProxy: {decision.current} → {decision.target} {verb}\n"
+                f"{decision.reason}",
+            )
+
+    def _record_rollups(self, sample) -> None:
+        # Blocking (sqlite, systemctl every UPTIME_CHECK_INTERVAL); monitor_job
+        # calls it off the loop
+        try:
+            mtcfg = self.mt.parse_config()
+        except (FileNotFoundError, RuntimeError):
+            return
+        # Per-secret counts only exist when a port serves a single secret
+        single = mtcfg.secrets[0] if len(mtcfg.secrets) == 1 else None
+        connections = {
+            (single if single and port == mtcfg.port else f"port:{port}"): stats.established
+            for port, stats in sample.ports.items()
+        }
+        last = self._service_up
+        if last is None or time.monotonic() - last[0] >= UPTIME_CHECK_INTERVAL:
+            self._service_status()
+        up = self._service_up[1]
+
+        # Traffic is host-wide: every bot only records keys it owns; shared
+        # port:<n> keys and unclaimed secrets stay with the host_jobs bot
+        foreign = set(self.foreign_secrets())
+        own = {k: n for k, n in connections.items() if k not in foreign}
+        self.rollups.add_sample(sample.ts, own, up, self.cfg.monitor_interval)
+        for peer in self.peers:
+            mine = {k: n for k, n in connections.items() if peer.registry.has_secret(k)}
+            peer.rollups.add_sample(sample.ts, mine, up, self.cfg.monitor_interval)
+
+    # ---------- usage digest ----------
+
+    def build_digest(self, days: int) -> str:
+        # Blocking (sqlite); rollups plus the in-memory registry only
+        digest = self.rollups.digest(*digest_period(days))
+        add_active_counts(
+            digest,
+            [(r["id"], r["display_name"] or str(r["telegram_id"])) for r in self.admins.all()],
+            self.registry.count_for_admin,
+        )
+        return format_digest(digest)
+
+    async def digest_job(self, context: ContextTypes.DEFAULT_TYPE):
+        weekly = self.cfg.digest_period == "weekly"
+        if weekly and time.gmtime().tm_wday != 0:
+            return
+        try:
+            text = await asyncio.to_thread(self.build_digest, 7 if weekly else 1)
+            await asyncio.to_thread(self.rollups.prune)
+        except sqlite3.Error:
+            logger.exception("Building the usage digest failed")
+            return
+        self.notifier.enqueue(self.cfg.owner_id, text)
+
+    async def digest_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        # /digest [days]
+        user = update.effective_user
+        if not user or user.id != self.cfg.owner_id:
+            return
+        args = context.args or []
+        days = int(args[0]) if args and args[0].isdigit() else 1
+        days = max(1, min(days, DIGEST_MAX_DAYS))
+        text = await asyncio.to_thread(self.build_digest, days)
+        await update.message.reply_text(text)
+
+    # ---------- config watcher ----------
+
+    def start_watcher(self, apps: Optional[List["MtproxyBotApp"]] = None) -> None:
+        # apps: every bot sharing self.mt (bot.tenants); one watcher for all
+        loop = asyncio.get_running_loop()
+        paths = [p for p in (self.mt.service_path(), self.cfg.mtconfig_path) if p]
+        targets = apps or [self]
+
+        def on_change(changed):
+            # Called from the watcher thread
+            for app in targets:
+                asyncio.run_coroutine_threadsafe(app.on_config_change(changed), loop)
+
+        self.watcher = ConfigWatcher(paths, on_change)
+        self.watcher.start()
+        # Reads come from memory from now on; the watcher invalidates them
+        self.mt.cache_enabled = True
+
+    def _own_write(self, path: str) -> bool:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return (st.st_ino, st.st_mtime_ns, st.st_size) == self.mt.own_write_stat
+
+    async def on_config_change(self, changed) -> None:
+        service_path = self.mt.service_path()
+        unit_changed = bool(service_path) and service_path in changed
+        if unit_changed and self._own_write(service_path):
+            # Our own add/remove; caches were already dropped by the write
+            unit_changed = False
+        self.mt.invalidate(mtconfig=self.cfg.mtconfig_path in changed)
+        # A unit change usually comes with a restart; re-check uptime next tick
+        self._service_up = None
+        if not unit_changed:
+            return
+
+        logger.info("MTProxy unit changed outside the bot; reconciling")
+        report = await asyncio.to_thread(
+            reconcile, self.db, self.mt, self.audit, self.foreign_secrets()
+        )
+        if not report.consistent and self.cfg.watch_notify:
+            self.notifier.enqueue(self.cfg.owner_id, format_report(report), PRIORITY_HIGH)
+
+    # ---------- backups ----------
+
+    async def backup_job(self, context: ContextTypes.DEFAULT_TYPE):
+        # sqlite backup runs in small page steps; keep it off the event loop
+        try:
+            await asyncio.to_thread(self.backup.create)
+        except Exception:
+            logger.exception("Scheduled backup failed")
+
+    async def backup_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        user = update.effective_user
+        if not user or user.id != self.cfg.owner_id:
+            return
+        try:
+            path = await asyncio.to_thread(self.backup.create)
+        except Exception as e:
+            await update.message.reply_text(f"❌ بکاپ با خطا مواجه شد: {e}")
+            return
+        await update.message.reply_text(f"✅ بکاپ ساخته شد:\n{path}")
+
+    # ---------- secret rotation (owner only) ----------
+
+    async def rotate_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        # /rotate <proxy_id> | /rotate admin <telegram_id> | /rotate all
+        user = update.effective_user
+        if not user or user.id != self.cfg.owner_id:
+            return
+        args = context.args or []
+        if len(args) == 1 and args[0].isdigit():
+            scope, value = SCOPE_PROXY, int(args[0])
+        elif len(args) == 2 and args[0] == "admin" and args[1].isdigit():
+            scope, value = SCOPE_ADMIN, int(args[1])
+        elif args == ["all"]:
+            scope, value = SCOPE_ALL, None
+        else:
+            await update.message.reply_text(
+                "استفاده: /rotate <proxy_id> | /rotate admin <telegram_id> | /rotate all"
+            )
+            return
+
+        grace = self.cfg.rotate_grace_hours * 3600
+        admin_chats = {row["id"]: row["telegram_id"] for row in self.admins.all()}
+
+        def rotate():
+            # sqlite reads, the unit file + restart and link building (may
+            # resolve the public IP) all stay off the event loop
+            rows = self.rotator.select(scope, value)
+            if not rows:
+                return [], {}
+            rotations = self.rotator.rotate(rows, grace, user.id)
+            return rotations, link_messages(rotations, self.mt, admin_chats, grace)
+
+        try:
+            rotations, links = await asyncio.to_thread(rotate)
+        except Exception as e:
+            logger.exception("Rotation failed")
+            await update.message.reply_text(f"❌ چرخش سکرت با خطا مواجه شد: {e}")
+            return
+        if not rotations:
+            await update.message.reply_text("⚠️ پروکسی فعالی برای چرخش پیدا نشد.")
+            return
+
+        for chat_id, messages in links.items():
+            for text in messages:
+                self.notifier.enqueue(chat_id, text)
+        await update.message.reply_text(
+            f"✅ سکرت {len(rotations)} پروکسی عوض شد.\n"
+            f"سکرت‌های قبلی تا {self.cfg.rotate_grace_hours} ساعت دیگر فعال می‌مانند."
+        )
+
+    async def rotation_job(self, context: ContextTypes.DEFAULT_TYPE):
+        try:
+            await asyncio.to_thread(self.rotator.finish_due)
+        except (OSError, RuntimeError, subprocess.CalledProcessError):
+            logger.exception("Finishing rotations failed; retrying next run")
+
+    # ---------- profiling (owner only) ----------
+
+    async def profile_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        # /profile [seconds] [cpu|wall]
+        user = update.effective_user
+        if not user or user.id != self.cfg.owner_id:
+            return
+        seconds, mode = parse_profile_args(context.args)
+        await update.message.reply_text(f"⏱ پروفایل {seconds} ثانیه‌ای ({mode}) شروع شد...")
+        context.application.create_task(
+            send_profile(context.bot, update.effective_chat.id, seconds, mode)
+        )
+
+    # ---------- QR codes ----------
+
+    async def qr_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        # /qr <proxy_id>
+        user = update.effective_user
+        admin_row = self.admins.get(user.id) if user else None
+        if not admin_row:
+            return
+        args = context.args or []
+        if len(args) != 1 or not args[0].isdigit():
+            await update.message.reply_text("استفاده: /qr <proxy_id>")
+            return
+        rec = self.registry.get(int(args[0]))
+        if not rec or (rec.admin_id != admin_row["id"] and user.id != self.cfg.owner_id):
+            await update.message.reply_text("⚠️ پروکسی پیدا نشد.")
+            return
+
+        link = await asyncio.to_thread(self.mt.build_proxy_link, rec.secret)
+        try:
+            paths = await self.qr.render([link])
+        except QrUnavailable:
+            await update.message.reply_text("⚠️ بسته qrcode روی سرور نصب نیست.")
+            return
+        data = await asyncio.to_thread(_read_bytes, paths[link])
+        await update.message.reply_photo(photo=data, caption=f"{rec.label}\n{link}")
+
+    async def qrall_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        # /qrall: QR codes of the admin's proxies (owner: /qrall all for every proxy)
+        user = update.effective_user
+        admin_row = self.admins.get(user.id) if user else None
+        if not admin_row:
+            return
+        if context.args == ["all"] and user.id == self.cfg.owner_id:
+            records = [self.registry.by_secret(s) for s in self.registry.secrets()]
+        else:
+            admin_id = admin_row["id"]
+            records = self.registry.list_for_admin(
+                admin_id, limit=self.registry.count_for_admin(admin_id)
+            )
+        if not records:
+            await update.message.reply_text("⚠️ پروکسی فعالی ندارید.")
+            return
+
+        links = await asyncio.to_thread(
+            lambda: [self.mt.build_proxy_link(r.secret) for r in records]
+        )
+        if len(records) > QR_ALBUM_MAX:
+            await update.message.reply_text(f"⏳ ساخت {len(records)} کد QR...")
+        try:
+            paths = await self.qr.render(links)
+        except QrUnavailable:
+            await update.message.reply_text("⚠️ بسته qrcode روی سرور نصب نیست.")
+            return
+
+        if len(records) <= QR_ALBUM_MAX:
+            media = []
+            for rec, link in zip(records, links):
+                data = await asyncio.to_thread(_read_bytes, paths[link])
+                media.append(InputMediaPhoto(data, caption=rec.label))
+            await update.message.reply_media_group(media)
+            return
+
+        items = [
+            (f"{safe_qr_name(rec.label)}-{rec.id}.png", paths[link])
+            for rec, link in zip(records, links)
+        ]
+        archive = await asyncio.to_thread(zip_export, items)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        await update.message.reply_document(
+            document=archive,
+            filename=f"qr-{stamp}.zip",
+            caption=f"{len(items)} کد QR",
+        )
+
+    async def qr_prune_job(self, context: ContextTypes.DEFAULT_TYPE):
+        # Drops cached PNGs of deleted/rotated secrets and of old IP/port/domain
+        def prune() -> int:
+            links = [self.mt.build_proxy_link(s) for s in self.registry.secrets()]
+            return self.qr.prune(links)
+
+        try:
+            removed = await asyncio.to_thread(prune)
+        except (OSError, RuntimeError):
+            logger.exception("QR cache prune failed")
+            return
+        if removed:
+            logger.info("Pruned %d cached QR codes", removed)
 
-    app_logic = MtproxyBotApp(cfg)
+    # ---------- admin management (owner only) ----------
 
-    application = Application.builder().token(cfg.bot_token).build()
+    async def admins_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        user = update.effective_user
+        if not user or user.id != self.cfg.owner_id:
+            return
+        lines = ["ادمین‌ها:\n"]
+        for row in self.admins.all():
+            role = "owner" if row["is_owner"] else "admin"
+            tag = row["tag_prefix"] or "-"
+            lines.append(f"{row['telegram_id']} | {row['display_name']} | {role} | tag: {tag}")
+        await update.message.reply_text("\n".join(lines))
+
+    async def add_admin_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        # /addadmin <telegram_id> [display name]
+        user = update.effective_user
+        if not user or user.id != self.cfg.owner_id:
+            return
+        args = context.args or []
+        if not args or not args[0].isdigit():
+            await update.message.reply_text("استفاده: /addadmin <telegram_id> [name]")
+            return
+        telegram_id = int(args[0])
+        name = " ".join(args[1:]) or args[0]
+        self.admins.add(telegram_id, name)
+        await update.message.reply_text(f"✅ ادمین {telegram_id} اضافه شد.")
+
+    async def del_admin_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        # /deladmin <telegram_id>
+        user = update.effective_user
+        if not user or user.id != self.cfg.owner_id:
+            return
+        args = context.args or []
+        if not args or not args[0].isdigit():
+            await update.message.reply_text("استفاده: /deladmin <telegram_id>")
+            return
+        telegram_id = int(args[0])
+        if self.admins.remove(telegram_id):
+            await update.message.reply_text(f"✅ ادمین {telegram_id} حذف شد.")
+        else:
+            await update.message.reply_text("⚠️ ادمین پیدا نشد (مالک قابل حذف نیست).")
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def build_application(app_logic: MtproxyBotApp, builder=None, watch: bool = True) -> Application:
+    # builder lets callers (tools/loadtest.py) point base_url elsewhere;
+    # watch=False when the caller runs one watcher for several bots
+    cfg = app_logic.cfg
+
+    async def post_init(app: Application) -> None:
+        app_logic.notifier.start(app.bot)
+        if watch:
+            app_logic.start_watcher()
+
+    async def post_shutdown(_: Application) -> None:
+        if app_logic.watcher:
+            app_logic.watcher.stop()
+        await app_logic.notifier.stop()
+        app_logic.qr.close()
+        app_logic.audit.close()
+
+    application = (
+        (builder or Application.builder())
+        .token(cfg.bot_token)
+        .persistence(SqlitePersistence(cfg.db_path))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
-    # Wrap handlers with admin_only via utils
-    application.add_handler(CommandHandler("start", admin_only(cfg)(app_logic.start)))
+    # Wrap handlers with admin_only via utils (cached admin set)
+    only_admins = admin_only(cfg, app_logic.admins)
+    application.add_handler(CommandHandler("start", only_admins(app_logic.start)))
+    application.add_handler(CommandHandler("audit", app_logic.audit_command))
+    application.add_handler(CommandHandler("backup", app_logic.backup_command))
+    application.add_handler(CommandHandler("rotate", app_logic.rotate_command))
+    application.add_handler(CommandHandler("profile", app_logic.profile_command))
+    application.add_handler(CommandHandler("digest", app_logic.digest_command))
+    application.add_handler(CommandHandler("qr", app_logic.qr_command))
+    application.add_handler(CommandHandler("qrall", app_logic.qrall_command))
+    application.add_handler(CommandHandler("admins", app_logic.admins_command))
+    application.add_handler(CommandHandler("addadmin", app_logic.add_admin_command))
+    application.add_handler(CommandHandler("deladmin", app_logic.del_admin_command))
     application.add_handler(
-        CallbackQueryHandler(admin_only(cfg)(app_logic.handle_callback))
+        CallbackQueryHandler(app_logic.handle_audit_callback, pattern=r"^audit:")
     )
+    application.add_handler(
+        CallbackQueryHandler(only_admins(app_logic.handle_callback))
+    )
+    application.add_handler(InlineQueryHandler(only_admins(app_logic.inline_query)))
+    application.add_handler(
+        MessageHandler(filters.TEXT & ~filters.COMMAND, only_admins(app_logic.handle_text))
+    )
+
+    if application.job_queue is not None:
+        application.job_queue.run_repeating(
+            app_logic.backup_job,
+            interval=cfg.backup_interval_hours * 3600,
+            first=60,
+        )
+        if app_logic.host_jobs:
+            application.job_queue.run_repeating(
+                app_logic.monitor_job, interval=cfg.monitor_interval, first=1
+            )
+        application.job_queue.run_repeating(app_logic.rotation_job, interval=60, first=30)
+        application.job_queue.run_repeating(app_logic.qr_prune_job, interval=86400, first=600)
+        if cfg.digest_period != "off":
+            application.job_queue.run_daily(
+                app_logic.digest_job,
+                time=datetime.time(hour=DIGEST_HOUR_UTC, tzinfo=datetime.timezone.utc),
+            )
+    else:
+        logger.warning(
+            "JobQueue not available; scheduled backups, monitor and rotations disabled"
+        )
+
+    return application
+
+
+def main():
+    cfg = Config.from_env()
+    if not cfg.bot_token or not cfg.owner_id:
+        raise RuntimeError("BOT_TOKEN or OWNER_ID not set in .env")
 
+    application = build_application(MtproxyBotApp(cfg))
     application.run_polling()
 
 
@@ -18,6 +18,21 @@ class Config:
     mtproxy_default_port: int
     mtproxy_tls_domain: str | None
     db_path: str
+    service_socket: str
+    pybot_db_path: str
+    backup_dir: str
+    backup_keep: int
+    backup_interval_hours: int
+    monitor_interval: int
+    mtconfig_path: str
+    watch_notify: bool
+    autotune_apply: bool
+    autotune_cooldown: int
+    abuse_action: str
+    rotate_grace_hours: int
+    max_proxies: int
+    qr_cache_dir: str
+    digest_period: str
 
     @classmethod
     def from_env(cls) -> "Config":
@@ -38,6 +53,36 @@ class Config:
         tls_domain = os.getenv("MTPROXY_TLS_DOMAIN", "").strip() or None
 
         db_path = os.getenv("DB_PATH") or os.path.join(BASE_DIR, "data", "mtproxy-bot.db")
+        service_socket = os.getenv("SERVICE_SOCKET") or os.path.join(
+            BASE_DIR, "data", "mtproxy-bot.sock"
+        )
+        pybot_db_path = os.getenv("PYBOT_DB_PATH") or os.path.join(
+            BASE_DIR, "data", "proxies.sqlite3"
+        )
+        # Outside the install dir: cleanup/purge flows remove data/ and the repo
+        backup_dir = os.getenv("BACKUP_DIR", "/var/backups/mtpromonitor").strip()
+        backup_keep = int(os.getenv("BACKUP_KEEP", "14") or "14")
+        backup_interval_hours = int(os.getenv("BACKUP_INTERVAL_HOURS", "6") or "6")
+        monitor_interval = int(os.getenv("MONITOR_INTERVAL", "30") or "30")
+        mtconfig_path = (
+            os.getenv("MTPROXY_CONFIG", "").strip() or "/opt/MTProxy/objs/bin/mtconfig.conf"
+        )
+        watch_notify = os.getenv("WATCH_NOTIFY", "1").strip() not in ("0", "false", "no")
+        # Worker autotuner only suggests (-M) unless explicitly allowed to restart
+        autotune_apply = os.getenv("AUTOTUNE_APPLY", "0").strip() in ("1", "true", "yes")
+        autotune_cooldown = int(os.getenv("AUTOTUNE_COOLDOWN", "1800") or "1800")
+        # Leaked-secret detector: off | alert | disable | rotate. Traffic is
+        # per port, so disable/rotate only reach a port serving one secret;
+        # with several, flags are "port:N" and only alert
+        abuse_action = os.getenv("ABUSE_ACTION", "alert").strip().lower() or "alert"
+        # Old secrets keep working this long after /rotate
+        rotate_grace_hours = int(os.getenv("ROTATE_GRACE_HOURS", "24") or "24")
+        # Active proxies this bot may create; 0 = unlimited (per tenant in bot.tenants)
+        max_proxies = int(os.getenv("MAX_PROXIES", "0") or "0")
+        qr_cache_dir = os.getenv("QR_CACHE_DIR") or os.path.join(BASE_DIR, "data", "qr")
+        # Owner usage digest: daily | weekly (Mondays) | off. "Top secrets"
+        # lists a port as one entry when it serves several secrets
+        digest_period = os.getenv("DIGEST_PERIOD", "daily").strip().lower() or "daily"
 
         return cls(
             bot_token=token,
@@ -47,4 +92,19 @@ class Config:
             mtproxy_default_port=port,
             mtproxy_tls_domain=tls_domain,
             db_path=db_path,
+            service_socket=service_socket,
+            pybot_db_path=pybot_db_path,
+            backup_dir=backup_dir,
+            backup_keep=backup_keep,
+            backup_interval_hours=backup_interval_hours,
+            monitor_interval=monitor_interval,
+            mtconfig_path=mtconfig_path,
+            watch_notify=watch_notify,
+            autotune_apply=autotune_apply,
+            autotune_cooldown=autotune_cooldown,
+            abuse_action=abuse_action,
+            rotate_grace_hours=rotate_grace_hours,
+            max_proxies=max_proxies,
+            qr_cache_dir=qr_cache_dir,
+            digest_period=digest_period,
         )
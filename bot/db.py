@@ -1,12 +1,28 @@
 # comments MUST be English only
 import sqlite3
 from contextlib import contextmanager
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
+
+from .registry import ProxyRecord, ProxyRegistry
+from .store import migrate
+
+
+def _record(row: Optional[sqlite3.Row]) -> Optional[ProxyRecord]:
+    if not row or not row["is_active"]:
+        return None
+    return ProxyRecord(row["id"], row["admin_id"], row["label"], row["secret"])
 
 
 class Database:
     def __init__(self, path: str):
         self.path = path
+        # Set by load_registry(); writes below keep it in sync
+        self.registry: Optional[ProxyRegistry] = None
+        # Bumped on every proxy write; lets caches (search) drop stale results
+        self.generation = 0
+        # Same idea for admins (AdminCache)
+        self.admin_generation = 0
+        self.has_fts = False
         self._init_db()
 
     @contextmanager
@@ -19,37 +35,14 @@ class Database:
             conn.close()
 
     def _init_db(self) -> None:
+        # Tables, indexes and FTS live in store.py as versioned migrations
         with self._conn() as conn:
-            cur = conn.cursor()
-            # Admins table
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS admins (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    telegram_id INTEGER UNIQUE NOT NULL,
-                    tag_prefix TEXT,
-                    display_name TEXT,
-                    is_owner INTEGER DEFAULT 0,
-                    is_active INTEGER DEFAULT 1,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-                """
-            )
-            # Proxies table
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS proxies (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    admin_id INTEGER NOT NULL,
-                    label TEXT NOT NULL,
-                    secret TEXT NOT NULL,
-                    is_active INTEGER DEFAULT 1,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY(admin_id) REFERENCES admins(id)
-                )
-                """
+            migrate(conn)
+            # Migration 6 leaves proxies_fts out on SQLite without trigram
+            self.has_fts = (
+                conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'proxies_fts'").fetchone()
+                is not None
             )
-            conn.commit()
 
     # ---------- Admin helpers ----------
 
@@ -72,6 +65,7 @@ class Database:
                 (telegram_id, display_name, 1 if is_owner else 0),
             )
             conn.commit()
+            self.admin_generation += 1
             return cur.lastrowid
 
     def get_admin_by_telegram(self, telegram_id: int) -> Optional[sqlite3.Row]:
@@ -91,6 +85,25 @@ class Database:
                 (tag_prefix, admin_id),
             )
             conn.commit()
+        self.admin_generation += 1
+
+    def set_admin_active(self, telegram_id: int, active: bool) -> bool:
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "UPDATE admins SET is_active = ? WHERE telegram_id = ? AND is_owner = 0",
+                (1 if active else 0, telegram_id),
+            )
+            conn.commit()
+            changed = cur.rowcount > 0
+        self.admin_generation += 1
+        return changed
+
+    def list_active_admins(self) -> List[sqlite3.Row]:
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM admins WHERE is_active = 1 ORDER BY id ASC")
+            return cur.fetchall()
 
     # ---------- Proxy helpers ----------
 
@@ -120,7 +133,11 @@ class Database:
                 (admin_id, label, secret),
             )
             conn.commit()
-            return cur.lastrowid
+            proxy_id = cur.lastrowid
+        self.generation += 1
+        if self.registry is not None:
+            self.registry.put(ProxyRecord(proxy_id, admin_id, label, secret))
+        return proxy_id
 
     def list_proxies_for_admin(
         self,
@@ -141,6 +158,29 @@ class Database:
             )
             return cur.fetchall()
 
+    def list_active_proxies(self) -> List[sqlite3.Row]:
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM proxies WHERE is_active = 1 ORDER BY id ASC")
+            return cur.fetchall()
+
+    def count_active_proxies(self) -> int:
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT COUNT(*) AS c FROM proxies WHERE is_active = 1")
+            row = cur.fetchone()
+            return int(row["c"]) if row else 0
+
+    def count_active_by_port(self, default_port: int) -> List[Tuple[int, int]]:
+        # (port, active proxies); rows without a stored port use default_port
+        with self._conn() as conn:
+            cur = conn.execute(
+                "SELECT COALESCE(port, ?) AS p, COUNT(*) AS c FROM proxies "
+                "WHERE is_active = 1 GROUP BY p ORDER BY p",
+                (default_port,),
+            )
+            return [(row["p"], row["c"]) for row in cur]
+
     def total_proxies_for_admin(self, admin_id: int) -> int:
         return self.count_proxies_for_admin(admin_id)
 
@@ -153,6 +193,15 @@ class Database:
             )
             return cur.fetchone()
 
+    def get_proxy_by_secret(self, secret: str) -> Optional[sqlite3.Row]:
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT * FROM proxies WHERE secret = ? AND is_active = 1",
+                (secret,),
+            )
+            return cur.fetchone()
+
     def deactivate_proxy(self, proxy_id: int) -> None:
         with self._conn() as conn:
             cur = conn.cursor()
@@ -161,3 +210,117 @@ class Database:
                 (proxy_id,),
             )
             conn.commit()
+        self.generation += 1
+        if self.registry is not None:
+            self.registry.discard(proxy_id)
+
+    def update_proxy_secret(self, proxy_id: int, secret: str) -> None:
+        # Rotation: same row, id and label; only the secret changes
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "UPDATE proxies SET secret = ? WHERE id = ?",
+                (secret, proxy_id),
+            )
+            conn.commit()
+        self.generation += 1
+        if self.registry is not None:
+            rec = _record(self.get_proxy_by_id(proxy_id))
+            if rec:
+                self.registry.put(rec)
+
+    # ---------- Rotation grace periods ----------
+
+    def add_pending_rotations(self, rows: List[tuple]) -> None:
+        # rows: (proxy_id, old_secret, new_secret, started_at, expires_at)
+        with self._conn() as conn:
+            conn.executemany(
+                """
+                INSERT INTO pending_rotations
+                    (proxy_id, old_secret, new_secret, started_at, expires_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            conn.commit()
+
+    def due_rotations(self, now: int) -> List[sqlite3.Row]:
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT * FROM pending_rotations WHERE expires_at <= ? ORDER BY id ASC",
+                (now,),
+            )
+            return cur.fetchall()
+
+    def pending_old_secrets(self) -> List[str]:
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT old_secret FROM pending_rotations")
+            return [r["old_secret"] for r in cur.fetchall()]
+
+    def delete_pending_rotations(self, ids: List[int]) -> None:
+        with self._conn() as conn:
+            conn.executemany(
+                "DELETE FROM pending_rotations WHERE id = ?", [(i,) for i in ids]
+            )
+            conn.commit()
+
+    # ---------- Search ----------
+
+    def search_proxies_by_label(
+        self,
+        prefix: str,
+        admin_id: Optional[int] = None,
+        limit: int = 20,
+    ) -> List[sqlite3.Row]:
+        pattern = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        sql = "SELECT * FROM proxies WHERE label LIKE ? ESCAPE '\\' AND is_active = 1"
+        params: list = [pattern]
+        if admin_id is not None:
+            sql += " AND admin_id = ?"
+            params.append(admin_id)
+        sql += " ORDER BY label COLLATE NOCASE, id LIMIT ?"
+        params.append(limit)
+        with self._conn() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def search_proxies_by_secret(
+        self,
+        fragment: str,
+        admin_id: Optional[int] = None,
+        limit: int = 20,
+    ) -> List[sqlite3.Row]:
+        params: list
+        if self.has_fts and len(fragment) >= 3:
+            sql = (
+                "SELECT p.* FROM proxies_fts f JOIN proxies p ON p.id = f.rowid "
+                "WHERE proxies_fts MATCH ? AND p.is_active = 1"
+            )
+            # Quoted phrase: trigram tokenizer turns it into a substring match
+            params = ['"' + fragment.replace('"', '""') + '"']
+        else:
+            sql = "SELECT p.* FROM proxies p WHERE instr(p.secret, ?) > 0 AND p.is_active = 1"
+            params = [fragment]
+        if admin_id is not None:
+            sql += " AND p.admin_id = ?"
+            params.append(admin_id)
+        sql += " ORDER BY p.id LIMIT ?"
+        params.append(limit)
+        with self._conn() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    # ---------- Registry ----------
+
+    def load_registry(self) -> ProxyRegistry:
+        registry = ProxyRegistry(
+            fetch_by_id=lambda proxy_id: _record(self.get_proxy_by_id(proxy_id)),
+            fetch_by_secret=lambda secret: _record(self.get_proxy_by_secret(secret)),
+        )
+        with self._conn() as conn:
+            cur = conn.execute(
+                "SELECT id, admin_id, label, secret FROM proxies WHERE is_active = 1"
+            )
+            registry.load(ProxyRecord(*row) for row in cur)
+        self.registry = registry
+        return registry
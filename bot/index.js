@@ -2,6 +2,7 @@
 // MTPro Monitor Bot - Telegram interface
 
 const fs = require("fs");
+const net = require("net");
 const path = require("path");
 const { execFile } = require("child_process");
 const TelegramBot = require("node-telegram-bot-api");
@@ -17,6 +18,17 @@ if (!TOKEN || TOKEN === "TOKEN_HERE") {
 const ROOT_DIR = path.join(__dirname, "..");
 const SCRIPTS_DIR = path.join(ROOT_DIR, "scripts");
 const DATA_DIR = path.join(ROOT_DIR, "data");
+// Unix socket of the Python local service (python -m bot.local_service)
+const SERVICE_SOCKET =
+  process.env.SERVICE_SOCKET || path.join(DATA_DIR, "mtproxy-bot.sock");
+
+// Script name -> local service command (same output contract)
+const SERVICE_COMMANDS = {
+  "list_proxies.sh": "list",
+  "stats_proxy.sh": "stats",
+  "new_proxy.sh": "create",
+  "delete_proxy.sh": "delete",
+};
 
 if (!fs.existsSync(DATA_DIR)) {
   fs.mkdirSync(DATA_DIR, { recursive: true });
@@ -41,6 +53,50 @@ function runScript(scriptName, args = []) {
   });
 }
 
+// Ask the local service; resolves null when it is not running so the
+// caller can fall back to the shell script.
+function callService(command, args = []) {
+  return new Promise((resolve, reject) => {
+    const sock = net.createConnection(SERVICE_SOCKET);
+    const chunks = [];
+    let connected = false;
+
+    sock.setTimeout(60000);
+    sock.on("connect", () => {
+      connected = true;
+      sock.write([command, ...args].join(" ") + "\n");
+    });
+    sock.on("data", (chunk) => chunks.push(chunk));
+    sock.on("timeout", () => sock.destroy(new Error("local service timeout")));
+    sock.on("error", (error) => {
+      if (!connected) {
+        resolve(null);
+        return;
+      }
+      reject(error);
+    });
+    sock.on("end", () => {
+      const out = Buffer.concat(chunks).toString("utf8").trim();
+      if (out.startsWith("ERROR")) {
+        reject(new Error(`Local service ${command} failed: ${out}`));
+        return;
+      }
+      resolve(out);
+    });
+  });
+}
+
+// actor (chat id) is only passed to the local service, for its audit log
+async function runAction(scriptName, args = [], actor = null) {
+  const command = SERVICE_COMMANDS[scriptName];
+  if (command) {
+    const serviceArgs = actor === null ? args : [...args, String(actor)];
+    const out = await callService(command, serviceArgs);
+    if (out !== null) return out;
+  }
+  return runScript(scriptName, args);
+}
+
 function getDefaultPort() {
   const file = path.join(DATA_DIR, "default_port");
   try {
@@ -116,8 +172,60 @@ function proxyToText(p) {
 
 const bot = new TelegramBot(TOKEN, { polling: true });
 
-// Simple per-chat state (e.g. waiting for delete ID)
-const chatState = new Map();
+// Simple per-chat state (e.g. waiting for delete ID). Kept in memory and
+// written behind to data/chat_state.json, so pending prompts survive
+// pm2/systemd restarts without a disk write per message.
+const CHAT_STATE_FILE = path.join(DATA_DIR, "chat_state.json");
+const CHAT_STATE_FLUSH_MS = 1000;
+const chatState = loadChatState();
+let chatStateTimer = null;
+
+function loadChatState() {
+  try {
+    const raw = JSON.parse(fs.readFileSync(CHAT_STATE_FILE, "utf8"));
+    return new Map(Object.entries(raw).map(([k, v]) => [Number(k), v]));
+  } catch (err) {
+    if (err.code !== "ENOENT") {
+      console.error("Ignoring unreadable chat state:", err.message);
+    }
+    return new Map();
+  }
+}
+
+function writeChatState() {
+  if (chatStateTimer) {
+    clearTimeout(chatStateTimer);
+    chatStateTimer = null;
+  }
+  // Write + rename: a crash mid-write never leaves a truncated file
+  const tmp = CHAT_STATE_FILE + ".tmp";
+  try {
+    fs.writeFileSync(tmp, JSON.stringify(Object.fromEntries(chatState)));
+    fs.renameSync(tmp, CHAT_STATE_FILE);
+  } catch (err) {
+    console.error("Failed to save chat state:", err.message);
+  }
+}
+
+function setChatState(chatId, state) {
+  if (state) {
+    chatState.set(chatId, state);
+  } else {
+    chatState.delete(chatId);
+  }
+  if (!chatStateTimer) {
+    chatStateTimer = setTimeout(writeChatState, CHAT_STATE_FLUSH_MS);
+  }
+}
+
+for (const signal of ["SIGINT", "SIGTERM"]) {
+  process.once(signal, () => {
+    if (chatStateTimer) {
+      writeChatState();
+    }
+    process.exit(0);
+  });
+}
 
 function mainMenuKeyboard() {
   return {
@@ -193,7 +301,7 @@ bot.on("message", async (msg) => {
 
   if (state && state.mode === "await_delete_id") {
     const id = text;
-    chatState.delete(chatId);
+    setChatState(chatId, null);
     await doDeleteProxy(chatId, id);
     return;
   }
@@ -214,7 +322,7 @@ bot.on("message", async (msg) => {
   }
 
   if (text === "🗑 حذف پروکسی") {
-    chatState.set(chatId, { mode: "await_delete_id" });
+    setChatState(chatId, { mode: "await_delete_id" });
     bot.sendMessage(
       chatId,
       "لطفاً شناسه پروکسی‌ای که می‌خواهی حذف شود را ارسال کن (🆔 در لیست پروکسی‌ها).",
@@ -248,7 +356,7 @@ async function handleCreateProxy(chatId) {
       { parse_mode: "HTML" }
     );
 
-    const out = await runScript("new_proxy.sh");
+    const out = await runAction("new_proxy.sh", [], chatId);
     const p = parseProxyLine(out);
 
     if (!p) {
@@ -288,7 +396,7 @@ async function handleCreateProxy(chatId) {
 
 async function handleListProxies(chatId) {
   try {
-    const out = await runScript("list_proxies.sh");
+    const out = await runAction("list_proxies.sh");
     if (!out || /^NO_PROXIES/i.test(out.trim())) {
       await bot.sendMessage(
         chatId,
@@ -349,7 +457,7 @@ async function handleStatus(chatId) {
   const defaultPort = getDefaultPort();
 
   try {
-    const out = await runScript("stats_proxy.sh");
+    const out = await runAction("stats_proxy.sh");
     const lines = out.split("\n").map((l) => l.trim());
 
     let proxyCount = null;
@@ -412,7 +520,7 @@ async function handleStatus(chatId) {
 
 async function doDeleteProxy(chatId, id) {
   try {
-    const out = await runScript("delete_proxy.sh", [id]);
+    const out = await runAction("delete_proxy.sh", [id], chatId);
     const trimmed = (out || "").trim();
 
     if (trimmed.startsWith("DELETED")) {
@@ -0,0 +1,193 @@
+# comments MUST be English only
+#
+# Long-running local service used by bot/index.js instead of forking the
+# shell scripts in scripts/ for every Telegram action.
+#
+# Protocol (one request per connection, over a Unix socket):
+#   client -> "<command> [args...]\n"
+#   server -> output with the same contract as the matching script, then EOF
+#
+#   list            -> list_proxies.sh   (ID SECRET PORT NAME TG_LINK | NO_PROXIES)
+#   stats           -> stats_proxy.sh    (PROXY_COUNT= / BY_PORT= / ...)
+#   create [ACTOR]  -> new_proxy.sh      (ID SECRET PORT NAME TG_LINK)
+#   delete <ID> [ACTOR] -> delete_proxy.sh (DELETED <ID> | NOT_FOUND <ID>)
+#
+# Answers come from the unified store (bot/store.py), the same one the
+# scripts read through `python3 -m bot.store`, so IDs match either way.
+#
+# ACTOR is the Telegram chat id that asked for the change (audit log only).
+#
+# Failures are reported as a single "ERROR <message>" line.
+import asyncio
+import logging
+import os
+from typing import List, Optional
+
+from .audit import EVENT_CREATE, EVENT_DELETE, AuditLog
+from .config import BASE_DIR, Config
+from .db import Database
+from .mtproxy_manager import MtproxyManager
+from .procnet import listening_ports
+from .store import adopt_proxies_txt
+
+
+logger = logging.getLogger(__name__)
+
+MAX_REQUEST_BYTES = 1024
+
+
+class LocalService:
+    def __init__(self, cfg: Config):
+        self.cfg = cfg
+        self.db = Database(cfg.db_path)
+        # Same store as the scripts' bot.store shims; a leftover
+        # data/proxies.txt is folded into it before the first request
+        adopt_proxies_txt(cfg, os.path.join(BASE_DIR, "data"))
+        self.audit = AuditLog(cfg.db_path)
+        self.mt = MtproxyManager(cfg, audit=self.audit)
+        # Unit file edits + restarts must not interleave
+        self._write_lock = asyncio.Lock()
+
+    # ---------- helpers ----------
+
+    def _owner_admin_id(self) -> int:
+        return self.db.ensure_admin(
+            telegram_id=self.cfg.owner_id,
+            display_name="owner",
+            is_owner=True,
+        )
+
+    def _proxy_line(self, row, port: int) -> str:
+        # Same line as `bot.store list`: a stored port wins over the unit's
+        link = self.mt.build_proxy_link(row["secret"])
+        return f"{row['id']} {row['secret']} {row['port'] or port} {row['label']} {link}"
+
+    # ---------- commands ----------
+
+    def cmd_list(self) -> str:
+        rows = self.db.list_active_proxies()
+        if not rows:
+            return "NO_PROXIES"
+        port = self.mt.parse_config().port
+        return "\n".join(self._proxy_line(r, port) for r in rows)
+
+    def cmd_stats(self) -> str:
+        try:
+            default_port = self.mt.parse_config().port
+        except (FileNotFoundError, RuntimeError):
+            default_port = self.cfg.mtproxy_default_port
+        counts = self.db.count_active_by_port(default_port)
+        count = sum(c for _, c in counts)
+        by_port = ",".join(f"{p}:{c}" for p, c in counts)
+        ports = ",".join(str(p) for p in listening_ports())
+        return "\n".join(
+            [
+                f"PROXY_COUNT={count}",
+                f"BY_PORT={by_port}",
+                f"MTPROXY_SERVICE={self.mt.service_status()}",
+                f"LISTENING_PORTS={ports}",
+            ]
+        )
+
+    def cmd_create(self, actor: Optional[int] = None) -> str:
+        admin_id = self._owner_admin_id()
+        admin_row = self.db.get_admin_by_telegram(self.cfg.owner_id)
+        tag_prefix = admin_row["tag_prefix"] if admin_row else None
+
+        secret = self.mt.add_secret()
+        index = self.db.count_proxies_for_admin(admin_id) + 1
+        label = f"{tag_prefix} {index}" if tag_prefix else f"proxy-{index}"
+        proxy_id = self.db.create_proxy(admin_id=admin_id, label=label, secret=secret)
+        self.audit.record(EVENT_CREATE, actor=actor, proxy_id=proxy_id, secret=secret)
+
+        row = self.db.get_proxy_by_id(proxy_id)
+        return self._proxy_line(row, self.mt.parse_config().port)
+
+    def cmd_delete(self, target: str, actor: Optional[int] = None) -> str:
+        if not target.isdigit():
+            return f"NOT_FOUND {target}"
+        row = self.db.get_proxy_by_id(int(target))
+        if not row or not row["is_active"]:
+            return f"NOT_FOUND {target}"
+        self.mt.remove_secret(row["secret"])
+        self.db.deactivate_proxy(row["id"])
+        self.audit.record(
+            EVENT_DELETE, actor=actor, proxy_id=row["id"], secret=row["secret"]
+        )
+        return f"DELETED {target}"
+
+    async def dispatch(self, args: List[str]) -> str:
+        if not args:
+            return "ERROR empty request"
+        cmd, rest = args[0], args[1:]
+
+        # Everything below touches sqlite/systemctl; keep it off the loop
+        if cmd == "list":
+            return await asyncio.to_thread(self.cmd_list)
+        if cmd == "stats":
+            return await asyncio.to_thread(self.cmd_stats)
+        if cmd == "create":
+            actor = _parse_actor(rest[0:1])
+            async with self._write_lock:
+                return await asyncio.to_thread(self.cmd_create, actor)
+        if cmd == "delete":
+            if not rest:
+                return "ERROR usage: delete <PROXY_ID> [ACTOR]"
+            actor = _parse_actor(rest[1:2])
+            async with self._write_lock:
+                return await asyncio.to_thread(self.cmd_delete, rest[0], actor)
+        return f"ERROR unknown command: {cmd}"
+
+    # ---------- socket server ----------
+
+    async def _handle_client(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        try:
+            raw = await reader.readline()
+            request = raw[:MAX_REQUEST_BYTES].decode("utf-8", "replace").split()
+            try:
+                out = await self.dispatch(request)
+            except Exception as e:  # report instead of dropping the connection
+                logger.exception("Request %r failed", request)
+                out = f"ERROR {e}".replace("\n", " ")
+            writer.write(out.encode("utf-8") + b"\n")
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve_forever(self) -> None:
+        path = self.cfg.service_socket
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.unlink(path)
+
+        server = await asyncio.start_unix_server(self._handle_client, path=path)
+        # Only root / the bot user may talk to the service
+        os.chmod(path, 0o660)
+        logger.info("Local service listening on %s", path)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.audit.close()
+
+
+def _parse_actor(args: List[str]) -> Optional[int]:
+    if args and args[0].lstrip("-").isdigit():
+        return int(args[0])
+    return None
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    cfg = Config.from_env()
+    if not cfg.owner_id:
+        raise RuntimeError("OWNER_ID not set in .env")
+    asyncio.run(LocalService(cfg).serve_forever())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 # comments MUST be English only
+import functools
 import os
 import re
 import secrets
 import subprocess
-from dataclasses import dataclass
-from typing import List, Optional
+import threading
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, List, Optional
 
+from .audit import EVENT_RESTART, AuditLog
 from .config import Config
 
 
@@ -15,6 +18,21 @@ SERVICE_PATHS = [
     "/usr/lib/systemd/system",
 ]
 
+# Hirbod's GenerateService (scripts/create_proxy.sh) rebuilds ExecStart
+# from this mtconfig.conf array, so it must always list the -S secrets
+SECRET_ARY_RE = re.compile(r"^SECRET_ARY=.*$", re.MULTILINE)
+
+
+def _serialized(method):
+    # Unit file read-modify-write + restart, one at a time per manager (the
+    # bot, local service threads and tenants of bot.tenants share it)
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._write_lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
 
 @dataclass
 class MtproxyConfig:
@@ -22,11 +40,36 @@ class MtproxyConfig:
     secrets: List[str]
     port: int
     tls_domain: Optional[str]
+    workers: Optional[int] = None  # -M; None when ExecStart has none
 
 
 class MtproxyManager:
-    def __init__(self, cfg: Config):
+    def __init__(self, cfg: Config, audit: Optional[AuditLog] = None):
         self.cfg = cfg
+        self.audit = audit
+        # Public IP does not change while we run; avoid forking curl per link
+        self._public_ip: Optional[str] = None
+        # Parsed unit / mtconfig.conf and built links. Only used while a
+        # ConfigWatcher keeps them fresh (cache_enabled); see invalidate().
+        self.cache_enabled = False
+        self._cache_lock = threading.Lock()
+        self._config: Optional[MtproxyConfig] = None
+        self._mtconfig: Optional[Dict[str, str]] = None
+        self._links: Dict[str, str] = {}
+        # (inode, mtime_ns, size) after our own last write; lets the watcher
+        # tell our edits from external ones
+        self.own_write_stat: Optional[tuple] = None
+        self._write_lock = threading.RLock()
+
+    def invalidate(self, mtconfig: bool = True) -> None:
+        # Unit file changes affect the parsed config and links; mtconfig.conf
+        # changes may also move PUBLIC_IP
+        with self._cache_lock:
+            self._config = None
+            self._links = {}
+            if mtconfig:
+                self._mtconfig = None
+                self._public_ip = None
 
     def _find_service_file(self) -> str:
         for base in SERVICE_PATHS:
@@ -35,6 +78,12 @@ class MtproxyManager:
                 return path
         raise FileNotFoundError(f"Service file for {self.cfg.mtproxy_service} not found")
 
+    def service_path(self) -> Optional[str]:
+        try:
+            return self._find_service_file()
+        except FileNotFoundError:
+            return None
+
     def _read_service_file(self) -> str:
         path = self._find_service_file()
         with open(path, "r", encoding="utf-8") as f:
@@ -44,8 +93,41 @@ class MtproxyManager:
         path = self._find_service_file()
         with open(path, "w", encoding="utf-8") as f:
             f.write(content)
+        st = os.stat(path)
+        self.own_write_stat = (st.st_ino, st.st_mtime_ns, st.st_size)
+        self.invalidate(mtconfig=False)
 
     def parse_config(self) -> MtproxyConfig:
+        cached = self._config
+        if self.cache_enabled and cached is not None:
+            # Callers mutate .secrets; never hand out the cached list
+            return replace(cached, secrets=list(cached.secrets))
+
+        config = self._parse_service_file()
+        if self.cache_enabled:
+            with self._cache_lock:
+                self._config = config
+            return replace(config, secrets=list(config.secrets))
+        return config
+
+    def read_mtconfig(self) -> Dict[str, str]:
+        # KEY=VALUE lines of Hirbod's mtconfig.conf (a sourced bash file)
+        if self.cache_enabled and self._mtconfig is not None:
+            return self._mtconfig
+        values: Dict[str, str] = {}
+        try:
+            with open(self.cfg.mtconfig_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    m = re.match(r"^([A-Z_]+)=(.*)$", line.strip())
+                    if m:
+                        values[m.group(1)] = m.group(2).strip().strip("\"'")
+        except OSError:
+            pass
+        if self.cache_enabled:
+            self._mtconfig = values
+        return values
+
+    def _parse_service_file(self) -> MtproxyConfig:
         content = self._read_service_file()
         match = re.search(r"^ExecStart=(.+)$", content, re.MULTILINE)
         if not match:
@@ -64,11 +146,14 @@ class MtproxyManager:
         if m_tls:
             tls_domain = m_tls.group(1)
 
+        m_workers = re.search(r"-M\s+(\d+)", exec_start)
+
         return MtproxyConfig(
             exec_start=exec_start,
             secrets=secrets,
             port=port,
             tls_domain=tls_domain,
+            workers=int(m_workers.group(1)) if m_workers else None,
         )
 
     def _build_exec_start(self, cfg: MtproxyConfig) -> str:
@@ -91,33 +176,108 @@ class MtproxyManager:
         )
         self._write_service_file(content)
 
+    def _write_secret_ary(self, secrets_list: List[str]) -> None:
+        path = self.cfg.mtconfig_path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return  # not installed by Hirbod's script; nothing to keep in sync
+        line = f"SECRET_ARY=({' '.join(secrets_list)})"
+        if SECRET_ARY_RE.search(content):
+            content = SECRET_ARY_RE.sub(lambda _: line, content, count=1)
+        else:
+            content = f"{content.rstrip()}\n{line}\n"
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp, path)
+        with self._cache_lock:
+            self._mtconfig = None
+
+    def _set_secrets(self, cfg: MtproxyConfig, secrets_list: List[str]) -> None:
+        # ExecStart and SECRET_ARY together, under the caller's _write_lock
+        cfg.secrets = secrets_list
+        self._replace_exec_start(self._build_exec_start(cfg))
+        self._write_secret_ary(secrets_list)
+
     def restart_service(self) -> None:
         subprocess.run(["systemctl", "daemon-reload"], check=True)
         subprocess.run(["systemctl", "restart", self.cfg.mtproxy_service], check=True)
+        if self.audit:
+            self.audit.record(EVENT_RESTART, detail=self.cfg.mtproxy_service)
+
+    def service_status(self) -> str:
+        # Same values as scripts/stats_proxy.sh: active | inactive | not_found
+        try:
+            self._find_service_file()
+        except FileNotFoundError:
+            return "not_found"
+        try:
+            proc = subprocess.run(
+                ["systemctl", "is-active", "--quiet", self.cfg.mtproxy_service],
+                check=False,
+            )
+        except FileNotFoundError:
+            return "not_found"
+        return "active" if proc.returncode == 0 else "inactive"
 
     def generate_secret(self) -> str:
         return secrets.token_hex(16)
 
+    @_serialized
     def add_secret(self, secret: Optional[str] = None) -> str:
         cfg = self.parse_config()
         if not secret:
             secret = self.generate_secret()
         if secret not in cfg.secrets:
-            cfg.secrets.append(secret)
-            new_exec = self._build_exec_start(cfg)
-            self._replace_exec_start(new_exec)
+            self._set_secrets(cfg, cfg.secrets + [secret])
             self.restart_service()
         return secret
 
+    @_serialized
     def remove_secret(self, secret: str) -> None:
         cfg = self.parse_config()
         if secret in cfg.secrets:
-            cfg.secrets = [s for s in cfg.secrets if s != secret]
-            new_exec = self._build_exec_start(cfg)
-            self._replace_exec_start(new_exec)
+            self._set_secrets(cfg, [s for s in cfg.secrets if s != secret])
             self.restart_service()
 
+    @_serialized
+    def apply_secret_changes(self, remove: Iterable[str] = (), add: Iterable[str] = ()) -> bool:
+        # Several removals/additions in one ExecStart rewrite and one restart
+        cfg = self.parse_config()
+        drop = set(remove)
+        secrets_list = [s for s in cfg.secrets if s not in drop]
+        for s in add:
+            if s not in secrets_list:
+                secrets_list.append(s)
+        if secrets_list == cfg.secrets:
+            return False
+        self._set_secrets(cfg, secrets_list)
+        self.restart_service()
+        return True
+
+    @_serialized
+    def set_workers(self, workers: int) -> None:
+        # Rewrites -M in ExecStart (appends it when missing) and restarts
+        cfg = self.parse_config()
+        if cfg.workers == workers:
+            return
+        if cfg.workers is None:
+            new_exec = f"{cfg.exec_start.rstrip()} -M {workers}"
+        else:
+            new_exec = re.sub(r"-M\s+\d+", f"-M {workers}", cfg.exec_start, count=1)
+        self._replace_exec_start(new_exec)
+        self.restart_service()
+
     def get_public_ip(self) -> str:
+        if self._public_ip:
+            return self._public_ip
+        # Installer already knows it (NAT setups set it explicitly)
+        public_ip = self.read_mtconfig().get("PUBLIC_IP", "")
+        if public_ip and public_ip != "YOUR_IP":
+            self._public_ip = public_ip
+            return public_ip
         try:
             out = subprocess.check_output(
                 ["curl", "-4", "-s", "https://api.ipify.org"],
@@ -126,12 +286,23 @@ class MtproxyManager:
             )
             ip = out.strip()
             if ip:
+                self._public_ip = ip
                 return ip
         except Exception:
             pass
         return "127.0.0.1"
 
     def build_proxy_link(self, secret: str) -> str:
+        link = self._links.get(secret) if self.cache_enabled else None
+        if link:
+            return link
+        link = self._build_proxy_link(secret)
+        if self.cache_enabled:
+            with self._cache_lock:
+                self._links[secret] = link
+        return link
+
+    def _build_proxy_link(self, secret: str) -> str:
         cfg = self.parse_config()
         server_ip = self.get_public_ip()
         port = cfg.port
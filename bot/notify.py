@@ -0,0 +1,241 @@
+# comments MUST be English only
+#
+# Outbound queue for owner/admin alerts (expiry, quota, reconcile, health).
+# Messages are rate limited globally and per chat, several pending alerts
+# for the same chat are merged into one message, and 429 RetryAfter pauses
+# the whole queue instead of failing the caller.
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+
+from telegram import Bot
+from telegram.error import RetryAfter
+
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# Telegram limits: ~30 msg/s overall, ~1 msg/s per chat
+GLOBAL_RATE = 25.0
+GLOBAL_BURST = 25
+CHAT_RATE = 1.0
+CHAT_BURST = 3
+
+MAX_MESSAGE_LEN = 4096
+MAX_ATTEMPTS = 3
+LATENCY_WINDOW = 500  # last N sends used for latency stats
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        # Returns 0 when a token was taken, else seconds until one is free
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+@dataclass
+class _Pending:
+    text: str
+    priority: int
+    enqueued: float
+    attempts: int = 0
+
+
+@dataclass
+class QueueStats:
+    depth: int
+    sent: int
+    merged: int
+    dropped: int
+    failed: int  # send attempts that raised (retried until MAX_ATTEMPTS)
+    retry_after: int
+    latency_avg: float
+    latency_p95: float
+
+
+def _first_message(batch: List["_Pending"]) -> Tuple[str, int]:
+    # Merge as many leading alerts as fit in one message; returns the text
+    # and how many items it covers (always at least one)
+    text = batch[0].text[:MAX_MESSAGE_LEN]
+    count = 1
+    for p in batch[1:]:
+        candidate = f"{text}\n\n{p.text}"
+        if len(candidate) > MAX_MESSAGE_LEN:
+            break
+        text = candidate
+        count += 1
+    return text, count
+
+
+class NotificationQueue:
+    def __init__(self):
+        self.bot: Optional[Bot] = None
+        self._global = TokenBucket(GLOBAL_RATE, GLOBAL_BURST)
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._pending: Dict[int, List[_Pending]] = {}
+        # (priority, seq, chat_id); a chat may appear more than once, stale
+        # entries are skipped when its pending list is already empty
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+
+        self._sent = 0
+        self._merged = 0
+        self._dropped = 0
+        self._failed = 0
+        self._retry_after = 0
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    # ---------- public API ----------
+
+    def start(self, bot: Bot) -> None:
+        self.bot = bot
+        self._task = asyncio.create_task(self._run(), name="notification-queue")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def enqueue(self, chat_id: int, text: str, priority: int = PRIORITY_NORMAL) -> None:
+        pending = self._pending.setdefault(chat_id, [])
+        pending.append(_Pending(text=text, priority=priority, enqueued=time.monotonic()))
+        self._schedule(chat_id, priority)
+
+    def stats(self) -> QueueStats:
+        lat = sorted(self._latencies)
+        avg = sum(lat) / len(lat) if lat else 0.0
+        p95 = lat[min(len(lat) - 1, int(len(lat) * 0.95))] if lat else 0.0
+        return QueueStats(
+            depth=sum(len(p) for p in self._pending.values()),
+            sent=self._sent,
+            merged=self._merged,
+            dropped=self._dropped,
+            failed=self._failed,
+            retry_after=self._retry_after,
+            latency_avg=avg,
+            latency_p95=p95,
+        )
+
+    # ---------- internals ----------
+
+    def _schedule(self, chat_id: int, priority: int) -> None:
+        heapq.heappush(self._heap, (priority, next(self._seq), chat_id))
+        self._wakeup.set()
+
+    def _schedule_later(self, delay: float, chat_id: int, priority: int) -> None:
+        asyncio.get_running_loop().call_later(delay, self._schedule, chat_id, priority)
+
+    async def _run(self) -> None:
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+
+            priority, _, chat_id = heapq.heappop(self._heap)
+            pending = self._pending.get(chat_id)
+            if not pending:
+                continue
+
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = self._chat_buckets[chat_id] = TokenBucket(CHAT_RATE, CHAT_BURST)
+            wait = bucket.take()
+            if wait:
+                # Other chats go first; this one comes back when allowed
+                self._schedule_later(wait, chat_id, priority)
+                continue
+
+            wait = self._global.take()
+            while wait:
+                await asyncio.sleep(wait)
+                wait = self._global.take()
+
+            try:
+                await self._send(chat_id, priority)
+            except Exception:
+                # Never let one alert kill the task; its items are lost
+                logger.exception("Notification queue failed for %s", chat_id)
+                self._failed += 1
+
+    async def _send(self, chat_id: int, priority: int) -> None:
+        batch = self._pending.pop(chat_id, [])
+        # Highest priority first, then arrival order
+        batch.sort(key=lambda p: (p.priority, p.enqueued))
+        text, count = _first_message(batch)
+        sent_items, leftover = batch[:count], batch[count:]
+
+        try:
+            await self.bot.send_message(chat_id, text)
+        except RetryAfter as e:
+            self._retry_after += 1
+            delay = e.retry_after
+            if hasattr(delay, "total_seconds"):
+                delay = delay.total_seconds()
+            # Flood control applies to the whole bot, not just this chat
+            self._paused_until = time.monotonic() + float(delay)
+            self._requeue(chat_id, batch, priority)
+            return
+        except Exception:
+            # Not only TelegramError: httpx / bugs must not end the queue
+            logger.exception("Sending notification to %s failed", chat_id)
+            self._failed += 1
+            retry = [p for p in sent_items if p.attempts + 1 < MAX_ATTEMPTS]
+            for p in retry:
+                p.attempts += 1
+            self._dropped += len(sent_items) - len(retry)
+            self._requeue(chat_id, retry + leftover, priority, delay=1.0)
+            return
+
+        now = time.monotonic()
+        self._sent += 1
+        self._merged += len(sent_items) - 1
+        self._latencies.append(now - min(p.enqueued for p in sent_items))
+        if leftover:
+            self._requeue(chat_id, leftover, priority)
+
+    def _requeue(
+        self,
+        chat_id: int,
+        items: List[_Pending],
+        priority: int,
+        delay: float = 0.0,
+    ) -> None:
+        if not items:
+            return
+        # Keep them ahead of anything that arrived meanwhile
+        self._pending[chat_id] = items + self._pending.get(chat_id, [])
+        if delay:
+            self._schedule_later(delay, chat_id, priority)
+        else:
+            self._schedule(chat_id, priority)
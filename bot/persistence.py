@@ -0,0 +1,203 @@
+# comments MUST be English only
+#
+# sqlite persistence for python-telegram-bot: user_data, chat_data,
+# bot_data, callback_data and ConversationHandler states. Pending prompts
+# (e.g. "send your tag") live in user_data and survive restarts.
+#
+# update_*() only snapshots the value into an in-memory dirty map; a writer
+# thread upserts the whole map in one transaction every FLUSH_INTERVAL, so
+# handlers never wait on sqlite and many changes to one chat collapse into
+# a single row write.
+import json
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from .store import migrate
+
+
+logger = logging.getLogger(__name__)
+
+# PTB hands us changed user/chat data this often (seconds); it only copies
+# dicts in memory, the sqlite write happens on the writer thread
+UPDATE_INTERVAL = 5
+FLUSH_INTERVAL = 2.0  # seconds between batched writes
+BATCH_SIZE = 200  # write early when this many rows are dirty
+
+KIND_USER = "user"
+KIND_CHAT = "chat"
+KIND_BOT = "bot"
+KIND_CALLBACK = "callback"
+CONV_PREFIX = "conv:"
+
+# (kind, key) -> pickled value, or None for a deleted row
+DirtyMap = Dict[Tuple[str, str], Optional[bytes]]
+
+
+def _conv_key(key: Tuple) -> str:
+    return json.dumps(list(key))
+
+
+class SqlitePersistence(BasePersistence):
+    def __init__(
+        self,
+        path: str,
+        store_data: Optional[PersistenceInput] = None,
+        update_interval: float = UPDATE_INTERVAL,
+    ):
+        super().__init__(store_data=store_data, update_interval=update_interval)
+        self.path = path
+        self._init_db()
+        self._dirty: DirtyMap = {}
+        self._dirty_lock = threading.Lock()
+        # Held across swap + write so an older batch can never land after
+        # a newer one (writer thread vs flush())
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self.rows_written = 0
+        self.batches = 0
+        self._writer = threading.Thread(
+            target=self._writer_loop, name="state-writer", daemon=True
+        )
+        self._writer.start()
+
+    @contextmanager
+    def _conn(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self) -> None:
+        # bot_state is a store.py migration
+        with self._conn() as conn:
+            migrate(conn)
+
+    # ---------- write-behind ----------
+
+    def _mark(self, kind: str, key: str, value: Any) -> None:
+        # Pickle now: PTB keeps mutating the same dict after we return
+        blob = None if value is None else pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._dirty_lock:
+            self._dirty[(kind, key)] = blob
+            full = len(self._dirty) >= BATCH_SIZE
+        if full:
+            self._wakeup.set()
+
+    def _write_dirty(self) -> None:
+        with self._write_lock:
+            with self._dirty_lock:
+                batch, self._dirty = self._dirty, {}
+            if not batch:
+                return
+            now = int(time.time())
+            upserts = [(k, key, blob, now) for (k, key), blob in batch.items() if blob is not None]
+            deletes = [(k, key) for (k, key), blob in batch.items() if blob is None]
+            try:
+                with self._conn() as conn:
+                    conn.executemany(
+                        """
+                        INSERT OR REPLACE INTO bot_state (kind, key, data, updated_at)
+                        VALUES (?, ?, ?, ?)
+                        """,
+                        upserts,
+                    )
+                    conn.executemany(
+                        "DELETE FROM bot_state WHERE kind = ? AND key = ?", deletes
+                    )
+                    conn.commit()
+            except sqlite3.Error:
+                logger.exception("Failed to persist %d state rows; will retry", len(batch))
+                with self._dirty_lock:
+                    # Keep anything newer that arrived meanwhile
+                    for k, blob in batch.items():
+                        self._dirty.setdefault(k, blob)
+                return
+            self.rows_written += len(batch)
+            self.batches += 1
+
+    def _writer_loop(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.wait(FLUSH_INTERVAL)
+            self._wakeup.clear()
+            self._write_dirty()
+
+    # ---------- reading (once, at startup) ----------
+
+    def _load(self, kind: str) -> List[Tuple[str, Any]]:
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT key, data FROM bot_state WHERE kind = ?", (kind,)
+            ).fetchall()
+        out = []
+        for key, data in rows:
+            try:
+                out.append((key, pickle.loads(data)))
+            except Exception:
+                logger.warning("Dropping unreadable %s state for %s", kind, key)
+        return out
+
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        return {int(k): v for k, v in self._load(KIND_USER)}
+
+    async def get_chat_data(self) -> Dict[int, Dict[Any, Any]]:
+        return {int(k): v for k, v in self._load(KIND_CHAT)}
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        rows = self._load(KIND_BOT)
+        return rows[0][1] if rows else {}
+
+    async def get_callback_data(self) -> Optional[Any]:
+        rows = self._load(KIND_CALLBACK)
+        return rows[0][1] if rows else None
+
+    async def get_conversations(self, name: str) -> Dict[Tuple, object]:
+        return {tuple(json.loads(k)): v for k, v in self._load(CONV_PREFIX + name)}
+
+    # ---------- updates from PTB ----------
+
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]) -> None:
+        self._mark(KIND_USER, str(user_id), data)
+
+    async def update_chat_data(self, chat_id: int, data: Dict[Any, Any]) -> None:
+        self._mark(KIND_CHAT, str(chat_id), data)
+
+    async def update_bot_data(self, data: Dict[Any, Any]) -> None:
+        self._mark(KIND_BOT, "", data)
+
+    async def update_callback_data(self, data: Any) -> None:
+        self._mark(KIND_CALLBACK, "", data)
+
+    async def update_conversation(self, name: str, key: Tuple, new_state: Optional[object]) -> None:
+        self._mark(CONV_PREFIX + name, _conv_key(key), new_state)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._mark(KIND_USER, str(user_id), None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._mark(KIND_CHAT, str(chat_id), None)
+
+    # Only this process writes bot_state; nothing to refresh
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def flush(self) -> None:
+        # Called by Application on shutdown, after the final update_*() round
+        self._stop.set()
+        self._wakeup.set()
+        self._writer.join(timeout=5.0)
+        self._write_dirty()
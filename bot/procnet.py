@@ -0,0 +1,146 @@
+# comments MUST be English only
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+PROC_NET_DIR = "/proc/net"
+
+# Socket states as printed in /proc/net/tcp (hex)
+TCP_ESTABLISHED = "01"
+TCP_LISTEN = "0A"
+# Unconnected UDP sockets show up as state 07 (TCP_CLOSE)
+UDP_UNCONNECTED = "07"
+
+
+def _iter_socket_lines(path: str) -> Iterable[List[str]]:
+    try:
+        f = open(path, "r", encoding="ascii", errors="replace")
+    except OSError:
+        return
+    with f:
+        next(f, None)  # header
+        for line in f:
+            fields = line.split()
+            if len(fields) >= 4:
+                yield fields
+
+
+def _port_of(address: str) -> int:
+    # "0100007F:1F90" -> 8080
+    return int(address.rsplit(":", 1)[1], 16)
+
+
+def listening_ports(proc_dir: str = PROC_NET_DIR) -> List[int]:
+    ports: Set[int] = set()
+    for name, state in (
+        ("tcp", TCP_LISTEN),
+        ("tcp6", TCP_LISTEN),
+        ("udp", UDP_UNCONNECTED),
+        ("udp6", UDP_UNCONNECTED),
+    ):
+        for fields in _iter_socket_lines(os.path.join(proc_dir, name)):
+            if fields[3] == state:
+                ports.add(_port_of(fields[1]))
+    return sorted(ports)
+
+
+# ---------- per-port client connections ----------
+
+# IPv4-mapped IPv6 address prefix as printed in /proc/net/tcp6
+_V4_MAPPED = "0000000000000000FFFF0000"
+
+
+@dataclass
+class PortStats:
+    established: int = 0
+    unique_ips: int = 0
+
+
+@dataclass
+class Sample:
+    ts: float
+    ports: Dict[int, PortStats] = field(default_factory=dict)
+
+    @property
+    def established(self) -> int:
+        return sum(p.established for p in self.ports.values())
+
+    @property
+    def unique_ips(self) -> int:
+        return sum(p.unique_ips for p in self.ports.values())
+
+
+def _client_key(remote: str) -> str:
+    # Hex address without port; same client over tcp and tcp6 counts once
+    addr = remote[:-5]
+    if len(addr) == 32 and addr.startswith(_V4_MAPPED):
+        return addr[24:]
+    return addr
+
+
+def iter_established(ports: Iterable[int], proc_dir: str = PROC_NET_DIR) -> Iterator[Tuple[int, str]]:
+    # (local port, client key) per established socket, in one streaming pass
+    # over tcp + tcp6. Ports are compared as the ":XXXX" hex suffix of the
+    # local address, so non-matching lines are never converted to ints.
+    suffixes = {f":{p:04X}": p for p in ports}
+    for name in ("tcp", "tcp6"):
+        try:
+            f = open(os.path.join(proc_dir, name), "r", encoding="ascii", errors="replace")
+        except OSError:
+            continue
+        with f:
+            next(f, None)  # header
+            for line in f:
+                fields = line.split(None, 4)
+                if len(fields) < 4 or fields[3] != TCP_ESTABLISHED:
+                    continue
+                port = suffixes.get(fields[1][-5:])
+                if port is not None:
+                    yield port, _client_key(fields[2])
+
+
+def count_connections(ports: Iterable[int], proc_dir: str = PROC_NET_DIR) -> Dict[int, PortStats]:
+    ports = list(ports)
+    clients: Dict[int, Set[str]] = {p: set() for p in ports}
+    stats: Dict[int, PortStats] = {p: PortStats() for p in ports}
+    for port, client in iter_established(ports, proc_dir):
+        stats[port].established += 1
+        clients[port].add(client)
+
+    for port, ips in clients.items():
+        stats[port].unique_ips = len(ips)
+    return stats
+
+
+class ConnectionMonitor:
+    # Samples established connections / unique client IPs for the MTProxy
+    # ports into a fixed-size ring buffer (oldest samples fall off).
+
+    def __init__(
+        self,
+        ports: Callable[[], Iterable[int]],
+        size: int = 120,
+        proc_dir: str = PROC_NET_DIR,
+    ):
+        self.ports = ports
+        self.proc_dir = proc_dir
+        self.samples: Deque[Sample] = deque(maxlen=size)
+
+    def sample(self) -> Sample:
+        s = Sample(ts=time.time(), ports=count_connections(self.ports(), self.proc_dir))
+        self.samples.append(s)
+        return s
+
+    def add(self, sample: Sample) -> None:
+        # A sample taken by another monitor on the same ports
+        self.samples.append(sample)
+
+    def latest(self) -> Optional[Sample]:
+        return self.samples[-1] if self.samples else None
+
+    def peak(self, seconds: float) -> int:
+        since = time.time() - seconds
+        return max((s.established for s in self.samples if s.ts >= since), default=0)
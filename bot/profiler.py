@@ -0,0 +1,160 @@
+# comments MUST be English only
+#
+# In-process sampling profiler for the running bot (owner /profile N).
+# A SIGPROF (CPU time) or SIGALRM (wall time) interval timer interrupts the
+# main thread, where the event loop runs; the handler records the current
+# Python stack. Nothing is traced between samples, so overhead is a few
+# microseconds per sample. Pure stdlib; used by bot/ and pybot/.
+import asyncio
+import os
+import signal
+import sys
+import time
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+
+MODE_CPU = "cpu"  # ITIMER_PROF: only while the process burns CPU
+MODE_WALL = "wall"  # ITIMER_REAL: also shows time blocked in syscalls
+INTERVAL = 0.01  # seconds between samples (100 Hz)
+MAX_SECONDS = 120
+MAX_DEPTH = 64
+TOP_N = 25
+
+_TIMERS = {
+    MODE_CPU: (signal.ITIMER_PROF, signal.SIGPROF),
+    MODE_WALL: (signal.ITIMER_REAL, signal.SIGALRM),
+}
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+class SamplingProfiler:
+    _active: Optional["SamplingProfiler"] = None  # one interval timer per process
+
+    def __init__(self, mode: str = MODE_CPU, interval: float = INTERVAL):
+        if mode not in _TIMERS:
+            raise ValueError(f"unknown profiler mode: {mode}")
+        self.mode = mode
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started = 0.0
+        self.elapsed = 0.0
+        self._labels: Dict[object, str] = {}
+        self._previous = None
+
+    # ---------- sampling ----------
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            path = code.co_filename
+            for prefix in sorted(sys.path, key=len, reverse=True):
+                if prefix and path.startswith(prefix + os.sep):
+                    path = path[len(prefix) + 1 :]
+                    break
+            # ";" separates frames in the collapsed format
+            label = f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ":")
+            self._labels[code] = label
+        return label
+
+    def _handler(self, signum, frame) -> None:
+        stack = []
+        while frame is not None and len(stack) < MAX_DEPTH:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        self.stacks[tuple(stack)] += 1
+        self.samples += 1
+
+    def start(self) -> None:
+        # Must run on the main thread (signal handlers live there)
+        if SamplingProfiler._active is not None:
+            raise ProfilerBusy("a profile is already running")
+        which, signum = _TIMERS[self.mode]
+        SamplingProfiler._active = self
+        self._previous = signal.signal(signum, self._handler)
+        self.started = time.monotonic()
+        signal.setitimer(which, self.interval, self.interval)
+
+    def stop(self) -> None:
+        which, signum = _TIMERS[self.mode]
+        signal.setitimer(which, 0, 0)
+        signal.signal(signum, self._previous or signal.SIG_DFL)
+        self.elapsed = time.monotonic() - self.started
+        SamplingProfiler._active = None
+
+    # ---------- reports ----------
+
+    def collapsed(self) -> str:
+        # Brendan Gregg's folded format, input for flamegraph.pl / speedscope
+        return "\n".join(
+            f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()
+        )
+
+    def top(self, n: int = TOP_N) -> Tuple[list, list]:
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            if stack:
+                self_counts[stack[-1]] += count
+            for label in set(stack):
+                total_counts[label] += count
+        return self_counts.most_common(n), total_counts.most_common(n)
+
+    def report(self) -> str:
+        total = max(1, self.samples)
+        own, cumulative = self.top()
+        lines = [
+            f"# mode={self.mode} interval={self.interval * 1000:.0f}ms "
+            f"duration={self.elapsed:.1f}s samples={self.samples}",
+            "",
+            "# top functions by self samples",
+        ]
+        lines += [f"{c:7d} {100 * c / total:5.1f}%  {label}" for label, c in own]
+        lines += ["", "# top functions by cumulative samples"]
+        lines += [f"{c:7d} {100 * c / total:5.1f}%  {label}" for label, c in cumulative]
+        lines += ["", "# collapsed stacks", self.collapsed()]
+        return "\n".join(lines) + "\n"
+
+
+async def profile_for(seconds: float, mode: str = MODE_CPU) -> SamplingProfiler:
+    # Samples whatever the loop runs while this coroutine sleeps
+    profiler = SamplingProfiler(mode)
+    profiler.start()
+    try:
+        await asyncio.sleep(min(max(seconds, 1), MAX_SECONDS))
+    finally:
+        profiler.stop()
+    return profiler
+
+
+async def send_profile(bot, chat_id: int, seconds: float, mode: str = MODE_CPU) -> None:
+    # Run as a background task: with sequential update processing, awaiting
+    # this inside the handler would stall the very updates being profiled
+    try:
+        profiler = await profile_for(seconds, mode)
+    except ProfilerBusy:
+        await bot.send_message(chat_id, "⚠️ profile already running")
+        return
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    await bot.send_document(
+        chat_id,
+        document=profiler.report().encode(),
+        filename=f"profile-{stamp}-{mode}.txt",
+        caption=f"{mode}, {profiler.elapsed:.0f}s, {profiler.samples} samples",
+    )
+
+
+def parse_args(args) -> Tuple[int, str]:
+    # "/profile [seconds] [cpu|wall]" -> (seconds, mode)
+    seconds, mode = 10, MODE_CPU
+    for arg in args or []:
+        if arg.isdigit():
+            seconds = min(int(arg), MAX_SECONDS)
+        elif arg in _TIMERS:
+            mode = arg
+    return seconds, mode
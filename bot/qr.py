@@ -0,0 +1,185 @@
+# comments MUST be English only
+#
+# QR codes for proxy links. Rendering is CPU-bound pure Python, so it runs
+# in a process pool and never on the event loop; PNGs are cached on disk
+# under sha256(link). The link embeds IP, port and TLS domain, so any of
+# those changing yields a new key and the old entries are simply never hit
+# again; prune() deletes them.
+#
+# Needs the optional "qrcode[pil]" package.
+#
+#   python -m bot.qr prune   (the base cache plus every tenant's, see bot.tenants)
+import asyncio
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import qrcode
+except ImportError:  # optional; QrCache.available tells the handlers
+    qrcode = None
+
+
+logger = logging.getLogger(__name__)
+
+POOL_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+BATCH_SIZE = 16  # links per pool task; keeps pickling overhead per PNG small
+BOX_SIZE = 8  # pixels per QR module
+BORDER = 2  # quiet zone, in modules
+
+
+class QrUnavailable(RuntimeError):
+    pass
+
+
+def _render_batch(links: List[str]) -> List[bytes]:
+    # Runs in a pool worker
+    out = []
+    for link in links:
+        qr = qrcode.QRCode(box_size=BOX_SIZE, border=BORDER)
+        qr.add_data(link)
+        qr.make(fit=True)
+        buf = io.BytesIO()
+        qr.make_image().save(buf, format="PNG")
+        out.append(buf.getvalue())
+    return out
+
+
+def cache_key(link: str) -> str:
+    return hashlib.sha256(link.encode("utf-8")).hexdigest()
+
+
+class QrCache:
+    def __init__(self, cache_dir: str, workers: int = POOL_WORKERS):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def available(self) -> bool:
+        return qrcode is not None
+
+    def path_for(self, link: str) -> str:
+        key = cache_key(link)
+        return os.path.join(self.cache_dir, key[:2], f"{key}.png")
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # forkserver: the bot has threads (watcher, persistence writer)
+            # that a plain fork would copy in whatever state they are in
+            methods = multiprocessing.get_all_start_methods()
+            ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+        return self._pool
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _store(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    async def render(self, links: Iterable[str]) -> Dict[str, str]:
+        # link -> PNG path; only cache misses go to the pool
+        if not self.available:
+            raise QrUnavailable("qrcode package is not installed")
+        paths = {link: self.path_for(link) for link in links}
+        missing = await asyncio.to_thread(
+            lambda: [link for link, path in paths.items() if not os.path.exists(path)]
+        )
+        if missing:
+            loop = asyncio.get_running_loop()
+            pool = self._executor()
+            batches = [missing[i : i + BATCH_SIZE] for i in range(0, len(missing), BATCH_SIZE)]
+            results = await asyncio.gather(
+                *(loop.run_in_executor(pool, _render_batch, batch) for batch in batches)
+            )
+            for batch, images in zip(batches, results):
+                for link, data in zip(batch, images):
+                    await asyncio.to_thread(self._store, paths[link], data)
+            logger.info("Rendered %d QR codes (%d cached)", len(missing), len(paths) - len(missing))
+        return paths
+
+    def prune(self, live_links: Iterable[str]) -> int:
+        # Blocking; drops entries whose link no longer exists (secret gone,
+        # IP/port/domain changed) and leftovers of interrupted writes
+        keep = {f"{cache_key(link)}.png" for link in live_links}
+        removed = 0
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        for sub in os.scandir(self.cache_dir):
+            # Only the <xx> shards; tenant caches live in sibling subdirectories
+            if not (sub.is_dir() and _is_shard(sub.name)):
+                continue
+            for entry in os.scandir(sub.path):
+                # Directories: a tenant whose name looks like a shard
+                if entry.name in keep or not entry.is_file():
+                    continue
+                try:
+                    os.unlink(entry.path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+def _is_shard(name: str) -> bool:
+    return len(name) == 2 and all(c in "0123456789abcdef" for c in name)
+
+
+def zip_export(items: List[Tuple[str, str]]) -> bytes:
+    # (file name inside the zip, PNG path) -> zip bytes; PNGs are already
+    # compressed, so store them as-is
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_STORED) as zf:
+        for name, path in items:
+            zf.write(path, arcname=name)
+    return buf.getvalue()
+
+
+def safe_name(label: str) -> str:
+    name = "".join(c if c.isalnum() or c in "-_" else "_" for c in label).strip("_")
+    return name or "proxy"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    if args != ["prune"]:
+        print("Usage: python -m bot.qr prune", file=sys.stderr)
+        return 2
+
+    from .config import Config
+    from .db import Database
+    from .mtproxy_manager import MtproxyManager
+    from .tenants import TENANTS_FILE, load_tenants
+
+    base = Config.from_env()
+    mt = MtproxyManager(base)
+    # Each cache is pruned against its own bot's proxies
+    cfgs = [base]
+    if os.path.isfile(TENANTS_FILE):
+        cfgs += load_tenants(TENANTS_FILE, base)
+    removed = 0
+    for cfg in cfgs:
+        if not os.path.isdir(cfg.qr_cache_dir):
+            continue
+        secrets = Database(cfg.db_path).load_registry().secrets()
+        removed += QrCache(cfg.qr_cache_dir).prune(mt.build_proxy_link(s) for s in secrets)
+    print(f"removed {removed} cached QR codes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+# comments MUST be English only
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional
+
+from .audit import EVENT_RECONCILE, AuditLog
+from .db import Database
+from .mtproxy_manager import MtproxyManager
+
+
+@dataclass
+class ReconcileReport:
+    # Active in the DB but not in ExecStart (proxy links are dead)
+    missing_in_unit: List[str] = field(default_factory=list)
+    # In ExecStart but unknown to the DB (added by scripts / by hand)
+    unknown_in_unit: List[str] = field(default_factory=list)
+
+    @property
+    def consistent(self) -> bool:
+        return not self.missing_in_unit and not self.unknown_in_unit
+
+
+def reconcile(
+    db: Database,
+    mt: MtproxyManager,
+    audit: Optional[AuditLog] = None,
+    foreign: Iterable[str] = (),
+) -> ReconcileReport:
+    # Report only; deciding which side is right is left to the owner.
+    # foreign: secrets owned by other bots sharing this MTProxy (bot.tenants)
+    live = set(mt.parse_config().secrets)
+    if db.registry is not None:
+        known = set(db.registry.secrets())
+    else:
+        known = {row["secret"] for row in db.list_active_proxies()}
+    # Rotated-out secrets stay in ExecStart until their grace period ends
+    rotating = set(db.pending_old_secrets())
+
+    report = ReconcileReport(
+        missing_in_unit=sorted(known - live),
+        unknown_in_unit=sorted(live - known - rotating - set(foreign)),
+    )
+    if audit and not report.consistent:
+        audit.record(
+            EVENT_RECONCILE,
+            detail=f"missing={len(report.missing_in_unit)} "
+            f"unknown={len(report.unknown_in_unit)}",
+        )
+    return report
+
+
+def format_report(report: ReconcileReport) -> str:
+    if report.consistent:
+        return "✅ دیتابیس و سرویس MTProxy هماهنگ هستند."
+    lines = ["⚠️ ناهماهنگی بین دیتابیس و سرویس MTProxy:"]
+    for s in report.missing_in_unit:
+        lines.append(f"در ExecStart نیست: {s}")
+    for s in report.unknown_in_unit:
+        lines.append(f"در دیتابیس نیست: {s}")
+    return "\n".join(lines)
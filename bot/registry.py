@@ -0,0 +1,152 @@
+# comments MUST be English only
+import bisect
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+class ProxyRecord:
+    # Only active proxies are kept; __slots__ keeps 100k records small
+    __slots__ = ("id", "admin_id", "label", "secret")
+
+    def __init__(self, id: int, admin_id: int, label: str, secret: str):
+        self.id = id
+        self.admin_id = admin_id
+        self.label = label
+        self.secret = secret
+
+    def __repr__(self) -> str:
+        return f"ProxyRecord(id={self.id}, admin_id={self.admin_id}, label={self.label!r})"
+
+
+Fetcher = Callable[..., Optional[ProxyRecord]]
+
+
+class ProxyRegistry:
+    # In-memory view of active proxies with hash indexes by id, secret and
+    # owner. Kept in sync by write-through from the store (put/discard);
+    # misses fall through to the optional fetchers. Label search stays in
+    # sqlite (bot/search.py).
+
+    def __init__(
+        self,
+        fetch_by_id: Optional[Fetcher] = None,
+        fetch_by_secret: Optional[Fetcher] = None,
+    ):
+        self.fetch_by_id = fetch_by_id
+        self.fetch_by_secret = fetch_by_secret
+        self._by_id: Dict[int, ProxyRecord] = {}
+        self._by_secret: Dict[str, ProxyRecord] = {}
+        self._by_admin: Dict[int, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    # ---------- write-through ----------
+
+    def load(self, records: Iterable[ProxyRecord]) -> None:
+        # Bulk load: build indexes in one go instead of N insorts
+        for rec in records:
+            self._by_id[rec.id] = rec
+            self._by_secret[rec.secret] = rec
+            self._by_admin.setdefault(rec.admin_id, []).append(rec.id)
+        for ids in self._by_admin.values():
+            ids.sort()
+
+    def put(self, rec: ProxyRecord) -> None:
+        if rec.id in self._by_id:
+            self.discard(rec.id)
+        self._by_id[rec.id] = rec
+        self._by_secret[rec.secret] = rec
+        bisect.insort(self._by_admin.setdefault(rec.admin_id, []), rec.id)
+
+    def discard(self, proxy_id: int) -> None:
+        rec = self._by_id.pop(proxy_id, None)
+        if not rec:
+            return
+        if self._by_secret.get(rec.secret) is rec:
+            del self._by_secret[rec.secret]
+
+        ids = self._by_admin.get(rec.admin_id, [])
+        i = bisect.bisect_left(ids, proxy_id)
+        if i < len(ids) and ids[i] == proxy_id:
+            del ids[i]
+        if not ids:
+            self._by_admin.pop(rec.admin_id, None)
+
+    # ---------- lookups ----------
+
+    def get(self, proxy_id: int) -> Optional[ProxyRecord]:
+        rec = self._by_id.get(proxy_id)
+        if rec is None and self.fetch_by_id:
+            rec = self.fetch_by_id(proxy_id)
+            if rec:
+                self.put(rec)
+        return rec
+
+    def by_secret(self, secret: str) -> Optional[ProxyRecord]:
+        rec = self._by_secret.get(secret)
+        if rec is None and self.fetch_by_secret:
+            rec = self.fetch_by_secret(secret)
+            if rec:
+                self.put(rec)
+        return rec
+
+    def has_secret(self, secret: str) -> bool:
+        return secret in self._by_secret
+
+    def secrets(self) -> List[str]:
+        return list(self._by_secret)
+
+    def count_for_admin(self, admin_id: int) -> int:
+        return len(self._by_admin.get(admin_id, ()))
+
+    def list_for_admin(
+        self,
+        admin_id: int,
+        offset: int = 0,
+        limit: int = 6,
+    ) -> List[ProxyRecord]:
+        ids = self._by_admin.get(admin_id, [])
+        return [self._by_id[i] for i in ids[offset : offset + limit]]
+
+
+def _bench(n: int = 100_000) -> None:
+    # python -m bot.registry : memory / lookup numbers for n proxies
+    import random
+    import secrets as _secrets
+    import time
+    import tracemalloc
+
+    tracemalloc.start()
+    records = [
+        ProxyRecord(i, i % 50, f"tag{i % 50} {i}", _secrets.token_hex(16))
+        for i in range(1, n + 1)
+    ]
+    reg = ProxyRegistry()
+    t0 = time.perf_counter()
+    reg.load(records)
+    load_s = time.perf_counter() - t0
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ids = [random.randint(1, n) for _ in range(100_000)]
+    keys = [records[i - 1].secret for i in ids]
+
+    t0 = time.perf_counter()
+    for i in ids:
+        reg.get(i)
+    by_id_ns = (time.perf_counter() - t0) / len(ids) * 1e9
+
+    t0 = time.perf_counter()
+    for k in keys:
+        reg.by_secret(k)
+    by_secret_ns = (time.perf_counter() - t0) / len(keys) * 1e9
+
+    print(f"proxies          : {n}")
+    print(f"memory (records + indexes): {current / 1024 / 1024:.1f} MiB")
+    print(f"load             : {load_s * 1000:.0f} ms")
+    print(f"get by id        : {by_id_ns:.0f} ns")
+    print(f"get by secret    : {by_secret_ns:.0f} ns")
+
+
+if __name__ == "__main__":
+    _bench()
@@ -0,0 +1,265 @@
+# comments MUST be English only
+#
+# Daily rollups behind the owner digests (tables: store.py migration 3).
+# They are updated as data arrives: proxy lifecycle counts inside the audit
+# writer's batch transaction, connection and uptime samples from the bot's
+# monitor job. A digest then reads a few rows per day and never scans
+# audit_log or the proxies table.
+#
+# "Traffic" is connection-seconds: MTProxy exposes neither bytes nor
+# connections per secret, so a port is attributed to a secret only when it
+# serves a single one (same rule as bot/abuse.py).
+#
+#   python -m bot.rollup [days]
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+TOP_N = 5  # secrets listed in a digest
+KEEP_DAYS = 400  # rollup rows older than this are dropped
+
+# (day, proxy_id) -> [created, expired, rotated]
+AdminDeltas = Dict[Tuple[str, int], List[int]]
+
+
+def day_of(ts: float) -> str:
+    # UTC, like audit timestamps and sqlite's date(ts, 'unixepoch')
+    return time.strftime("%Y-%m-%d", time.gmtime(ts))
+
+
+def add_admin_events(conn: sqlite3.Connection, deltas: AdminDeltas) -> None:
+    # Runs in the caller's transaction; the owning admin is looked up by
+    # primary key, so a batch costs one indexed read per touched proxy
+    conn.executemany(
+        """
+        INSERT INTO rollup_admin_daily (day, admin_id, created, expired, rotated)
+        SELECT ?, admin_id, ?, ?, ? FROM proxies WHERE id = ?
+        ON CONFLICT (day, admin_id) DO UPDATE SET
+            created = created + excluded.created,
+            expired = expired + excluded.expired,
+            rotated = rotated + excluded.rotated
+        """,
+        [(day, c, e, r, proxy_id) for (day, proxy_id), (c, e, r) in deltas.items()],
+    )
+
+
+@dataclass
+class AdminDigest:
+    admin_id: int
+    name: str
+    created: int = 0
+    expired: int = 0
+    rotated: int = 0
+    active: int = 0
+
+
+@dataclass
+class TrafficDigest:
+    key: str
+    label: Optional[str]
+    conn_seconds: int
+    peak: int
+
+
+@dataclass
+class Digest:
+    start_day: str
+    end_day: str
+    uptime: Optional[float]  # None without samples
+    admins: Dict[int, AdminDigest] = field(default_factory=dict)
+    top: List[TrafficDigest] = field(default_factory=list)
+
+    @property
+    def created(self) -> int:
+        return sum(a.created for a in self.admins.values())
+
+    @property
+    def expired(self) -> int:
+        return sum(a.expired for a in self.admins.values())
+
+    @property
+    def rotated(self) -> int:
+        return sum(a.rotated for a in self.admins.values())
+
+
+class RollupStore:
+    def __init__(self, path: str):
+        # Tables come from store.migrate(), run by Database / AuditLog
+        self.path = path
+
+    @contextmanager
+    def _conn(self):
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def add_sample(
+        self,
+        ts: float,
+        connections: Dict[str, int],
+        up: bool,
+        interval: int,
+    ) -> None:
+        # One monitor tick: `interval` seconds of `connections` per key
+        day = day_of(ts)
+        with self._conn() as conn:
+            conn.executemany(
+                """
+                INSERT INTO rollup_traffic_daily (day, key, conn_seconds, peak)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (day, key) DO UPDATE SET
+                    conn_seconds = conn_seconds + excluded.conn_seconds,
+                    peak = MAX(peak, excluded.peak)
+                """,
+                [(day, key, n * interval, n) for key, n in connections.items()],
+            )
+            conn.execute(
+                """
+                INSERT INTO rollup_uptime_daily (day, up_seconds, total_seconds)
+                VALUES (?, ?, ?)
+                ON CONFLICT (day) DO UPDATE SET
+                    up_seconds = up_seconds + excluded.up_seconds,
+                    total_seconds = total_seconds + excluded.total_seconds
+                """,
+                (day, interval if up else 0, interval),
+            )
+            conn.commit()
+
+    def digest(self, start_day: str, end_day: str, top_n: int = TOP_N) -> Digest:
+        # Inclusive day range
+        span = (start_day, end_day)
+        with self._conn() as conn:
+            up = conn.execute(
+                "SELECT SUM(up_seconds) AS up, SUM(total_seconds) AS total "
+                "FROM rollup_uptime_daily WHERE day BETWEEN ? AND ?",
+                span,
+            ).fetchone()
+            admins = conn.execute(
+                """
+                SELECT r.admin_id, a.display_name, a.telegram_id,
+                       SUM(r.created) AS created, SUM(r.expired) AS expired,
+                       SUM(r.rotated) AS rotated
+                FROM rollup_admin_daily r JOIN admins a ON a.id = r.admin_id
+                WHERE r.day BETWEEN ? AND ?
+                GROUP BY r.admin_id
+                """,
+                span,
+            ).fetchall()
+            top = conn.execute(
+                """
+                SELECT t.key, SUM(t.conn_seconds) AS conn_seconds, MAX(t.peak) AS peak,
+                       (SELECT p.label FROM proxies p
+                        WHERE p.secret = t.key AND p.is_active = 1) AS label
+                FROM rollup_traffic_daily t
+                WHERE t.day BETWEEN ? AND ?
+                GROUP BY t.key
+                ORDER BY conn_seconds DESC
+                LIMIT ?
+                """,
+                (*span, top_n),
+            ).fetchall()
+
+        digest = Digest(
+            start_day=start_day,
+            end_day=end_day,
+            uptime=up["up"] / up["total"] if up["total"] else None,
+        )
+        for row in admins:
+            digest.admins[row["admin_id"]] = AdminDigest(
+                admin_id=row["admin_id"],
+                name=row["display_name"] or str(row["telegram_id"]),
+                created=row["created"],
+                expired=row["expired"],
+                rotated=row["rotated"],
+            )
+        digest.top = [
+            TrafficDigest(r["key"], r["label"], r["conn_seconds"], r["peak"]) for r in top
+        ]
+        return digest
+
+    def prune(self, keep_days: int = KEEP_DAYS, now: Optional[float] = None) -> None:
+        cutoff = day_of((time.time() if now is None else now) - keep_days * 86400)
+        with self._conn() as conn:
+            for table in ("rollup_admin_daily", "rollup_traffic_daily", "rollup_uptime_daily"):
+                conn.execute(f"DELETE FROM {table} WHERE day < ?", (cutoff,))
+            conn.commit()
+
+
+def period(days: int, now: Optional[float] = None) -> Tuple[str, str]:
+    # The `days` full UTC days before today
+    today = (time.time() if now is None else now) // 86400 * 86400
+    return day_of(today - days * 86400), day_of(today - 86400)
+
+
+def add_active_counts(
+    digest: Digest, admins: Iterable[Tuple[int, str]], count: Callable[[int], int]
+) -> None:
+    # admins: (admin id, name) of current admins; count(admin_id) -> active
+    # proxies, from the in-memory registry rather than the proxies table
+    for admin_id, name in admins:
+        entry = digest.admins.get(admin_id)
+        if entry is None:
+            entry = digest.admins[admin_id] = AdminDigest(admin_id=admin_id, name=name)
+        entry.active = count(admin_id)
+
+
+def format_digest(digest: Digest) -> str:
+    if digest.start_day == digest.end_day:
+        title = f"📊 گزارش روزانه ({digest.end_day})"
+    else:
+        title = f"📊 گزارش ({digest.start_day} تا {digest.end_day})"
+    uptime = f"{100 * digest.uptime:.2f}%" if digest.uptime is not None else "-"
+    lines = [
+        title,
+        "",
+        f"آپتایم MTProxy: {uptime}",
+        f"ساخته‌شده: {digest.created} | حذف/منقضی: {digest.expired} | چرخش: {digest.rotated}",
+    ]
+
+    admins = sorted(digest.admins.values(), key=lambda a: (-a.active, a.name))
+    if admins:
+        lines += ["", "ادمین‌ها:"]
+        for a in admins:
+            lines.append(f"• {a.name}: {a.active} فعال (+{a.created} / -{a.expired})")
+
+    if digest.top:
+        lines += ["", "بیشترین اتصال (اتصال-ساعت، اوج):"]
+        for i, t in enumerate(digest.top, 1):
+            if t.key.startswith("port:"):
+                name = f"پورت {t.key[5:]}"
+            else:
+                name = f"{t.label or '-'} ({t.key[:8]}…)"
+            lines.append(f"{i}. {name}: {t.conn_seconds / 3600:.1f} ({t.peak})")
+        if any(t.key.startswith("port:") for t in digest.top):
+            # MTProxy does not count clients per secret
+            lines.append("(پورتی که چند سکرت دارد یک‌جا شمرده می‌شود)")
+    return "\n".join(lines)
+
+
+def main() -> int:
+    from .config import Config
+    from .db import Database
+
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    cfg = Config.from_env()
+    db = Database(cfg.db_path)
+    digest = RollupStore(cfg.db_path).digest(*period(days))
+    registry = db.load_registry()
+    add_active_counts(
+        digest,
+        [(r["id"], r["display_name"] or str(r["telegram_id"])) for r in db.list_active_admins()],
+        registry.count_for_admin,
+    )
+    print(format_digest(digest))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+# comments MUST be English only
+#
+# Secret rotation that keeps the proxy row (id, label numbering). A batch of
+# rotations adds all new secrets next to the old ones with one restart; the
+# old secrets are removed together, with one more restart, once their grace
+# period ends. Pending removals live in pending_rotations, so a restart of
+# the bot does not forget them.
+import logging
+import sqlite3
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from .audit import EVENT_EXPIRE, EVENT_ROTATE, AuditLog
+from .db import Database
+from .mtproxy_manager import MtproxyManager
+
+
+logger = logging.getLogger(__name__)
+
+SCOPE_PROXY = "proxy"
+SCOPE_ADMIN = "admin"
+SCOPE_ALL = "all"
+
+MAX_LINKS_PER_MESSAGE = 20  # keeps each notification well under 4096 chars
+
+
+@dataclass
+class Rotation:
+    proxy_id: int
+    admin_id: int
+    label: str
+    old_secret: str
+    new_secret: str
+
+
+class SecretRotator:
+    def __init__(self, db: Database, mt: MtproxyManager, audit: Optional[AuditLog] = None):
+        self.db = db
+        self.mt = mt
+        self.audit = audit
+
+    def select(self, scope: str, value: Optional[int] = None) -> List[sqlite3.Row]:
+        # value: proxy id for SCOPE_PROXY, admin telegram id for SCOPE_ADMIN
+        if scope == SCOPE_PROXY:
+            row = self.db.get_proxy_by_id(value)
+            return [row] if row and row["is_active"] else []
+        if scope == SCOPE_ADMIN:
+            admin = self.db.get_admin_by_telegram(value)
+            if not admin:
+                return []
+            return [r for r in self.db.list_active_proxies() if r["admin_id"] == admin["id"]]
+        if scope == SCOPE_ALL:
+            return self.db.list_active_proxies()
+        raise ValueError(f"unknown rotation scope: {scope}")
+
+    def rotate(
+        self,
+        rows: List[sqlite3.Row],
+        grace: int,
+        actor: Optional[int] = None,
+    ) -> List[Rotation]:
+        # Blocking (unit file + one restart); call off the event loop
+        rotations = [
+            Rotation(r["id"], r["admin_id"], r["label"], r["secret"], self.mt.generate_secret())
+            for r in rows
+        ]
+        if not rotations:
+            return []
+
+        now = int(time.time())
+        # Recorded first: if the bot dies after the restart, the old secrets
+        # are still removed when the grace period ends
+        self.db.add_pending_rotations(
+            [(r.proxy_id, r.old_secret, r.new_secret, now, now + grace) for r in rotations]
+        )
+        self.mt.apply_secret_changes(add=[r.new_secret for r in rotations])
+
+        for r in rotations:
+            self.db.update_proxy_secret(r.proxy_id, r.new_secret)
+            if self.audit:
+                self.audit.record(
+                    EVENT_ROTATE,
+                    actor=actor,
+                    proxy_id=r.proxy_id,
+                    secret=r.new_secret,
+                    detail=f"old={r.old_secret} grace={grace}s",
+                )
+        logger.info("Rotated %d secrets, old ones kept for %ds", len(rotations), grace)
+        return rotations
+
+    def finish_due(self, now: Optional[int] = None) -> int:
+        # Drops every expired old secret with a single restart
+        due = self.db.due_rotations(int(time.time()) if now is None else now)
+        if not due:
+            return 0
+        # A secret can be active again (restored backup, rotated back); keep it
+        expired = [r for r in due if not self.db.get_proxy_by_secret(r["old_secret"])]
+        self.mt.apply_secret_changes(remove=[r["old_secret"] for r in expired])
+        self.db.delete_pending_rotations([r["id"] for r in due])
+        if self.audit:
+            for r in expired:
+                self.audit.record(EVENT_EXPIRE, proxy_id=r["proxy_id"], secret=r["old_secret"])
+        logger.info("Grace period over for %d rotated secrets", len(due))
+        return len(due)
+
+
+def link_messages(
+    rotations: List[Rotation],
+    mt: MtproxyManager,
+    admin_chats: Dict[int, int],
+    grace: int,
+) -> Dict[int, List[str]]:
+    # chat id -> messages with the new links, grouped per owning admin
+    by_chat: Dict[int, List[Rotation]] = defaultdict(list)
+    for r in rotations:
+        chat_id = admin_chats.get(r.admin_id)
+        if chat_id:
+            by_chat[chat_id].append(r)
+
+    hours = max(1, round(grace / 3600))
+    out: Dict[int, List[str]] = {}
+    for chat_id, items in by_chat.items():
+        messages = []
+        for i in range(0, len(items), MAX_LINKS_PER_MESSAGE):
+            lines = [
+                f"🔄 لینک جدید پروکسی‌ها (لینک‌های قبلی تا {hours} ساعت دیگر کار می‌کنند):",
+                "",
+            ]
+            for r in items[i : i + MAX_LINKS_PER_MESSAGE]:
+                lines.append(f"{r.label}: {mt.build_proxy_link(r.new_secret)}")
+            messages.append("\n".join(lines))
+        out[chat_id] = messages
+    return out
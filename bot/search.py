@@ -0,0 +1,105 @@
+# comments MUST be English only
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from .db import Database
+
+
+SEARCH_LIMIT = 20  # Telegram shows at most 50 inline results; keep it short
+CACHE_SIZE = 512
+CACHE_TTL = 30.0  # seconds; writes from other processes show up after this
+
+HEX_RE = re.compile(r"^[0-9a-f]{3,}$")
+
+
+def _secret_mode(q: str) -> bool:
+    # Secret fragments are only searched for 3+ hex chars (trigram minimum)
+    return bool(HEX_RE.match(q))
+
+
+def _matches(row: sqlite3.Row, q: str) -> bool:
+    if row["label"].casefold().startswith(q):
+        return True
+    return _secret_mode(q) and q in row["secret"]
+
+
+class ProxySearch:
+    # Search by proxy id, label prefix and secret fragment. Results are cached
+    # per (scope, query); a longer query is answered from a cached shorter
+    # prefix when that result was complete, so typing "hproxy 12" after
+    # "hproxy 1" does not hit sqlite again.
+
+    def __init__(self, db: Database, limit: int = SEARCH_LIMIT):
+        self.db = db
+        self.limit = limit
+        # (admin_id, query) -> (generation, time, rows, complete)
+        self._cache: "OrderedDict[Tuple[Optional[int], str], tuple]" = OrderedDict()
+
+    def _cache_get(self, key):
+        entry = self._cache.get(key)
+        if not entry:
+            return None
+        generation, stamp, rows, complete = entry
+        if generation != self.db.generation or time.monotonic() - stamp > CACHE_TTL:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return rows, complete
+
+    def _cache_put(self, key, rows: List[sqlite3.Row], complete: bool) -> None:
+        self._cache[key] = (self.db.generation, time.monotonic(), rows, complete)
+        self._cache.move_to_end(key)
+        while len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    def _from_prefix(self, admin_id: Optional[int], q: str) -> Optional[List[sqlite3.Row]]:
+        for n in range(len(q) - 1, -1, -1):
+            prefix = q[:n]
+            # A non-hex prefix result has no secret matches; unusable for hex q
+            if _secret_mode(q) and not _secret_mode(prefix):
+                continue
+            hit = self._cache_get((admin_id, prefix))
+            if hit and hit[1]:
+                return [r for r in hit[0] if _matches(r, q)]
+        return None
+
+    def _lookup(self, admin_id: Optional[int], q: str) -> Tuple[List[sqlite3.Row], bool]:
+        rows = self._from_prefix(admin_id, q)
+        if rows is not None:
+            return rows, True
+
+        rows = list(self.db.search_proxies_by_label(q, admin_id=admin_id, limit=self.limit))
+        complete = len(rows) < self.limit
+        if _secret_mode(q):
+            by_secret = self.db.search_proxies_by_secret(q, admin_id=admin_id, limit=self.limit)
+            complete = complete and len(by_secret) < self.limit
+            seen = {r["id"] for r in rows}
+            rows.extend(r for r in by_secret if r["id"] not in seen)
+        return rows, complete
+
+    def search(self, query: str, admin_id: Optional[int] = None) -> List[sqlite3.Row]:
+        # admin_id=None searches every admin's proxies (owner)
+        q = " ".join(query.split()).casefold()
+        key = (admin_id, q)
+
+        hit = self._cache_get(key)
+        if hit:
+            rows = hit[0]
+        else:
+            rows, complete = self._lookup(admin_id, q)
+            self._cache_put(key, rows, complete)
+
+        # Exact id is a primary-key lookup; never cached
+        if q.isdigit():
+            row = self.db.get_proxy_by_id(int(q))
+            if (
+                row
+                and row["is_active"]
+                and (admin_id is None or row["admin_id"] == admin_id)
+                and all(r["id"] != row["id"] for r in rows)
+            ):
+                rows = [row] + rows
+        return rows[: self.limit]
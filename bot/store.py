@@ -0,0 +1,682 @@
+# comments MUST be English only
+#
+# One proxy store for the whole host. The bot/db.py schema is the base and
+# every change to it is a numbered migration tracked in PRAGMA user_version:
+#
+#   1  admins, proxies, pending_rotations (what bot/db.py used to create)
+#   2  proxies gains port, link, source and usage (superset of the pybot and
+#      proxies.txt fields) plus an index on secret; a pybot database found in
+#      place (proxies.user_id, no admins) is folded into it, ids unchanged
+#   3  daily rollup tables behind the owner digests (bot/rollup.py),
+#      backfilled from audit_log
+#   4  audit_log (bot/audit.py), append-only through triggers
+#   5  bot_state (bot/persistence.py)
+#   6  proxies_fts, trigram search over secrets (bot/db.py); skipped
+#      when SQLite lacks the trigram tokenizer (< 3.34)
+#
+# Legacy sources are imported as streams (one line / row at a time, commits
+# in batches) and deduplicated by active secret:
+#
+#   python3 -m bot.store import [--proxies-txt P] [--usage-json P] [--pybot-db P]
+#
+# data/proxies.txt is also imported on the first shim call or local service
+# start and renamed to proxies.txt.imported (adopt_proxies_txt), so the
+# store is the single source of truth for the scripts and bot.local_service.
+#
+# Shims for scripts/*.sh, same output contract as the text-file versions:
+#
+#   python3 -m bot.store list               ID SECRET PORT NAME TG_LINK | NO_PROXIES
+#   python3 -m bot.store stats              PROXY_COUNT= / BY_PORT=
+#   python3 -m bot.store add SECRET PORT LINK   ID SECRET PORT NAME TG_LINK
+#   python3 -m bot.store delete ID          SECRET (exit 3 if not found)
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500  # imported rows per transaction
+EXIT_NOT_FOUND = 3  # "delete" shim: distinct from a crash (exit 1)
+
+SOURCE_BOT = "bot"
+SOURCE_PYBOT = "pybot"
+SOURCE_TXT = "proxies.txt"
+TXT_LINK_PREFIXES = ("tg://", "https://t.me/")  # proxies.txt TG_LINK field
+TXT_IMPORTED_SUFFIX = ".imported"  # proxies.txt is renamed once imported
+
+_PYBOT_LEGACY = "_pybot_proxies_v0"
+
+
+# ---------- migrations ----------
+
+
+def _columns(cur: sqlite3.Cursor, table: str) -> List[str]:
+    return [row[1] for row in cur.execute(f"PRAGMA table_info({table})")]
+
+
+def _migrate_1(cur: sqlite3.Cursor) -> None:
+    # A pybot file has its own "proxies"; keep it aside for migration 2
+    cols = _columns(cur, "proxies")
+    if "user_id" in cols and "admin_id" not in cols:
+        cur.execute(f"ALTER TABLE proxies RENAME TO {_PYBOT_LEGACY}")
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS admins (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            telegram_id INTEGER UNIQUE NOT NULL,
+            tag_prefix TEXT,
+            display_name TEXT,
+            is_owner INTEGER DEFAULT 0,
+            is_active INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS proxies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            admin_id INTEGER NOT NULL,
+            label TEXT NOT NULL,
+            secret TEXT NOT NULL,
+            is_active INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(admin_id) REFERENCES admins(id)
+        )
+        """
+    )
+    # Label prefix search (LIKE 'x%' uses a NOCASE index)
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_proxies_label ON proxies(label COLLATE NOCASE)"
+    )
+    # Rotated-out secrets still in ExecStart until their grace period ends
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pending_rotations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            proxy_id INTEGER NOT NULL,
+            old_secret TEXT NOT NULL,
+            new_secret TEXT NOT NULL,
+            started_at INTEGER NOT NULL,
+            expires_at INTEGER NOT NULL
+        )
+        """
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_pending_rotations_expires "
+        "ON pending_rotations(expires_at)"
+    )
+
+
+def _migrate_2(cur: sqlite3.Cursor) -> None:
+    cols = _columns(cur, "proxies")
+    for name, decl in (
+        ("port", "INTEGER"),
+        ("link", "TEXT"),
+        ("source", f"TEXT DEFAULT '{SOURCE_BOT}'"),
+        ("usage", "TEXT"),  # JSON from data/usage.json
+    ):
+        if name not in cols:
+            cur.execute(f"ALTER TABLE proxies ADD COLUMN {name} {decl}")
+    # Every lookup by secret (reconcile, rotation, dedupe) used to scan
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_proxies_secret ON proxies(secret, is_active)")
+
+    legacy = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (_PYBOT_LEGACY,)
+    ).fetchone()
+    if not legacy:
+        return
+    rows = cur.execute(
+        f"SELECT id, user_id, secret, link, is_active, created_at FROM {_PYBOT_LEGACY}"
+    ).fetchall()
+    for proxy_id, user_id, secret, link, is_active, created_at in rows:
+        cur.execute(
+            """
+            INSERT INTO proxies
+                (id, admin_id, label, secret, is_active, created_at, link, source)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                proxy_id,
+                telegram_admin(cur, user_id),
+                f"#{proxy_id}",
+                secret,
+                is_active,
+                created_at,
+                link,
+                SOURCE_PYBOT,
+            ),
+        )
+    cur.execute(f"DROP TABLE {_PYBOT_LEGACY}")
+
+
+def _migrate_3(cur: sqlite3.Cursor) -> None:
+    from .audit import EVENT_CREATE, EVENT_DELETE, EVENT_ROTATE
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rollup_admin_daily (
+            day TEXT NOT NULL,
+            admin_id INTEGER NOT NULL,
+            created INTEGER NOT NULL DEFAULT 0,
+            expired INTEGER NOT NULL DEFAULT 0,
+            rotated INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, admin_id)
+        ) WITHOUT ROWID
+        """
+    )
+    # key: secret when it is the only one on its port, else "port:<n>"
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rollup_traffic_daily (
+            day TEXT NOT NULL,
+            key TEXT NOT NULL,
+            conn_seconds INTEGER NOT NULL DEFAULT 0,
+            peak INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, key)
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rollup_uptime_daily (
+            day TEXT PRIMARY KEY,
+            up_seconds INTEGER NOT NULL DEFAULT 0,
+            total_seconds INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """
+    )
+
+    has_audit = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'audit_log'"
+    ).fetchone()
+    if not has_audit:
+        return
+    # One pass over the existing history; later events are added by the
+    # audit writer as they are written
+    cur.execute(
+        f"""
+        INSERT INTO rollup_admin_daily (day, admin_id, created, expired, rotated)
+        SELECT date(a.ts, 'unixepoch'), p.admin_id,
+               SUM(a.event = {EVENT_CREATE}),
+               SUM(a.event = {EVENT_DELETE}),
+               SUM(a.event = {EVENT_ROTATE})
+        FROM audit_log a JOIN proxies p ON p.id = a.proxy_id
+        WHERE a.event IN ({EVENT_CREATE}, {EVENT_DELETE}, {EVENT_ROTATE})
+        GROUP BY 1, 2
+        """
+    )
+
+
+def _migrate_4(cur: sqlite3.Cursor) -> None:
+    # IF NOT EXISTS: audit.py created this table itself before it was a migration
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS audit_log (
+            id INTEGER PRIMARY KEY,
+            ts INTEGER NOT NULL,
+            event INTEGER NOT NULL,
+            actor INTEGER,
+            proxy_id INTEGER,
+            secret TEXT,
+            detail TEXT
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_audit_ts ON audit_log(ts)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_audit_actor ON audit_log(actor, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_audit_proxy ON audit_log(proxy_id, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_audit_secret ON audit_log(secret, id)")
+    # Append-only: history can never be rewritten
+    for op in ("UPDATE", "DELETE"):
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS audit_log_no_{op.lower()}
+            BEFORE {op} ON audit_log
+            BEGIN
+                SELECT RAISE(ABORT, 'audit_log is append-only');
+            END
+            """
+        )
+
+
+def _migrate_5(cur: sqlite3.Cursor) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS bot_state (
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            data BLOB NOT NULL,
+            updated_at INTEGER NOT NULL,
+            PRIMARY KEY (kind, key)
+        )
+        """
+    )
+
+
+def _migrate_6(cur: sqlite3.Cursor) -> None:
+    # Trigram FTS over secrets for fragment search; without it
+    # Database.search_proxies_by_secret scans with instr(). Single
+    # statements only: executescript() would commit the migration transaction.
+    exists = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'proxies_fts'"
+    ).fetchone()
+    if exists:
+        return
+    try:
+        cur.execute(
+            """
+            CREATE VIRTUAL TABLE proxies_fts USING fts5(
+                secret, content='proxies', content_rowid='id', tokenize='trigram'
+            )
+            """
+        )
+    except sqlite3.OperationalError:
+        logger.warning("SQLite has no fts5 trigram tokenizer; secret search scans the table")
+        return
+    cur.execute(
+        """
+        CREATE TRIGGER proxies_fts_ai AFTER INSERT ON proxies BEGIN
+            INSERT INTO proxies_fts(rowid, secret) VALUES (new.id, new.secret);
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER proxies_fts_ad AFTER DELETE ON proxies BEGIN
+            INSERT INTO proxies_fts(proxies_fts, rowid, secret)
+            VALUES ('delete', old.id, old.secret);
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER proxies_fts_au AFTER UPDATE OF secret ON proxies BEGIN
+            INSERT INTO proxies_fts(proxies_fts, rowid, secret)
+            VALUES ('delete', old.id, old.secret);
+            INSERT INTO proxies_fts(rowid, secret) VALUES (new.id, new.secret);
+        END
+        """
+    )
+    cur.execute("INSERT INTO proxies_fts(proxies_fts) VALUES ('rebuild')")
+
+
+MIGRATIONS: List[Callable[[sqlite3.Cursor], None]] = [
+    _migrate_1,
+    _migrate_2,
+    _migrate_3,
+    _migrate_4,
+    _migrate_5,
+    _migrate_6,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    # Applies pending migrations, each in its own transaction; safe to call
+    # from several processes at once (BEGIN IMMEDIATE serializes them)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    while version < SCHEMA_VERSION:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            version = cur.execute("PRAGMA user_version").fetchone()[0]
+            if version >= SCHEMA_VERSION:
+                conn.rollback()
+                break
+            MIGRATIONS[version](cur)
+            version += 1
+            cur.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        logger.info("Store schema migrated to version %d", version)
+    return version
+
+
+def telegram_admin(
+    cur: sqlite3.Cursor, telegram_id: int, active: bool = False, owner: bool = False
+) -> int:
+    # admins.id for a Telegram user. New rows for pybot users and imports
+    # are inactive unless configured as admins: owning proxies must not
+    # grant access to bot/. Existing rows are left as they are.
+    cur.execute(
+        """
+        INSERT OR IGNORE INTO admins (telegram_id, display_name, is_owner, is_active)
+        VALUES (?, ?, ?, ?)
+        """,
+        (telegram_id, str(telegram_id), int(owner), int(active or owner)),
+    )
+    return cur.execute(
+        "SELECT id FROM admins WHERE telegram_id = ?", (telegram_id,)
+    ).fetchone()[0]
+
+
+# ---------- streaming import ----------
+
+
+@dataclass
+class ImportReport:
+    inserted: int = 0
+    merged: int = 0  # secret already active: missing fields filled in
+    skipped: int = 0  # malformed lines / rows
+    usage: int = 0  # usage.json entries attached to a proxy
+    usage_unmatched: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"inserted={self.inserted} merged={self.merged} skipped={self.skipped} "
+            f"usage={self.usage} usage_unmatched={self.usage_unmatched}"
+        )
+
+
+def iter_proxies_txt(path: str) -> Iterator[Tuple[str, str, Optional[int], str, Optional[str]]]:
+    # (txt id, secret, port, name, link) per "ID SECRET PORT NAME TG_LINK" line,
+    # the layout scripts/new_proxy.sh writes (TG_LINK missing in old files);
+    # malformed lines come out with an empty secret
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            if len(parts) not in (4, 5) or not parts[2].isdigit():
+                yield parts[0], "", None, "", None
+                continue
+            link = parts[4] if len(parts) == 5 else None
+            if link is not None and not link.startswith(TXT_LINK_PREFIXES):
+                yield parts[0], "", None, "", None
+                continue
+            yield parts[0], parts[1], int(parts[2]), parts[3], link
+
+
+def iter_pybot_rows(path: str) -> Iterator[sqlite3.Row]:
+    # Read-only; rows are fetched lazily from the cursor
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        cols = _columns(conn.cursor(), "proxies")
+        if "user_id" in cols:
+            sql = "SELECT id, user_id, secret, link FROM proxies WHERE is_active = 1 ORDER BY id"
+        elif "link" in cols:
+            # Already migrated in place by pybot (see _migrate_2)
+            sql = (
+                "SELECT p.id, a.telegram_id AS user_id, p.secret, p.link FROM proxies p "
+                "JOIN admins a ON a.id = p.admin_id WHERE p.is_active = 1 ORDER BY p.id"
+            )
+        else:
+            return
+        yield from conn.execute(sql)
+    finally:
+        conn.close()
+
+
+class StoreImporter:
+    def __init__(self, conn: sqlite3.Connection, owner_id: int, admin_ids: Iterable[int] = ()):
+        self.conn = conn
+        self.cur = conn.cursor()
+        self.admin_ids = set(admin_ids)
+        self.owner_admin = telegram_admin(self.cur, owner_id, owner=True) if owner_id else None
+        self.report = ImportReport()
+        self._pending = 0
+
+    def _tick(self) -> None:
+        self._pending += 1
+        if self._pending >= BATCH_SIZE:
+            self.conn.commit()
+            self._pending = 0
+
+    def upsert(
+        self,
+        admin_id: int,
+        label: str,
+        secret: str,
+        port: Optional[int],
+        link: Optional[str],
+        source: str,
+    ) -> int:
+        row = self.cur.execute(
+            "SELECT id FROM proxies WHERE secret = ? AND is_active = 1", (secret,)
+        ).fetchone()
+        if row:
+            self.cur.execute(
+                "UPDATE proxies SET port = COALESCE(port, ?), link = COALESCE(link, ?) "
+                "WHERE id = ?",
+                (port, link, row[0]),
+            )
+            self.report.merged += 1
+            proxy_id = row[0]
+        else:
+            self.cur.execute(
+                """
+                INSERT INTO proxies (admin_id, label, secret, port, link, source)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (admin_id, label, secret, port, link, source),
+            )
+            self.report.inserted += 1
+            proxy_id = self.cur.lastrowid
+        self._tick()
+        return proxy_id
+
+    def import_proxies_txt(self, path: str) -> Dict[str, int]:
+        # Returns txt id -> store id, so usage.json keyed by txt id still matches
+        ids: Dict[str, int] = {}
+        if self.owner_admin is None:
+            raise ValueError("OWNER_ID is needed to own proxies.txt entries")
+        for txt_id, secret, port, name, link in iter_proxies_txt(path):
+            if not secret:
+                self.report.skipped += 1
+                continue
+            ids[txt_id] = self.upsert(
+                self.owner_admin, name or f"proxy-{txt_id}", secret, port, link, SOURCE_TXT
+            )
+        self.conn.commit()
+        return ids
+
+    def import_pybot(self, path: str) -> None:
+        for row in iter_pybot_rows(path):
+            if not row["secret"]:
+                self.report.skipped += 1
+                continue
+            user_id = row["user_id"]
+            admin_id = telegram_admin(self.cur, user_id, active=user_id in self.admin_ids)
+            self.upsert(admin_id, f"#{row['id']}", row["secret"], None, row["link"], SOURCE_PYBOT)
+        self.conn.commit()
+
+    def import_usage(self, path: str, txt_ids: Dict[str, int]) -> None:
+        # {"<secret or proxies.txt id>": {...}}; a single small object, so it
+        # is parsed whole
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f"{path}: expected a JSON object")
+        for key, value in data.items():
+            proxy_id = txt_ids.get(key)
+            if proxy_id is None:
+                row = self.cur.execute(
+                    "SELECT id FROM proxies WHERE secret = ? AND is_active = 1", (key,)
+                ).fetchone()
+                proxy_id = row[0] if row else None
+            if proxy_id is None:
+                self.report.usage_unmatched += 1
+                continue
+            self.cur.execute(
+                "UPDATE proxies SET usage = ? WHERE id = ?",
+                (json.dumps(value, ensure_ascii=False), proxy_id),
+            )
+            self.report.usage += 1
+            self._tick()
+        self.conn.commit()
+
+
+def adopt_proxies_txt(cfg, data_dir: str) -> Optional[ImportReport]:
+    # One-time switch of a host still on data/proxies.txt: import it (and
+    # usage.json) and rename it, so the store is the only list left and the
+    # scripts' text fallback cannot serve other IDs next to it. The entries
+    # get store ids; the old numbers stay in proxies.txt.imported.
+    path = os.path.join(data_dir, "proxies.txt")
+    if not cfg.owner_id or not os.path.isfile(path):
+        return None
+    conn = _connect(cfg.db_path)
+    try:
+        importer = StoreImporter(conn, cfg.owner_id, cfg.admin_ids)
+        txt_ids = importer.import_proxies_txt(path)
+        usage = os.path.join(data_dir, "usage.json")
+        if os.path.isfile(usage):
+            importer.import_usage(usage, txt_ids)
+    finally:
+        conn.close()
+    os.replace(path, path + TXT_IMPORTED_SUFFIX)
+    logger.warning("Imported %s into the store (%s)", path, importer.report)
+    return importer.report
+
+
+# ---------- script shims ----------
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    migrate(conn)
+    return conn
+
+
+def _proxy_line(row: sqlite3.Row, port: int, link: str) -> str:
+    return f"{row['id']} {row['secret']} {row['port'] or port} {row['label']} {link}"
+
+
+def _shim(args: argparse.Namespace, cfg) -> int:
+    from .audit import EVENT_CREATE, EVENT_DELETE, AuditLog
+    from .mtproxy_manager import MtproxyManager
+
+    conn = _connect(cfg.db_path)
+    try:
+        if args.command == "list":
+            rows = conn.execute(
+                "SELECT * FROM proxies WHERE is_active = 1 ORDER BY id"
+            ).fetchall()
+            if not rows:
+                print("NO_PROXIES")
+                return 0
+            mt = MtproxyManager(cfg)
+            for row in rows:
+                try:
+                    link = mt.build_proxy_link(row["secret"])
+                except (FileNotFoundError, RuntimeError):
+                    link = row["link"] or ""
+                print(_proxy_line(row, cfg.mtproxy_default_port, link))
+            return 0
+
+        if args.command == "stats":
+            rows = conn.execute(
+                "SELECT COALESCE(port, ?) AS p, COUNT(*) AS c FROM proxies "
+                "WHERE is_active = 1 GROUP BY p ORDER BY p",
+                (cfg.mtproxy_default_port,),
+            ).fetchall()
+            print(f"PROXY_COUNT={sum(r['c'] for r in rows)}")
+            print("BY_PORT=" + ",".join(f"{r['p']}:{r['c']}" for r in rows))
+            return 0
+
+        audit = AuditLog(cfg.db_path)
+        try:
+            if args.command == "add":
+                cur = conn.cursor()
+                admin_id = telegram_admin(cur, cfg.owner_id, owner=True)
+                cur.execute(
+                    """
+                    INSERT INTO proxies (admin_id, label, secret, port, link, source)
+                    VALUES (?, '', ?, ?, ?, ?)
+                    """,
+                    (admin_id, args.secret, args.port, args.link, SOURCE_TXT),
+                )
+                proxy_id = cur.lastrowid
+                cur.execute(
+                    "UPDATE proxies SET label = ? WHERE id = ?", (f"proxy-{proxy_id}", proxy_id)
+                )
+                conn.commit()
+                audit.record(EVENT_CREATE, proxy_id=proxy_id, secret=args.secret)
+                row = conn.execute("SELECT * FROM proxies WHERE id = ?", (proxy_id,)).fetchone()
+                print(_proxy_line(row, args.port, args.link))
+                return 0
+
+            # delete
+            row = conn.execute(
+                "SELECT * FROM proxies WHERE id = ? AND is_active = 1", (args.id,)
+            ).fetchone()
+            if not row:
+                return EXIT_NOT_FOUND
+            conn.execute("UPDATE proxies SET is_active = 0 WHERE id = ?", (args.id,))
+            conn.commit()
+            audit.record(EVENT_DELETE, proxy_id=args.id, secret=row["secret"])
+            print(row["secret"])
+            return 0
+        finally:
+            audit.close()
+    finally:
+        conn.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from .config import BASE_DIR, Config
+
+    logging.basicConfig(level=logging.WARNING)
+    data_dir = os.path.join(BASE_DIR, "data")
+    parser = argparse.ArgumentParser(prog="python3 -m bot.store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("migrate", help="apply pending schema migrations")
+    imp = sub.add_parser("import", help="import proxies.txt, usage.json and the pybot db")
+    imp.add_argument("--proxies-txt", default=os.path.join(data_dir, "proxies.txt"))
+    imp.add_argument("--usage-json", default=os.path.join(data_dir, "usage.json"))
+    imp.add_argument("--pybot-db", default=None, help="default: PYBOT_DB_PATH")
+    sub.add_parser("list")
+    sub.add_parser("stats")
+    add = sub.add_parser("add")
+    add.add_argument("secret")
+    add.add_argument("port", type=int)
+    add.add_argument("link")
+    delete = sub.add_parser("delete")
+    delete.add_argument("id", type=int)
+    args = parser.parse_args(argv)
+
+    cfg = Config.from_env()
+    os.makedirs(os.path.dirname(cfg.db_path), exist_ok=True)
+
+    if args.command == "migrate":
+        conn = _connect(cfg.db_path)
+        print(f"schema version {conn.execute('PRAGMA user_version').fetchone()[0]}")
+        conn.close()
+        return 0
+
+    if args.command == "import":
+        conn = _connect(cfg.db_path)
+        try:
+            importer = StoreImporter(conn, cfg.owner_id, cfg.admin_ids)
+            txt_ids: Dict[str, int] = {}
+            if os.path.exists(args.proxies_txt):
+                txt_ids = importer.import_proxies_txt(args.proxies_txt)
+            pybot_db = args.pybot_db or cfg.pybot_db_path
+            if os.path.exists(pybot_db) and os.path.realpath(pybot_db) != os.path.realpath(
+                cfg.db_path
+            ):
+                importer.import_pybot(pybot_db)
+            if os.path.exists(args.usage_json):
+                importer.import_usage(args.usage_json, txt_ids)
+            print(importer.report)
+        finally:
+            conn.close()
+        return 0
+
+    adopt_proxies_txt(cfg, data_dir)
+    return _shim(args, cfg)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
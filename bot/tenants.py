@@ -0,0 +1,232 @@
+# comments MUST be English only
+#
+# Runs several reseller bot tokens in one process and one event loop.
+# Every tenant keeps its own Config, sqlite file, admin set and proxy limit
+# (max_proxies); they share one MtproxyManager, so unit-file writes are
+# serialized instead of racing, the HTTP connection pools, and the
+# host-wide work (connection sampling, autotune, abuse, the config
+# watcher, the pybot store backup), which runs once. NotificationQueue
+# stays per tenant: Telegram flood limits are per bot token.
+#
+#   python -m bot.tenants run [tenants.json]
+#   python -m bot.tenants measure [N]
+#
+# tenants.json:
+#   [{"name": "r1", "bot_token": "...", "owner_id": 1, "admin_ids": [2, 3],
+#     "max_proxies": 50}]
+import asyncio
+import functools
+import json
+import logging
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+from dataclasses import replace
+from typing import Iterable, List, Optional, Tuple
+
+from telegram.ext import Application
+from telegram.request import HTTPXRequest
+
+from .audit import AuditLog
+from .bot import MtproxyBotApp, build_application
+from .config import BASE_DIR, Config
+from .mtproxy_manager import MtproxyManager
+
+
+logger = logging.getLogger(__name__)
+
+TENANTS_FILE = os.getenv("TENANTS_FILE") or os.path.join(BASE_DIR, "data", "tenants.json")
+TENANT_DB_DIR = os.path.join(BASE_DIR, "data", "tenants")
+API_POOL_SIZE = 32  # shared by every tenant's outgoing API calls
+NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+
+Tenant = Tuple[MtproxyBotApp, Application]
+
+
+def load_tenants(path: str, base: Config) -> List[Config]:
+    with open(path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+
+    cfgs = []
+    for item in items:
+        name = item["name"]
+        if not NAME_RE.match(name):
+            raise ValueError(f"invalid tenant name: {name!r}")
+        owner = int(item["owner_id"])
+        admin_ids = [int(x) for x in item.get("admin_ids", [])]
+        if owner not in admin_ids:
+            admin_ids.append(owner)
+        cfgs.append(
+            replace(
+                base,
+                bot_token=item["bot_token"],
+                owner_id=owner,
+                admin_ids=admin_ids,
+                db_path=item.get("db_path") or os.path.join(TENANT_DB_DIR, f"{name}.db"),
+                backup_dir=os.path.join(base.backup_dir, name),
+                qr_cache_dir=os.path.join(base.qr_cache_dir, name),
+                max_proxies=int(item.get("max_proxies", base.max_proxies)),
+            )
+        )
+    return cfgs
+
+
+def _secrets_of(apps: Iterable[MtproxyBotApp]) -> List[str]:
+    return [s for app in apps for s in app.registry.secrets()]
+
+
+def build_tenants(cfgs: List[Config], mt: MtproxyManager) -> List[Tenant]:
+    request = HTTPXRequest(connection_pool_size=API_POOL_SIZE)
+    # One long poll per tenant is always in flight
+    updates_request = HTTPXRequest(connection_pool_size=len(cfgs) + 1)
+
+    tenants: List[Tenant] = []
+    for i, cfg in enumerate(cfgs):
+        os.makedirs(os.path.dirname(cfg.db_path), exist_ok=True)
+        logic = MtproxyBotApp(cfg, mt=mt, host_jobs=i == 0)
+        builder = Application.builder().request(request).get_updates_request(updates_request)
+        # run() starts one config watcher for everyone
+        tenants.append((logic, build_application(logic, builder, watch=False)))
+
+    # Every tenant sees the same ExecStart; the others' secrets are known
+    for logic, _ in tenants:
+        others = [other for other, _ in tenants if other is not logic]
+        logic.foreign_secrets = functools.partial(_secrets_of, others)
+    # One /proc sample per tick, taken by the host and shared
+    host = tenants[0][0] if tenants else None
+    if host:
+        host.peers = [logic for logic, _ in tenants[1:]]
+    # A leaked secret is disabled / rotated in the tenant that owns it
+    if host and host.abuse:
+        host.abuse.stores = [(logic.db, logic.audit) for logic, _ in tenants]
+    return tenants
+
+
+async def run(tenants: List[Tenant]) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    started: List[Application] = []
+    try:
+        for logic, app in tenants:
+            await app.initialize()
+            if app.post_init:
+                await app.post_init(app)
+            await app.start()
+            await app.updater.start_polling()
+            started.append(app)
+            logger.info("Tenant bot for owner %s started", logic.cfg.owner_id)
+        # One watcher for the shared unit file; every tenant reconciles its
+        # own store on a change. The host's post_shutdown stops it.
+        host = tenants[0][0]
+        host.start_watcher([logic for logic, _ in tenants])
+        await stop.wait()
+    finally:
+        # Stop everything before shutting anything down: the HTTP pools are
+        # shared and the first shutdown() closes them
+        for app in reversed(started):
+            await app.updater.stop()
+            await app.stop()
+        for app in reversed(started):
+            if app.post_shutdown:
+                await app.post_shutdown(app)
+            await app.shutdown()
+        mt = tenants[0][0].mt
+        if mt.audit:
+            mt.audit.close()
+
+
+# ---------- memory comparison ----------
+
+
+def _memory_kb() -> Tuple[int, int]:
+    # (RSS, PSS) of this process; PSS splits shared pages between processes
+    rss = pss = 0
+    with open("/proc/self/status", "r", encoding="ascii") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss = int(line.split()[1])
+    try:
+        with open("/proc/self/smaps_rollup", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    pss = int(line.split()[1])
+    except OSError:
+        pss = rss
+    return rss, pss
+
+
+def _hold(count: int) -> None:
+    # Child of measure(): build `count` tenants (no network) and report memory
+    base = Config.from_env()
+    with tempfile.TemporaryDirectory(prefix="tenants-measure-") as tmp:
+        cfgs = [
+            replace(
+                base,
+                bot_token=f"{100000 + i}:MEASURE",
+                owner_id=1000 + i,
+                admin_ids=[1000 + i],
+                db_path=os.path.join(tmp, f"t{i}.db"),
+            )
+            for i in range(count)
+        ]
+        tenants = build_tenants(cfgs, MtproxyManager(base))
+        rss, pss = _memory_kb()
+        for logic, _ in tenants:
+            logic.audit.close()
+    print(f"{rss} {pss}")
+
+
+def measure(count: int) -> None:
+    def child(n: int) -> Tuple[int, int]:
+        out = subprocess.run(
+            [sys.executable, "-m", "bot.tenants", "_hold", str(n)],
+            cwd=BASE_DIR,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.split()
+        return int(out[-2]), int(out[-1])
+
+    one_rss, one_pss = child(count)
+    many = [child(1) for _ in range(count)]
+    many_rss = sum(m[0] for m in many)
+    many_pss = sum(m[1] for m in many)
+    mib = lambda kb: f"{kb / 1024:.1f} MiB"  # noqa: E731
+    print(f"1 process x {count} tenants : RSS {mib(one_rss)}, PSS {mib(one_pss)}")
+    print(f"{count} processes x 1 tenant: RSS {mib(many_rss)}, PSS {mib(many_pss)}")
+    print(f"per extra tenant in-process : ~{mib((one_rss - many[0][0]) / max(1, count - 1))}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO)
+    args = list(sys.argv[1:] if argv is None else argv)
+
+    if args[:1] == ["run"]:
+        base = Config.from_env()
+        cfgs = load_tenants(args[1] if len(args) > 1 else TENANTS_FILE, base)
+        if not cfgs:
+            print("no tenants configured", file=sys.stderr)
+            return 1
+        # Host-level events (restarts) go to the base store's audit log
+        tenants = build_tenants(cfgs, MtproxyManager(base, audit=AuditLog(base.db_path)))
+        asyncio.run(run(tenants))
+        return 0
+    if args[:1] == ["measure"]:
+        measure(int(args[1]) if len(args) > 1 else 20)
+        return 0
+    if args[:1] == ["_hold"] and len(args) == 2:
+        _hold(int(args[1]))
+        return 0
+
+    print("Usage: python -m bot.tenants run [tenants.json] | measure [N]", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
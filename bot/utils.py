@@ -1,26 +1,29 @@
 # comments MUST be English only
 from functools import wraps
-from typing import Callable, Awaitable, Any
+from typing import Callable, Awaitable, Any, Optional
 
 from telegram import Update
 from telegram.ext import ContextTypes
 
+from .admins import AdminCache
 from .config import Config
-from .db import Database
 
 
-def is_authorized(cfg: Config, update: Update) -> bool:
+def is_authorized(cfg: Config, update: Update, admins: Optional[AdminCache] = None) -> bool:
     user = update.effective_user
     if not user:
         return False
+    if admins is not None:
+        # In-memory frozenset; no DB round trip per update
+        return admins.is_admin(user.id)
     return user.id in cfg.admin_ids
 
 
-def admin_only(cfg: Config) -> Callable:
+def admin_only(cfg: Config, admins: Optional[AdminCache] = None) -> Callable:
     def decorator(func: Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[Any]]):
         @wraps(func)
         async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            if not is_authorized(cfg, update):
+            if not is_authorized(cfg, update, admins):
                 # Do not respond at all for unauthorized users
                 return
             return await func(update, context)
@@ -0,0 +1,167 @@
+# comments MUST be English only
+#
+# Watches the MTProxy unit file and mtconfig.conf for changes made outside
+# the bots (create_proxy.sh, Hirbod's installer, manual edits) and pushes a
+# single "changed" callback per burst of writes.
+#
+# Uses inotify through libc when available, otherwise polls stat().
+import ctypes
+import ctypes.util
+import functools
+import logging
+import os
+import select
+import struct
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+# Watch directories, not files: sed -i / editors replace the file (new inode)
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE
+
+_EVENT = struct.Struct("iIII")
+
+DEBOUNCE = 0.5  # seconds; create_proxy.sh writes the unit, then mtconfig.conf
+POLL_INTERVAL = 5.0  # seconds, fallback only
+
+ChangeCallback = Callable[[Set[str]], None]
+
+
+def _load_libc():
+    name = ctypes.util.find_library("c")
+    if not name:
+        return None
+    try:
+        libc = ctypes.CDLL(name, use_errno=True)
+        libc.inotify_init1
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class ConfigWatcher:
+    def __init__(
+        self,
+        paths: Iterable[str],
+        on_change: ChangeCallback,
+        use_inotify: bool = True,
+    ):
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.on_change = on_change
+        self.use_inotify = use_inotify
+        self.mode = "stopped"
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._wd_dirs: Dict[int, str] = {}
+
+    def start(self) -> None:
+        fd = self._init_inotify() if self.use_inotify else None
+        if fd is not None:
+            self.mode = "inotify"
+            target = functools.partial(self._inotify_loop, fd)
+        else:
+            self.mode = "poll"
+            target = self._poll_loop
+        self._thread = threading.Thread(target=target, name="config-watcher", daemon=True)
+        self._thread.start()
+        logger.info("Watching %s (%s)", ", ".join(self.paths), self.mode)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=POLL_INTERVAL + 1)
+
+    def _emit(self, changed: Set[str]) -> None:
+        try:
+            self.on_change(changed)
+        except Exception:
+            logger.exception("Config change callback failed")
+
+    # ---------- inotify ----------
+
+    def _init_inotify(self) -> Optional[int]:
+        libc = _load_libc()
+        if libc is None:
+            return None
+        fd = libc.inotify_init1(IN_CLOEXEC | IN_NONBLOCK)
+        if fd < 0:
+            return None
+
+        for directory in {os.path.dirname(p) for p in self.paths}:
+            if not os.path.isdir(directory):
+                continue
+            wd = libc.inotify_add_watch(fd, directory.encode(), WATCH_MASK)
+            if wd >= 0:
+                self._wd_dirs[wd] = directory
+        if not self._wd_dirs:
+            os.close(fd)
+            return None
+        return fd
+
+    def _read_events(self, fd: int) -> List[Tuple[int, str]]:
+        try:
+            buf = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT.size <= len(buf):
+            wd, _mask, _cookie, length = _EVENT.unpack_from(buf, offset)
+            offset += _EVENT.size
+            name = buf[offset : offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            events.append((wd, name))
+        return events
+
+    def _inotify_loop(self, fd: int) -> None:
+        watched = set(self.paths)
+        pending: Set[str] = set()
+        try:
+            while not self._stop.is_set():
+                # Short timeout while a burst is pending, to debounce it
+                timeout = DEBOUNCE if pending else 1.0
+                ready, _, _ = select.select([fd], [], [], timeout)
+                if not ready:
+                    if pending:
+                        self._emit(pending)
+                        pending = set()
+                    continue
+                for wd, name in self._read_events(fd):
+                    path = os.path.join(self._wd_dirs.get(wd, ""), name)
+                    if path in watched:
+                        pending.add(path)
+        finally:
+            os.close(fd)
+
+    # ---------- polling fallback ----------
+
+    @staticmethod
+    def _stat(path: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _poll_loop(self) -> None:
+        last = {p: self._stat(p) for p in self.paths}
+        while not self._stop.wait(POLL_INTERVAL):
+            changed = set()
+            for p in self.paths:
+                current = self._stat(p)
+                if current != last[p]:
+                    last[p] = current
+                    changed.add(p)
+            if changed:
+                self._emit(changed)
@@ -69,9 +69,22 @@ sync_default_port_from_mtconfig() {
 }
 
 
+# ===== Helper: snapshot bot databases + MTProxy secrets before destructive steps =====
+backup_bot_data() {
+  if [ -d "$INSTALL_DIR/bot" ] && command -v python3 >/dev/null 2>&1; then
+    echo -e "${CYAN}Creating backup of bot data (python3 -m bot.backup create)...${RESET}"
+    (cd "$INSTALL_DIR" && python3 -m bot.backup create) \
+      || echo -e "${YELLOW}Backup failed; continuing without it.${RESET}"
+  fi
+}
+
+
 purge_full_stack_install() {
   echo -e "${YELLOW}Purging previous MTProxy + Bot state (full reinstall)...${RESET}"
 
+  # Keep a copy of databases and unit secrets before anything is removed
+  backup_bot_data
+
   # Stop MTProxy service if present
   if command -v systemctl >/dev/null 2>&1; then
     if systemctl list-unit-files 2>/dev/null | grep -q "^MTProxy.service"; then
@@ -1162,6 +1175,7 @@ cleanup_menu() {
         echo -ne "${CYAN}Are you sure you want to remove ${WHITE}$INSTALL_DIR${CYAN}? [y/N]: ${RESET}"
         read -r ans
         if [[ "$ans" =~ ^[Yy]$ ]]; then
+          backup_bot_data
           sudo rm -rf "$INSTALL_DIR" 2>/dev/null || rm -rf "$INSTALL_DIR"
           echo -e "${GREEN}Removed ${WHITE}$INSTALL_DIR${RESET}"
         else
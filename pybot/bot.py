@@ -13,6 +13,8 @@ from telegram.ext import (
     ContextTypes,
 )
 
+from bot.profiler import parse_args as parse_profile_args, send_profile
+
 from .config import Config
 from .db import ProxyStore
 from .mtproxy_manager import MTProxyManager
@@ -150,11 +152,28 @@ async def handle_delete_proxy(query, proxy_id: int) -> None:
     await handle_list_proxies(query)
 
 
-def main() -> None:
-    application = Application.builder().token(cfg.bot_token).build()
+async def cmd_profile(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    # /profile [seconds] [cpu|wall]
+    if not await ensure_admin(update):
+        return
+    seconds, mode = parse_profile_args(context.args)
+    await update.message.reply_text(f"⏱ پروفایل {seconds} ثانیه‌ای ({mode}) شروع شد...")
+    context.application.create_task(
+        send_profile(context.bot, update.effective_chat.id, seconds, mode)
+    )
+
+
+def build_application(builder=None) -> Application:
+    # builder lets callers (tools/loadtest.py) point base_url elsewhere
+    application = (builder or Application.builder()).token(cfg.bot_token).build()
     application.add_handler(CommandHandler("start", cmd_start))
+    application.add_handler(CommandHandler("profile", cmd_profile))
     application.add_handler(CallbackQueryHandler(handle_callback))
-    application.run_polling()
+    return application
+
+
+def main() -> None:
+    build_application().run_polling()
 
 
 if __name__ == "__main__":
@@ -6,6 +6,8 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import List, Optional
 
+from bot.store import SOURCE_PYBOT, migrate, telegram_admin
+
 
 @dataclass
 class Proxy:
@@ -16,6 +18,14 @@ class Proxy:
     is_active: bool
 
 
+# Rows of the unified schema in the shape pybot has always used; proxies
+# created by bot/ have no stored link and get an empty one
+_SELECT = (
+    "SELECT p.id, a.telegram_id AS user_id, p.secret, COALESCE(p.link, '') AS link, "
+    "p.is_active FROM proxies p JOIN admins a ON a.id = p.admin_id "
+)
+
+
 class ProxyStore:
     def __init__(self, path: str) -> None:
         self.path = Path(path)
@@ -28,52 +38,49 @@ class ProxyStore:
         return conn
 
     def _init_schema(self) -> None:
+        # Same schema as bot/db.py (bot/store.py migrations): an old pybot
+        # file is converted in place, and db_path may point at the bot's own
+        # database so both bots share one store. user_id is admins.telegram_id.
         with self._get_conn() as conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS proxies (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    secret TEXT NOT NULL,
-                    link TEXT NOT NULL,
-                    is_active INTEGER NOT NULL DEFAULT 1,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-                """
-            )
+            migrate(conn)
 
     def add_proxy(self, user_id: int, secret: str, link: str) -> int:
         with self._get_conn() as conn:
-            cur = conn.execute(
-                "INSERT INTO proxies (user_id, secret, link, is_active) VALUES (?, ?, ?, 1)",
-                (user_id, secret, link),
+            cur = conn.cursor()
+            admin_id = telegram_admin(cur, user_id)
+            cur.execute(
+                "INSERT INTO proxies (admin_id, label, secret, link, source) "
+                "VALUES (?, '', ?, ?, ?)",
+                (admin_id, secret, link, SOURCE_PYBOT),
+            )
+            proxy_id = int(cur.lastrowid)
+            cur.execute(
+                "UPDATE proxies SET label = ? WHERE id = ?", (f"#{proxy_id}", proxy_id)
             )
-            return int(cur.lastrowid)
+        return proxy_id
 
     def list_active(self) -> List[Proxy]:
         with self._get_conn() as conn:
             rows = conn.execute(
-                "SELECT id, user_id, secret, link, is_active "
-                "FROM proxies WHERE is_active = 1 ORDER BY id"
+                _SELECT + "WHERE p.is_active = 1 ORDER BY p.id"
             ).fetchall()
-        return [
-            Proxy(
-                id=row["id"],
-                user_id=row["user_id"],
-                secret=row["secret"],
-                link=row["link"],
-                is_active=bool(row["is_active"]),
-            )
-            for row in rows
-        ]
+        return [self._to_proxy(row) for row in rows]
 
     def get(self, proxy_id: int) -> Optional[Proxy]:
+        with self._get_conn() as conn:
+            row = conn.execute(_SELECT + "WHERE p.id = ?", (proxy_id,)).fetchone()
+        return self._to_proxy(row)
+
+    def get_by_secret(self, secret: str) -> Optional[Proxy]:
         with self._get_conn() as conn:
             row = conn.execute(
-                "SELECT id, user_id, secret, link, is_active "
-                "FROM proxies WHERE id = ?",
-                (proxy_id,),
+                _SELECT + "WHERE p.secret = ? AND p.is_active = 1",
+                (secret,),
             ).fetchone()
+        return self._to_proxy(row)
+
+    @staticmethod
+    def _to_proxy(row: Optional[sqlite3.Row]) -> Optional[Proxy]:
         if not row:
             return None
         return Proxy(
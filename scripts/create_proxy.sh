@@ -59,9 +59,11 @@ GenerateService() {
     ARGS_STR+=" --nat-info $PRIVATE_IP:$PUBLIC_IP "
   fi
 
-  # Worker count
+  # Worker count: keep the running -M (the bot's autotuner may have changed
+  # it), otherwise CPU_CORES - 1 like the installer
   local NEW_CORE
-  NEW_CORE=$((CPU_CORES - 1))
+  NEW_CORE="$(grep -oP '(?<=\s-M\s)\d+' "$SERVICE_FILE" | head -n 1 || true)"
+  NEW_CORE="${NEW_CORE:-$((CPU_CORES - 1))}"
   ARGS_STR+=" -M $NEW_CORE ${CUSTOM_ARGS:-} --aes-pwd proxy-secret proxy-multi.conf"
 
   # Final systemd service unit
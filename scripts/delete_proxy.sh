@@ -1,7 +1,7 @@
 #!/bin/bash
 # scripts/delete_proxy.sh
 # Delete a proxy by its ID:
-#   1. Remove from data/proxies.txt
+#   1. Remove from the unified store (data/proxies.txt as fallback)
 #   2. Remove its secret from /etc/mtproxy/secret.list
 #   3. Restart mtproxy service (best effort)
 #
@@ -26,24 +26,36 @@ ROOT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
 DATA_DIR="$ROOT_DIR/data"
 PROXY_DB_FILE="$DATA_DIR/proxies.txt"
 
-if [ ! -f "$PROXY_DB_FILE" ]; then
+# Delete via python3 -m bot.store delete; data/proxies.txt only if that fails
+# Exit 3 from the store means "no such active proxy"
+STORE_RC=0
+SECRET="$(cd "$ROOT_DIR" && python3 -m bot.store delete "$TARGET_ID" 2>/dev/null)" || STORE_RC=$?
+
+if [ "$STORE_RC" -eq 3 ]; then
   echo "NOT_FOUND $TARGET_ID"
   exit 0
 fi
 
-LINE="$(grep -E "^${TARGET_ID} " "$PROXY_DB_FILE" || true)"
+if [ "$STORE_RC" -ne 0 ]; then
+  if [ ! -f "$PROXY_DB_FILE" ]; then
+    echo "NOT_FOUND $TARGET_ID"
+    exit 0
+  fi
 
-if [ -z "$LINE" ]; then
-  echo "NOT_FOUND $TARGET_ID"
-  exit 0
-fi
+  LINE="$(grep -E "^${TARGET_ID} " "$PROXY_DB_FILE" || true)"
+
+  if [ -z "$LINE" ]; then
+    echo "NOT_FOUND $TARGET_ID"
+    exit 0
+  fi
 
-SECRET="$(printf '%s\n' "$LINE" | awk '{print $2}')"
+  SECRET="$(printf '%s\n' "$LINE" | awk '{print $2}')"
 
-# Remove from proxies.txt
-tmpfile="$(mktemp)"
-grep -Ev "^${TARGET_ID} " "$PROXY_DB_FILE" > "$tmpfile" || true
-mv "$tmpfile" "$PROXY_DB_FILE"
+  # Remove from proxies.txt
+  tmpfile="$(mktemp)"
+  grep -Ev "^${TARGET_ID} " "$PROXY_DB_FILE" > "$tmpfile" || true
+  mv "$tmpfile" "$PROXY_DB_FILE"
+fi
 
 # Remove from /etc/mtproxy/secret.list
 if [ -f /etc/mtproxy/secret.list ]; then
@@ -1,6 +1,6 @@
 #!/bin/bash
 # scripts/list_proxies.sh
-# List all stored proxies from data/proxies.txt
+# List all stored proxies (unified store, or data/proxies.txt as fallback)
 # Output format per line:
 #   ID SECRET PORT NAME TG_LINK
 # If there are no proxies, prints "NO_PROXIES".
@@ -12,6 +12,12 @@ ROOT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
 DATA_DIR="$ROOT_DIR/data"
 PROXY_DB_FILE="$DATA_DIR/proxies.txt"
 
+# Read via python3 -m bot.store list; data/proxies.txt only if that fails
+if OUT="$(cd "$ROOT_DIR" && python3 -m bot.store list 2>/dev/null)"; then
+  echo "$OUT"
+  exit 0
+fi
+
 if [ ! -f "$PROXY_DB_FILE" ]; then
   echo "NO_PROXIES"
   exit 0
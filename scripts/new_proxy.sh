@@ -2,7 +2,7 @@
 # scripts/new_proxy.sh
 # Helper around create_proxy.sh.
 # - Calls scripts/create_proxy.sh (must be run as root).
-# - Stores metadata into data/proxies.txt
+# - Stores metadata into the unified store (data/proxies.txt as fallback)
 # - Prints a single line:
 #     ID SECRET PORT NAME TG_LINK
 
@@ -43,6 +43,12 @@ if [ -z "$SECRET" ] || [ -z "$PORT" ] || [ -z "$TG_LINK" ]; then
   exit 1
 fi
 
+# Record via python3 -m bot.store add; data/proxies.txt only if that fails
+if LINE="$(cd "$ROOT_DIR" && python3 -m bot.store add "$SECRET" "$PORT" "$TG_LINK" 2>/dev/null)"; then
+  echo "$LINE"
+  exit 0
+fi
+
 # Determine next numeric ID
 NEW_ID=1
 if [ -f "$PROXY_DB_FILE" ]; then
@@ -20,7 +20,11 @@ mkdir -p "$DATA_DIR"
 PROXY_COUNT=0
 BY_PORT=""
 
-if [ -f "$PROXY_DB_FILE" ] && grep -q '.' "$PROXY_DB_FILE"; then
+# Count via python3 -m bot.store stats; data/proxies.txt only if that fails
+if STORE_STATS="$(cd "$ROOT_DIR" && python3 -m bot.store stats 2>/dev/null)"; then
+  PROXY_COUNT="$(printf '%s\n' "$STORE_STATS" | awk -F= '/^PROXY_COUNT=/{print $2}')"
+  BY_PORT="$(printf '%s\n' "$STORE_STATS" | awk -F= '/^BY_PORT=/{print $2}')"
+elif [ -f "$PROXY_DB_FILE" ] && grep -q '.' "$PROXY_DB_FILE"; then
   PROXY_COUNT="$(wc -l < "$PROXY_DB_FILE" | tr -d ' ')"
 
   # Extract per-port counts (3rd field = PORT)
@@ -0,0 +1,30 @@
+# comments MUST be English only
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from bot.abuse import ACTION_ALERT, ACTION_ROTATE, AbuseMonitor
+
+
+class _Unit:
+    def __init__(self, secrets):
+        self.secrets = secrets
+
+    def parse_config(self):
+        return SimpleNamespace(port=443, secrets=self.secrets)
+
+
+@pytest.mark.parametrize(
+    "action, secrets, warned",
+    [
+        (ACTION_ROTATE, ["a" * 32, "b" * 32], True),
+        (ACTION_ROTATE, ["a" * 32], False),
+        (ACTION_ALERT, ["a" * 32, "b" * 32], False),
+    ],
+)
+def test_startup_warning_when_no_port_has_one_secret(caplog, action, secrets, warned):
+    monitor = AbuseMonitor(db=None, mt=_Unit(secrets), action=action)
+    with caplog.at_level(logging.WARNING, logger="bot.abuse"):
+        monitor.warn_if_port_keyed()
+    assert ("has no effect" in caplog.text) is warned
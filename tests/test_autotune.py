@@ -0,0 +1,45 @@
+# comments MUST be English only
+import os
+from types import SimpleNamespace
+
+from bot.autotune import COOLDOWN, STABLE_SAMPLES, WorkerAutotuner, load_trace
+
+
+TRACE = os.path.join(os.path.dirname(__file__), "fixtures", "autotune_trace.csv")
+CORES = 8
+
+
+def test_replay_hysteresis_and_cooldown():
+    samples = load_trace(TRACE)
+    decisions = WorkerAutotuner(None, cores=CORES).replay(samples, workers=2)
+
+    assert [(d.ts, d.current, d.target) for d in decisions] == [
+        (1080.0, 2, 3),
+        (2880.0, 3, 4),
+        (4710.0, 4, 3),
+        (6510.0, 3, 2),
+    ]
+    # The 90 s spike at 600-660 s changes nothing; sustained load from 990 s
+    # needs STABLE_SAMPLES readings
+    assert decisions[0].ts - 990.0 == (STABLE_SAMPLES - 1) * 30
+    for prev, cur in zip(decisions, decisions[1:]):
+        assert cur.ts - prev.ts >= COOLDOWN
+        assert abs(cur.target - prev.target) == 1
+
+
+def test_dry_run_suggests_each_count_once(monkeypatch):
+    # Nobody applies the suggestion: ExecStart keeps -M 2 for the whole trace
+    mt = SimpleNamespace(parse_config=lambda: SimpleNamespace(workers=2))
+    tuner = WorkerAutotuner(mt, cores=CORES, apply=False)
+    samples = iter(load_trace(TRACE))
+    monkeypatch.setattr(tuner, "sample", lambda connections=None: next(samples))
+
+    sent = []
+    for _ in range(len(load_trace(TRACE))):
+        decision = tuner.step()
+        if decision:
+            sent.append((decision.current, decision.target, decision.applied))
+
+    # 2 -> 3 comes up again after every cooldown but is only reported once
+    assert len(tuner.decisions) > len(sent)
+    assert sent == [(2, 3, False), (2, 1, False)]
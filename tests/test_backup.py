@@ -0,0 +1,41 @@
+# comments MUST be English only
+import dataclasses
+import os
+
+from bot.backup import BackupManager
+from bot.config import Config
+from bot.db import Database
+from bot.mtproxy_manager import MtproxyManager
+
+
+def _manager(tmp_path, **overrides):
+    db_path = str(tmp_path / "bot.db")
+    Database(db_path)
+    cfg = dataclasses.replace(
+        Config.from_env(),
+        mtproxy_service="MTProxy-missing",
+        db_path=db_path,
+        pybot_db_path=db_path,
+        backup_dir=str(tmp_path / "backups"),
+        **overrides,
+    )
+    return BackupManager(cfg, MtproxyManager(cfg))
+
+
+def test_same_second_runs_get_distinct_archives(tmp_path):
+    mgr = _manager(tmp_path, backup_keep=5)
+    first, second = mgr.create(), mgr.create()
+    assert first != second
+    assert mgr.list_backups() == [first, second]
+
+
+def test_keep_zero_still_keeps_the_newest(tmp_path):
+    mgr = _manager(tmp_path, backup_keep=0)
+    mgr.create()
+    latest = mgr.create()
+    assert mgr.list_backups() == [latest] and os.path.exists(latest)
+
+
+def test_shared_pybot_path_is_archived_once(tmp_path):
+    mgr = _manager(tmp_path)
+    assert mgr._paths() == [mgr.cfg.db_path]
@@ -0,0 +1,106 @@
+# comments MUST be English only
+import pytest
+
+from bot.procnet import count_connections, iter_established, listening_ports
+
+
+TCP_HEADER = (
+    "  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt"
+    "   uid  timeout inode\n"
+)
+TCP6_HEADER = (
+    "  sl  local_address                         remote_address                        st"
+    " tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode\n"
+)
+
+SERVER_V4 = "0A00000A"  # 10.0.0.10, little-endian hex as the kernel prints it
+SERVER_V6 = "B80D0120000000000000000001000000"
+V4_MAPPED = "0000000000000000FFFF0000"
+
+# What the generated fixture contains, per watched port
+EXPECTED = {443: (70_000, 5_000), 8443: (5_000, 500)}  # (established, unique clients)
+
+
+def _v4(i: int) -> str:
+    return f"{0xC0000000 + i:08X}"
+
+
+def _v6(i: int) -> str:
+    return f"20010DB8{i:024X}"
+
+
+def _line(sl: int, local: str, remote: str, state: str) -> str:
+    return (
+        f"{sl:6d}: {local} {remote} {state} 00000000:00000000 00:00000000 00000000"
+        f"     0        0 {100000 + sl} 1 0000000000000000 20 4 30 10 -1\n"
+    )
+
+
+@pytest.fixture(scope="module")
+def proc_dir(tmp_path_factory):
+    # ~100k sockets: busy MTProxy ports, states that must be skipped,
+    # ports that are not watched and outgoing sockets to a remote :443
+    root = tmp_path_factory.mktemp("proc_net")
+    tcp = [TCP_HEADER]
+    tcp6 = [TCP6_HEADER]
+
+    def v4(local_port, remote_ip, remote_port, state):
+        tcp.append(
+            _line(len(tcp), f"{SERVER_V4}:{local_port:04X}", f"{remote_ip}:{remote_port:04X}", state)
+        )
+
+    def v6(local_port, remote_ip, remote_port, state):
+        tcp6.append(
+            _line(len(tcp6), f"{SERVER_V6}:{local_port:04X}", f"{remote_ip}:{remote_port:04X}", state)
+        )
+
+    v4(443, "00000000", 0, "0A")
+    v6(443, "0" * 32, 0, "0A")
+    # 443 over IPv4: 4000 clients x 10 connections
+    for i in range(40_000):
+        v4(443, _v4(i % 4000), 20000 + i % 40000, "01")
+    # Not ESTABLISHED: TIME_WAIT, CLOSE_WAIT, SYN_RECV
+    for i in range(10_000):
+        v4(443, _v4(i), 30000 + i, ("06", "08", "03")[i % 3])
+    # 8443: 500 clients x 10
+    for i in range(5_000):
+        v4(8443, _v4(100_000 + i % 500), 20000 + i, "01")
+    # Unwatched local port, and outgoing connections whose remote port is 443
+    for i in range(5_000):
+        v4(80, _v4(i), 20000 + i, "01")
+    for i in range(1_000):
+        v4(40000 + i, _v4(i), 443, "01")
+    # 443 over IPv6: 20000 from IPv4-mapped clients already seen over tcp,
+    # 10000 from 1000 native IPv6 clients
+    for i in range(20_000):
+        v6(443, V4_MAPPED + _v4(i % 2000), 20000 + i, "01")
+    for i in range(10_000):
+        v6(443, _v6(i % 1000), 20000 + i, "01")
+    for i in range(9_000):
+        v6(443, _v6(i % 1000), 40000 + i, ("06", "08", "0B")[i % 3])
+
+    (root / "tcp").write_text("".join(tcp), encoding="ascii")
+    (root / "tcp6").write_text("".join(tcp6), encoding="ascii")
+    assert len(tcp) + len(tcp6) - 2 >= 100_000
+    return str(root)
+
+
+def test_count_connections(proc_dir):
+    stats = count_connections([443, 8443, 9999], proc_dir)
+    got = {port: (s.established, s.unique_ips) for port, s in stats.items()}
+    assert got == {**EXPECTED, 9999: (0, 0)}
+
+
+def test_iter_established_filters_state_and_port(proc_dir):
+    pairs = list(iter_established([443], proc_dir))
+    assert len(pairs) == EXPECTED[443][0]
+    assert {port for port, _ in pairs} == {443}
+    # IPv4-mapped tcp6 clients collapse onto their tcp key
+    clients = {client for _, client in pairs}
+    assert _v4(0) in clients
+    assert V4_MAPPED + _v4(0) not in clients
+    assert _v6(0) in clients
+
+
+def test_listening_ports(proc_dir):
+    assert listening_ports(proc_dir) == [443]
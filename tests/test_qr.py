@@ -0,0 +1,22 @@
+# comments MUST be English only
+from bot.qr import QrCache, cache_key
+
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"png")
+    return path
+
+
+def test_prune_leaves_tenant_caches_alone(tmp_path):
+    live, gone = "tg://proxy?secret=live", "tg://proxy?secret=gone"
+    keep = _touch(tmp_path / cache_key(live)[:2] / f"{cache_key(live)}.png")
+    stale = _touch(tmp_path / cache_key(gone)[:2] / f"{cache_key(gone)}.png")
+    # QR_CACHE_DIR/<tenant> belongs to another bot's proxies
+    tenant = _touch(tmp_path / "r1" / cache_key(gone)[:2] / f"{cache_key(gone)}.png")
+
+    assert QrCache(str(tmp_path)).prune([live]) == 1
+    assert keep.exists() and not stale.exists() and tenant.exists()
+
+    assert QrCache(str(tmp_path / "r1")).prune([]) == 1
+    assert not tenant.exists()
@@ -0,0 +1,103 @@
+# comments MUST be English only
+import dataclasses
+import re
+import sqlite3
+
+import pytest
+
+from bot import mtproxy_manager
+from bot.audit import EVENT_EXPIRE, AuditLog
+from bot.config import Config
+from bot.db import Database
+from bot.mtproxy_manager import MtproxyManager
+from bot.rotation import SCOPE_ALL, SecretRotator
+
+
+OLD = ["0123456789abcdef0123456789abcdef", "fedcba9876543210fedcba9876543210"]
+MTCONFIG = """PORT=443
+CPU_CORES=4
+SECRET_ARY=({secrets})
+TAG=""
+TLS_DOMAIN="www.cloudflare.com"
+"""
+UNIT = """[Unit]
+Description=MTProxy
+
+[Service]
+ExecStart=/opt/MTProxy/objs/bin/mtproto-proxy -u nobody -H 443 {flags} -D www.cloudflare.com -M 3
+Restart=on-failure
+"""
+
+
+@pytest.fixture
+def host(tmp_path, monkeypatch):
+    unit_dir = tmp_path / "systemd"
+    unit_dir.mkdir()
+    (unit_dir / "MTProxy.service").write_text(
+        UNIT.format(flags=" ".join(f"-S {s}" for s in OLD)), encoding="utf-8"
+    )
+    mtconfig = tmp_path / "mtconfig.conf"
+    mtconfig.write_text(MTCONFIG.format(secrets=" ".join(OLD)), encoding="utf-8")
+    monkeypatch.setattr(mtproxy_manager, "SERVICE_PATHS", [str(unit_dir)])
+    monkeypatch.setattr(MtproxyManager, "restart_service", lambda self: None)
+
+    cfg = dataclasses.replace(
+        Config.from_env(),
+        mtproxy_service="MTProxy",
+        mtconfig_path=str(mtconfig),
+        db_path=str(tmp_path / "bot.db"),
+    )
+    db = Database(cfg.db_path)
+    admin_id = db.ensure_admin(1, "owner", is_owner=True)
+    for i, secret in enumerate(OLD, 1):
+        db.create_proxy(admin_id=admin_id, label=f"proxy-{i}", secret=secret)
+    return MtproxyManager(cfg), db, mtconfig
+
+
+def _secret_ary(path) -> list:
+    text = path.read_text(encoding="utf-8")
+    return re.search(r"^SECRET_ARY=\((.*)\)$", text, re.MULTILINE).group(1).split()
+
+
+def test_rotation_keeps_secret_ary_in_sync(host):
+    mt, db, mtconfig = host
+    rotator = SecretRotator(db, mt)
+
+    rotations = rotator.rotate(rotator.select(SCOPE_ALL), grace=60)
+    new = [r.new_secret for r in rotations]
+    assert mt.parse_config().secrets == OLD + new
+    assert _secret_ary(mtconfig) == OLD + new
+
+    assert rotator.finish_due(now=2**31) == 2
+    assert mt.parse_config().secrets == new
+    assert _secret_ary(mtconfig) == new
+    # The rest of the installer config is untouched
+    assert 'TLS_DOMAIN="www.cloudflare.com"' in mtconfig.read_text(encoding="utf-8")
+
+
+def test_add_and_remove_update_secret_ary(host):
+    mt, _, mtconfig = host
+    added = mt.add_secret()
+    assert _secret_ary(mtconfig) == OLD + [added]
+    mt.remove_secret(OLD[0])
+    assert _secret_ary(mtconfig) == mt.parse_config().secrets == [OLD[1], added]
+
+
+def test_grace_end_is_audited_as_expire(host):
+    mt, db, _ = host
+    audit = AuditLog(db.path)
+    try:
+        rotator = SecretRotator(db, mt, audit)
+        rotator.rotate(rotator.select(SCOPE_ALL), grace=60)
+        rotator.finish_due(now=2**31)
+        audit.flush()
+        expired = [r for r in audit.history(limit=10) if r["event"] == EVENT_EXPIRE]
+        assert sorted(r["secret"] for r in expired) == sorted(OLD)
+        # The digest does not count a rotated proxy as removed
+        conn = sqlite3.connect(db.path)
+        try:
+            assert not conn.execute("SELECT SUM(expired) FROM rollup_admin_daily").fetchone()[0]
+        finally:
+            conn.close()
+    finally:
+        audit.close()
@@ -0,0 +1,114 @@
+# comments MUST be English only
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from bot.store import (
+    MIGRATIONS,
+    SCHEMA_VERSION,
+    TXT_IMPORTED_SUFFIX,
+    StoreImporter,
+    adopt_proxies_txt,
+    iter_proxies_txt,
+    migrate,
+)
+
+
+SECRET = "ee1f2a3b4c5d6e7f8091a2b3c4d5e6f70777777772e676f6f676c652e636f6d"
+TG_LINK = f"tg://proxy?server=203.0.113.7&port=8443&secret={SECRET}"
+
+
+def _write(tmp_path, *lines):
+    path = tmp_path / "proxies.txt"
+    path.write_text("".join(f"{line}\n" for line in lines), encoding="utf-8")
+    return str(path)
+
+
+def test_proxies_txt_tg_link(tmp_path):
+    # A line exactly as scripts/new_proxy.sh appends it
+    path = _write(tmp_path, f"1 {SECRET} 8443 proxy-1 {TG_LINK}")
+    assert list(iter_proxies_txt(path)) == [("1", SECRET, 8443, "proxy-1", TG_LINK)]
+
+
+def test_proxies_txt_link_forms(tmp_path):
+    https = f"https://t.me/proxy?server=203.0.113.7&port=443&secret={SECRET}"
+    path = _write(
+        tmp_path,
+        f"2 {SECRET} 443 proxy-2 {https}",
+        f"3 {SECRET} 443 proxy-3",
+        "",
+        f"4 {SECRET} 443 two words {TG_LINK}",
+        f"5 {SECRET} port proxy-5 {TG_LINK}",
+        f"6 {SECRET} 443 proxy-6 not-a-link",
+    )
+    assert list(iter_proxies_txt(path)) == [
+        ("2", SECRET, 443, "proxy-2", https),
+        ("3", SECRET, 443, "proxy-3", None),
+        ("4", "", None, "", None),
+        ("5", "", None, "", None),
+        ("6", "", None, "", None),
+    ]
+
+
+def test_import_keeps_tg_link(tmp_path):
+    path = _write(tmp_path, f"1 {SECRET} 8443 proxy-1 {TG_LINK}")
+    conn = sqlite3.connect(str(tmp_path / "store.db"))
+    migrate(conn)
+    importer = StoreImporter(conn, owner_id=42)
+    ids = importer.import_proxies_txt(path)
+
+    row = conn.execute("SELECT label, port, link FROM proxies WHERE id = ?", (ids["1"],)).fetchone()
+    assert row == ("proxy-1", 8443, TG_LINK)
+    assert importer.report.inserted == 1
+    conn.close()
+
+
+def _objects(conn):
+    return {name for (name,) in conn.execute("SELECT name FROM sqlite_master")}
+
+
+def test_migrate_creates_every_table(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "store.db"))
+    assert migrate(conn) == SCHEMA_VERSION
+    objects = _objects(conn)
+    for name in ("admins", "proxies", "rollup_uptime_daily", "audit_log", "bot_state"):
+        assert name in objects
+    assert "audit_log_no_update" in objects
+
+    with pytest.raises(sqlite3.DatabaseError, match="append-only"):
+        conn.execute("INSERT INTO audit_log (ts, event) VALUES (1, 1)")
+        conn.execute("DELETE FROM audit_log")
+    conn.close()
+
+
+def test_migrate_over_ad_hoc_tables(tmp_path):
+    # A version 3 file where audit.py / persistence.py / db.py had created
+    # their tables themselves
+    conn = sqlite3.connect(str(tmp_path / "store.db"))
+    for step in MIGRATIONS[:3]:
+        step(conn.cursor())
+    conn.execute("PRAGMA user_version = 3")
+    for step in MIGRATIONS[3:]:
+        step(conn.cursor())
+    conn.execute("INSERT INTO audit_log (ts, event) VALUES (1, 1)")
+    conn.commit()
+
+    assert migrate(conn) == SCHEMA_VERSION
+    assert conn.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0] == 1
+    conn.close()
+
+
+def test_adopt_proxies_txt_once(tmp_path):
+    cfg = SimpleNamespace(db_path=str(tmp_path / "store.db"), owner_id=42, admin_ids=[42])
+    _write(tmp_path, f"7 {SECRET} 8443 proxy-7 {TG_LINK}")
+
+    report = adopt_proxies_txt(cfg, str(tmp_path))
+    assert report.inserted == 1
+    assert not (tmp_path / "proxies.txt").exists()
+    assert (tmp_path / f"proxies.txt{TXT_IMPORTED_SUFFIX}").exists()
+    assert adopt_proxies_txt(cfg, str(tmp_path)) is None
+
+    conn = sqlite3.connect(cfg.db_path)
+    assert conn.execute("SELECT secret, link FROM proxies").fetchall() == [(SECRET, TG_LINK)]
+    conn.close()
@@ -0,0 +1,91 @@
+# comments MUST be English only
+import dataclasses
+import sqlite3
+
+import pytest
+
+from bot import mtproxy_manager
+from bot.config import Config
+from bot.mtproxy_manager import MtproxyManager
+from bot.procnet import PortStats, Sample
+from bot.tenants import build_tenants
+
+
+SECRET = "0123456789abcdef0123456789abcdef"
+UNIT = "[Service]\nExecStart=/opt/MTProxy/objs/bin/mtproto-proxy -u nobody -H 443 {flags} -M 2\n"
+
+
+@pytest.fixture
+def tenants(tmp_path, monkeypatch):
+    unit_dir = tmp_path / "systemd"
+    unit_dir.mkdir()
+    unit = unit_dir / "MTProxy.service"
+    monkeypatch.setattr(mtproxy_manager, "SERVICE_PATHS", [str(unit_dir)])
+
+    base = dataclasses.replace(
+        Config.from_env(),
+        mtproxy_service="MTProxy",
+        mtconfig_path=str(tmp_path / "mtconfig.conf"),
+        pybot_db_path=str(tmp_path / "pybot.db"),
+        backup_dir=str(tmp_path / "backups"),
+    )
+    cfgs = [
+        dataclasses.replace(
+            base,
+            bot_token=f"{100 + i}:TEST",
+            owner_id=10 + i,
+            admin_ids=[10 + i],
+            db_path=str(tmp_path / f"t{i}.db"),
+        )
+        for i in range(3)
+    ]
+    built = build_tenants(cfgs, MtproxyManager(base))
+    yield [logic for logic, _ in built], unit
+    for logic, _ in built:
+        logic.audit.close()
+
+
+def _traffic(logic):
+    conn = sqlite3.connect(logic.cfg.db_path)
+    try:
+        return dict(conn.execute("SELECT key, conn_seconds FROM rollup_traffic_daily"))
+    finally:
+        conn.close()
+
+
+def _own(logic, secret):
+    admin_id = logic.db.ensure_admin(logic.cfg.owner_id, "owner", is_owner=True)
+    logic.db.create_proxy(admin_id=admin_id, label="proxy-1", secret=secret)
+
+
+def test_only_the_host_samples(tenants):
+    apps, _ = tenants
+    assert apps[0].host_jobs and apps[0].peers == apps[1:]
+    assert not any(app.host_jobs or app.peers for app in apps[1:])
+
+
+def test_shared_port_traffic_stays_with_the_host(tenants):
+    apps, unit = tenants
+    other = "fedcba9876543210fedcba9876543210"
+    unit.write_text(UNIT.format(flags=f"-S {SECRET} -S {other}"), encoding="utf-8")
+    apps[0]._service_up = (float("inf"), True)  # no systemctl in tests
+
+    sample = Sample(ts=86400.0, ports={443: PortStats(established=7, unique_ips=3)})
+    apps[0]._record_rollups(sample)
+    interval = apps[0].cfg.monitor_interval
+    assert _traffic(apps[0]) == {"port:443": 7 * interval}
+    assert _traffic(apps[1]) == {} and _traffic(apps[2]) == {}
+
+
+def test_single_secret_traffic_goes_to_its_tenant(tenants):
+    apps, unit = tenants
+    unit.write_text(UNIT.format(flags=f"-S {SECRET}"), encoding="utf-8")
+    _own(apps[1], SECRET)
+    apps[0]._service_up = (float("inf"), True)
+
+    sample = Sample(ts=86400.0, ports={443: PortStats(established=5, unique_ips=5)})
+    apps[0]._record_rollups(sample)
+    interval = apps[0].cfg.monitor_interval
+    assert _traffic(apps[0]) == {}
+    assert _traffic(apps[1]) == {SECRET: 5 * interval}
+    assert _traffic(apps[2]) == {}
@@ -0,0 +1,217 @@
+# comments MUST be English only
+#
+# Minimal fake Telegram Bot API server for load tests.
+#
+# Point python-telegram-bot at it with
+#   Application.builder().base_url(api.base_url)
+# and feed updates with push_command() / push_callback(). Every bot response
+# (sendMessage, editMessageText, ...) is reported to the on_response callback.
+import asyncio
+import itertools
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+
+BOT_USER = {
+    "id": 1,
+    "is_bot": True,
+    "first_name": "LoadTestBot",
+    "username": "loadtest_bot",
+    "can_join_groups": False,
+    "can_read_all_group_messages": False,
+    "supports_inline_queries": True,
+}
+
+# Methods whose reply is a Message object
+MESSAGE_METHODS = {"sendMessage", "editMessageText", "sendDocument", "sendPhoto"}
+
+# (method, params, loop time)
+ResponseCallback = Callable[[str, Dict, float], None]
+
+
+def _decode_params(content_type: str, body: bytes) -> Dict:
+    if not body:
+        return {}
+    if content_type.startswith("application/json"):
+        return json.loads(body)
+    if content_type.startswith("multipart/form-data"):
+        # File uploads; the content is irrelevant for load tests
+        return {}
+    params = {}
+    for key, value in parse_qsl(body.decode("utf-8"), keep_blank_values=True):
+        # PTB JSON-encodes non-string parameters
+        try:
+            params[key] = json.loads(value)
+        except ValueError:
+            params[key] = value
+    return params
+
+
+class FakeBotApi:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.on_response: Optional[ResponseCallback] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.calls: Dict[str, int] = {}
+
+        self._updates: List[Dict] = []
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1000)
+        self._new_update: Optional[asyncio.Condition] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/bot"
+
+    # ---------- lifecycle (own thread + loop) ----------
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._thread_main, name="fake-bot-api", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _thread_main(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self._start_server())
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    async def _start_server(self) -> None:
+        self._new_update = asyncio.Condition()
+        self._server = await asyncio.start_server(self._handle_conn, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def _shutdown(self) -> None:
+        self._server.close()
+        current = asyncio.current_task()
+        for task in asyncio.all_tasks():
+            if task is not current:
+                task.cancel()
+
+    def stop(self) -> None:
+        if self.loop:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout=5)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def run(self, coro):
+        # Schedule a coroutine on the server loop (e.g. simulated users)
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    # ---------- updates ----------
+
+    def _message(self, chat_id: int, text: str, user: Optional[Dict] = None) -> Dict:
+        msg = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": text,
+        }
+        if user:
+            msg["from"] = user
+        return msg
+
+    @staticmethod
+    def _user(user_id: int) -> Dict:
+        return {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+
+    async def push_command(self, user_id: int, text: str) -> int:
+        msg = self._message(user_id, text, self._user(user_id))
+        command = text.split()[0]
+        msg["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+        return await self._push({"message": msg})
+
+    async def push_callback(self, user_id: int, data: str) -> int:
+        update_id = next(self._update_ids)
+        query = {
+            "id": str(update_id),
+            "from": self._user(user_id),
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": self._message(user_id, "menu", BOT_USER),
+        }
+        return await self._push({"callback_query": query}, update_id)
+
+    async def _push(self, payload: Dict, update_id: Optional[int] = None) -> int:
+        update_id = update_id or next(self._update_ids)
+        payload["update_id"] = update_id
+        async with self._new_update:
+            self._updates.append(payload)
+            self._new_update.notify_all()
+        return update_id
+
+    async def _get_updates(self, params: Dict) -> List[Dict]:
+        offset = int(params.get("offset") or 0)
+        # Cap long polling so shutdown is quick
+        timeout = min(float(params.get("timeout") or 0), 1.0)
+        async with self._new_update:
+            # Confirmed updates are dropped, like the real API
+            self._updates = [u for u in self._updates if u["update_id"] >= offset]
+            if not self._updates and timeout > 0:
+                try:
+                    await asyncio.wait_for(self._new_update.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            return list(self._updates[:100])
+
+    # ---------- HTTP ----------
+
+    async def _dispatch(self, method: str, params: Dict):
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if method == "getMe":
+            return BOT_USER
+        if method == "getUpdates":
+            return await self._get_updates(params)
+
+        if self.on_response:
+            self.on_response(method, params, time.monotonic())
+        if method in MESSAGE_METHODS:
+            chat_id = int(params.get("chat_id") or 0)
+            return self._message(chat_id, str(params.get("text", "")), BOT_USER)
+        return True
+
+    async def _read_request(self, reader) -> Optional[Tuple[str, Dict[str, str], bytes]]:
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        _, path, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+        length = int(headers.get("content-length", "0"))
+        body = await reader.readexactly(length) if length else b""
+        return path, headers, body
+
+    async def _handle_conn(self, reader, writer) -> None:
+        try:
+            while True:
+                try:
+                    path, headers, body = await self._read_request(reader)
+                except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+                    return
+                method = path.rstrip("/").rsplit("/", 1)[-1]
+                params = _decode_params(headers.get("content-type", ""), body)
+                result = await self._dispatch(method, params)
+                payload = json.dumps({"ok": True, "result": result}).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: application/json\r\n"
+                    b"Connection: keep-alive\r\n"
+                    + f"Content-Length: {len(payload)}\r\n\r\n".encode()
+                    + payload
+                )
+                await writer.drain()
+        finally:
+            writer.close()
@@ -0,0 +1,314 @@
+# comments MUST be English only
+#
+# Load test for bot/ and pybot/ against tools/fake_bot_api.py.
+#
+#   python -m tools.loadtest --bot both --users 50 --rounds 5
+#
+# Each simulated admin repeatedly runs a closed-loop scenario (send an
+# update, wait for the bot's reply to that chat, send the next one).
+# systemctl and curl are replaced by stubs and the MTProxy unit file lives
+# in a temp dir, so nothing on the host is touched.
+import argparse
+import asyncio
+import json
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from .fake_bot_api import FakeBotApi
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_USER_ID = 100001  # first simulated user is the owner
+REPLY_TIMEOUT = 10.0  # seconds per step
+LAG_INTERVAL = 0.01  # event-loop lag probe period
+LAG_THRESHOLD = 0.005  # lag above this counts as blocked time
+
+UNIT_TEMPLATE = """[Unit]
+Description=MTProxy (load test)
+
+[Service]
+Type=simple
+ExecStart=/opt/MTProxy/objs/bin/mtproto-proxy -u nobody -p 8888 -H 443 --aes-pwd proxy-secret proxy-multi.conf -M 1
+Restart=on-failure
+
+[Install]
+WantedBy=multi-user.target
+"""
+
+# ("command", text) or ("callback", data)
+SCENARIOS = {
+    "bot": [
+        ("command", "/start"),
+        ("callback", "menu_proxy_list"),
+        ("callback", "proxy_page:1"),
+        ("callback", "menu_new_proxy"),
+    ],
+    "pybot": [
+        ("command", "/start"),
+        ("callback", "list_proxies"),
+        ("callback", "create_proxy"),
+    ],
+}
+
+
+@dataclass
+class RunResult:
+    bot: str
+    users: int
+    updates: int = 0
+    timeouts: int = 0
+    elapsed: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    max_lag: float = 0.0
+    blocked: float = 0.0
+    calls: Dict[str, int] = field(default_factory=dict)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def format_result(r: RunResult) -> str:
+    ms = lambda s: f"{s * 1000:.1f}ms"  # noqa: E731
+    throughput = r.updates / r.elapsed if r.elapsed else 0.0
+    lines = [
+        f"== {r.bot}: {r.users} users, {r.updates} updates in {r.elapsed:.2f}s",
+        f"throughput: {throughput:.1f} updates/s",
+        "latency: p50 {} p90 {} p99 {} max {}".format(
+            ms(_percentile(r.latencies, 50)),
+            ms(_percentile(r.latencies, 90)),
+            ms(_percentile(r.latencies, 99)),
+            ms(max(r.latencies, default=0.0)),
+        ),
+        f"timeouts: {r.timeouts}",
+        f"event loop: max lag {ms(r.max_lag)}, blocked {r.blocked:.2f}s "
+        f"({100 * r.blocked / r.elapsed if r.elapsed else 0:.1f}% of run)",
+        "api calls: " + ", ".join(f"{k}={v}" for k, v in sorted(r.calls.items())),
+    ]
+    return "\n".join(lines)
+
+
+# ---------- environment stubs ----------
+
+
+def _write_script(path: str, body: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("#!/bin/sh\n" + body)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def prepare_environment(tmp: str, users: int) -> str:
+    # Returns the directory holding the fake unit file
+    unit_dir = os.path.join(tmp, "systemd")
+    bin_dir = os.path.join(tmp, "bin")
+    data_dir = os.path.join(tmp, "data")
+    for d in (unit_dir, bin_dir, data_dir):
+        os.makedirs(d, exist_ok=True)
+
+    with open(os.path.join(unit_dir, "MTProxy.service"), "w", encoding="utf-8") as f:
+        f.write(UNIT_TEMPLATE)
+
+    # SYSTEMCTL_DELAY simulates a slow restart (seconds, default 0)
+    _write_script(
+        os.path.join(bin_dir, "systemctl"),
+        'sleep "${SYSTEMCTL_DELAY:-0}"\nexit 0\n',
+    )
+    _write_script(os.path.join(bin_dir, "curl"), "echo 203.0.113.10\n")
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+
+    ids = [FIRST_USER_ID + i for i in range(users)]
+    # bot/ reads these in Config.from_env (real env wins over .env)
+    os.environ.update(
+        {
+            "BOT_TOKEN": "123456:LOADTEST",
+            "OWNER_ID": str(ids[0]),
+            "ADMIN_IDS": ",".join(str(i) for i in ids),
+            "MTPROXY_SERVICE_NAME": "MTProxy",
+            "DB_PATH": os.path.join(data_dir, "mtproxy-bot.db"),
+            "PYBOT_DB_PATH": os.path.join(data_dir, "proxies.sqlite3"),
+            "BACKUP_DIR": os.path.join(tmp, "backups"),
+            "MTPROXY_CONFIG": os.path.join(tmp, "mtconfig.conf"),
+            "WATCH_NOTIFY": "0",
+        }
+    )
+    # pybot reads config.json from the working directory at import time
+    with open(os.path.join(tmp, "config.json"), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "bot_token": "123456:LOADTEST",
+                "owner_ids": ids,
+                "db_path": os.path.join(data_dir, "proxies.sqlite3"),
+            },
+            f,
+        )
+    return unit_dir
+
+
+def build_target(name: str, unit_dir: str, builder):
+    if name == "bot":
+        from bot import mtproxy_manager
+        from bot.bot import MtproxyBotApp, build_application
+        from bot.config import Config
+
+        mtproxy_manager.SERVICE_PATHS[:] = [unit_dir]
+        app_logic = MtproxyBotApp(Config.from_env())
+        # Tag prompt would stop the scenario before a proxy is created
+        for i, row in enumerate(app_logic.db.list_active_admins()):
+            app_logic.db.set_admin_tag(row["id"], f"load{i}")
+        app_logic.admins.reload()
+        return build_application(app_logic, builder=builder)
+
+    from pybot import mtproxy_manager
+    from pybot.bot import build_application
+
+    mtproxy_manager.SERVICE_PATHS[:] = [unit_dir]
+    return build_application(builder=builder)
+
+
+# ---------- simulated users ----------
+
+
+class Driver:
+    # Lives on the fake API loop; matches bot replies to waiting users
+    def __init__(self, api: FakeBotApi, steps: List[Tuple[str, str]], rounds: int):
+        self.api = api
+        self.steps = steps
+        self.rounds = rounds
+        self.waiting: Dict[int, asyncio.Future] = {}
+        self.latencies: List[float] = []
+        self.timeouts = 0
+        self.updates = 0
+
+    def on_response(self, method: str, params: Dict, now: float) -> None:
+        if method not in ("sendMessage", "editMessageText"):
+            return
+        fut = self.waiting.pop(int(params.get("chat_id") or 0), None)
+        if fut and not fut.done():
+            fut.set_result(now)
+
+    async def user(self, user_id: int) -> None:
+        loop = asyncio.get_running_loop()
+        for _ in range(self.rounds):
+            for kind, value in self.steps:
+                fut = loop.create_future()
+                self.waiting[user_id] = fut
+                started = time.monotonic()
+                if kind == "command":
+                    await self.api.push_command(user_id, value)
+                else:
+                    await self.api.push_callback(user_id, value)
+                self.updates += 1
+                try:
+                    done = await asyncio.wait_for(fut, REPLY_TIMEOUT)
+                except asyncio.TimeoutError:
+                    self.waiting.pop(user_id, None)
+                    self.timeouts += 1
+                    continue
+                self.latencies.append(done - started)
+
+    async def run(self, users: int) -> None:
+        await asyncio.gather(*(self.user(FIRST_USER_ID + i) for i in range(users)))
+
+
+async def _lag_probe(result: RunResult) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        before = loop.time()
+        await asyncio.sleep(LAG_INTERVAL)
+        lag = loop.time() - before - LAG_INTERVAL
+        result.max_lag = max(result.max_lag, lag)
+        if lag > LAG_THRESHOLD:
+            result.blocked += lag
+
+
+async def run_bot(name: str, users: int, rounds: int, concurrent: int) -> RunResult:
+    from telegram.ext import Application
+
+    result = RunResult(bot=name, users=users)
+    tmp = tempfile.mkdtemp(prefix=f"loadtest-{name}-")
+    unit_dir = prepare_environment(tmp, users)
+    os.chdir(tmp)
+
+    api = FakeBotApi()
+    api.start()
+    driver = Driver(api, SCENARIOS[name], rounds)
+    api.on_response = driver.on_response
+
+    builder = (
+        Application.builder()
+        .base_url(api.base_url)
+        .concurrent_updates(concurrent)
+        .connection_pool_size(max(8, concurrent))
+    )
+    application = build_target(name, unit_dir, builder)
+
+    try:
+        async with application:
+            if application.post_init:
+                await application.post_init(application)
+            await application.start()
+            await application.updater.start_polling(poll_interval=0.0, timeout=1)
+
+            probe = asyncio.create_task(_lag_probe(result))
+            started = time.monotonic()
+            await asyncio.wrap_future(api.run(driver.run(users)))
+            result.elapsed = time.monotonic() - started
+            probe.cancel()
+
+            await application.updater.stop()
+            await application.stop()
+            if application.post_shutdown:
+                await application.post_shutdown(application)
+    finally:
+        api.stop()
+
+    result.updates = driver.updates
+    result.timeouts = driver.timeouts
+    result.latencies = driver.latencies
+    result.calls = dict(api.calls)
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test bot/ and pybot/ against a fake Bot API")
+    parser.add_argument("--bot", choices=("bot", "pybot", "both"), default="both")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument(
+        "--concurrent-updates",
+        type=int,
+        default=1,
+        help="Application.concurrent_updates (1 = sequential, the PTB default)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.bot == "both":
+        # Separate processes: both bots configure themselves at import time
+        status = 0
+        for name in ("bot", "pybot"):
+            cmd = [sys.executable, "-m", "tools.loadtest", "--bot", name]
+            cmd += ["--users", str(args.users), "--rounds", str(args.rounds)]
+            cmd += ["--concurrent-updates", str(args.concurrent_updates)]
+            status |= subprocess.run(cmd, cwd=REPO_ROOT).returncode
+        return status
+
+    sys.path.insert(0, REPO_ROOT)
+    result = asyncio.run(
+        run_bot(args.bot, args.users, args.rounds, args.concurrent_updates)
+    )
+    print(format_result(result))
+    return 1 if result.timeouts else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())